@@ -0,0 +1,39 @@
+from urllib.parse import urlencode
+
+
+async def asgi_request(
+    app, method: str = "GET", path: str = "/", query: dict | None = None
+) -> tuple[int, dict[str, str]]:
+    """
+    Минимальный ASGI-клиент: отправляет один HTTP запрос прямо в приложение,
+    без сети и сторонних зависимостей. Возвращает статус и заголовки ответа
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(query or {}).encode(),
+        "root_path": "",
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+    response: dict = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {
+                key.decode(): value.decode() for key, value in message["headers"]
+            }
+
+    await app(scope, receive, send)
+
+    return response["status"], response["headers"]
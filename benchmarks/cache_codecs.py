@@ -0,0 +1,74 @@
+"""
+Стоимость форматов записей настроек в кеше Redis (SETTINGS_CACHE_CODEC).
+
+Для каждого формата и сущности: кодирование записи, декодирование
+и декодирование со сборкой сущности (как при чтении из кеша), а также
+размер записи в байтах (для REDIS_HASH - сумма имён и значений полей).
+
+    python -m benchmarks.cache_codecs --number 200000
+"""
+
+import argparse
+import json
+import time
+import timeit
+from dataclasses import asdict
+
+from src.domain.schemas import CdnServer, OriginServer
+from src.infrastructure.cache.codecs import REFRESH_AT_FIELD, build_codec
+from src.infrastructure.cache.enums import CacheCodecEnum
+
+ENTITIES = (
+    CdnServer(host_name="cdn.provider.com", default_redirecting_ratio=30),
+    OriginServer(name="s1", redirecting_ratio=20),
+)
+
+
+def encoded_size(encoded: str | dict[str, str]) -> int:
+    if isinstance(encoded, dict):
+        return sum(len(key) + len(value) for key, value in encoded.items())
+
+    return len(encoded.encode())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    for entity in ENTITIES:
+        entity_type = type(entity)
+        # Запись с TTL: поля сущности и время обновления
+        record = {**asdict(entity), REFRESH_AT_FIELD: time.time()}
+
+        for kind in CacheCodecEnum:
+            codec = build_codec(kind, entity_type)
+            encoded = codec.encode(record)
+
+            assert codec.decode(encoded) == record
+
+            def read(encoded=encoded, codec=codec, entity_type=entity_type):
+                decoded = codec.decode(encoded)
+                decoded.pop(REFRESH_AT_FIELD, None)
+                return entity_type(**decoded)
+
+            cases = {
+                "encode": lambda codec=codec: codec.encode(record),
+                "decode": lambda codec=codec, encoded=encoded: codec.decode(encoded),
+                "read_entity": read,
+            }
+            result = {
+                "entity": entity_type.__name__,
+                "codec": kind.value,
+                "size_bytes": encoded_size(encoded),
+            }
+
+            for name, case in cases.items():
+                elapsed = timeit.timeit(case, number=args.number)
+                result[f"{name}_ns"] = elapsed / args.number * 1e9
+
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Насколько счётчики с выдачей блоками (BLOCK_LEASE) отклоняются от точного INCR.
+
+Моделирует несколько воркеров с общим Redis (in-memory), раскидывает запросы
+по воркерам случайно и считает:
+  - команд Redis на 1000 запросов;
+  - итоговую долю origin против ожидаемой 1/ratio;
+  - максимальное отклонение числа запросов на origin в скользящем окне.
+
+    python -m benchmarks.counter_drift --workers 4 --ratio 20 --requests 100000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+from src.infrastructure.cache.leasing import CounterBlockLeaser
+
+from .fakes import InMemoryRedis
+
+COUNTER_KEY = "counter: s1"
+
+
+async def simulate(
+    workers: int, ratio: int, requests: int, window: int, block_size: int | None
+) -> dict:
+    redis = InMemoryRedis()
+    rng = random.Random(42)
+
+    # Без размера блока - точный INCR
+    leasers: list[CounterBlockLeaser] = []
+
+    if block_size:
+        leasers = [
+            CounterBlockLeaser(
+                client=redis,
+                block_size=block_size,
+                min_block_size=block_size,
+                max_block_size=block_size,
+                lease_interval=1.0,
+                adaptive=False,
+            )
+            for _ in range(workers)
+        ]
+
+    decisions: list[bool] = []
+
+    for _ in range(requests):
+        if leasers:
+            value = await rng.choice(leasers).next_value(COUNTER_KEY)
+        else:
+            value = await redis.incr(COUNTER_KEY)
+
+        decisions.append(not value % ratio)
+
+    # Максимальное отклонение в скользящем окне от ожидаемых window / ratio
+    expected = window / ratio
+    in_window = sum(decisions[:window])
+    max_deviation = abs(in_window - expected)
+
+    for index in range(window, requests):
+        in_window += decisions[index] - decisions[index - window]
+        max_deviation = max(max_deviation, abs(in_window - expected))
+
+    return {
+        "backend": f"BLOCK_LEASE({block_size})" if block_size else "INCR",
+        "redis_commands_per_1k": sum(redis.commands.values()) * 1000 / requests,
+        "origin_share": sum(decisions) / requests,
+        "expected_share": 1 / ratio,
+        "max_window_deviation": max_deviation,
+        "window": window,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ratio", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--window", type=int, default=1000)
+    parser.add_argument("--block-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    for block_size in [None, *args.block_sizes]:
+        result = await simulate(
+            args.workers, args.ratio, args.requests, args.window, block_size
+        )
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
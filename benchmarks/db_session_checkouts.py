@@ -0,0 +1,91 @@
+"""
+Сколько сессий БД открывается и соединений берётся из пула на 1000 редиректов.
+
+Сравнивает прежнюю зависимость get_db_session (сессия на каждый запрос) с ленивой
+(сессия создаётся только при промахе кеша). Redis и пул подменены счётчиками,
+поэтому замер работает без внешних сервисов:
+
+    python -m benchmarks.db_session_checkouts --requests 1000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+from src.infrastructure.database import session as session_module
+from src.infrastructure.database.session import get_async_session
+from src.main import create_application
+from src.presentation.rest import dependencies
+
+from .asgi import asgi_request
+from .fakes import CountingSessionMaker, InMemoryRedis
+from .load import bind_redis
+
+
+async def eager_db_session():
+    # Поведение до ленивых сессий
+    async with get_async_session() as session:
+        yield session
+
+
+async def run(mode: str, requests: int) -> dict:
+    redis = InMemoryRedis()
+    keyspace = dependencies.get_redis_keyspace()
+
+    # Ключи и формат записей - как у кеша настроек (версия схемы и кодек)
+    redis.data[keyspace.cdn_settings()] = dependencies.get_cdn_settings_codec().encode(
+        {"host_name": "cdn.provider.com", "default_redirecting_ratio": 30}
+    )
+    redis.data[
+        keyspace.origin_settings("s1")
+    ] = dependencies.get_origin_settings_codec().encode(
+        {"name": "s1", "redirecting_ratio": 20, "capacity": None}
+    )
+
+    session_maker = CountingSessionMaker()
+    session_module.get_async_session_maker = lambda: session_maker
+
+    # Снимок настроек не загружается - настройки читаются через кеширующие
+    # репозитории из подменённого Redis
+    bind_redis(redis)
+
+    application = create_application()
+
+    if mode == "eager":
+        application.dependency_overrides[dependencies.get_db_session] = eager_db_session
+
+    statuses: Counter[int] = Counter()
+    started = time.perf_counter()
+
+    for _ in range(requests):
+        status_code, _ = await asgi_request(
+            application, query={"video_url": "http://s1.origin.com/video/1.mp4"}
+        )
+        statuses[status_code] += 1
+
+    elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "requests": requests,
+        "sessions_per_1k": session_maker.sessions * 1000 / requests,
+        "checkouts_per_1k": session_maker.checkouts * 1000 / requests,
+        "us_per_request": elapsed / requests * 1_000_000,
+        # Все ответы должны быть 307, иначе замер идёт по пути ошибки
+        "statuses": dict(statuses),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    for mode in ("eager", "lazy"):
+        print(json.dumps(await run(mode, args.requests)))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+from collections import Counter
+
+
+class InMemoryRedis:
+    """
+    Подмена клиента Redis для офлайн-замеров: хранит данные в словаре
+    и считает выполненные команды
+    """
+
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+        self.commands: Counter[str] = Counter()
+
+    async def get(self, key: str) -> str | None:
+        self.commands["GET"] += 1
+        return self.data.get(key)
+
+    async def set(self, key: str, value, **kwargs) -> bool:
+        self.commands["SET"] += 1
+        self.data[key] = str(value)
+        return True
+
+    async def incr(self, key: str) -> int:
+        return await self.incrby(key, 1, command="INCR")
+
+    async def incrby(self, key: str, amount: int, command: str = "INCRBY") -> int:
+        self.commands[command] += 1
+        value = int(self.data.get(key, 0)) + amount
+        self.data[key] = str(value)
+        return value
+
+    async def delete(self, *keys: str) -> int:
+        self.commands["DEL"] += 1
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def publish(self, channel: str, message) -> int:
+        self.commands["PUBLISH"] += 1
+        return 0
+
+    async def ping(self) -> bool:
+        self.commands["PING"] += 1
+        return True
+
+
+class CountingSession:
+    """
+    Подмена AsyncSession: соединение из пула "берётся" при первом запросе к БД,
+    как это делает SQLAlchemy
+    """
+
+    def __init__(self, maker: "CountingSessionMaker") -> None:
+        self._maker = maker
+        self._checked_out = False
+
+    def _checkout(self) -> None:
+        if not self._checked_out:
+            self._checked_out = True
+            self._maker.checkouts += 1
+
+    async def scalar(self, *args, **kwargs):
+        self._checkout()
+
+    async def scalars(self, *args, **kwargs):
+        self._checkout()
+        return []
+
+    async def execute(self, *args, **kwargs):
+        self._checkout()
+
+    def add(self, *args, **kwargs) -> None:
+        pass
+
+    async def commit(self) -> None:
+        self._checkout()
+
+    async def flush(self, *args, **kwargs) -> None:
+        self._checkout()
+
+    async def rollback(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        self._checked_out = False
+
+    async def __aenter__(self) -> "CountingSession":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+class CountingSessionMaker:
+    def __init__(self) -> None:
+        self.sessions = 0
+        self.checkouts = 0
+
+    def __call__(self) -> CountingSession:
+        self.sessions += 1
+        return CountingSession(self)
@@ -0,0 +1,251 @@
+"""
+Нагрузочный прогон обработчика GET / без внешних сервисов.
+
+Приложение собирается через create_application с настоящим графом
+зависимостей, запросы идут прямо в ASGI (без сети), команды Redis и пул
+соединений БД подменены in-memory счётчиками. Один прогон - одна конфигурация
+(настройки читаются из окружения один раз на процесс).
+Снимок настроек загружается из памяти или выключается (--no-snapshot) -
+тогда настройки читаются через кеширующие репозитории из подменённого Redis.
+
+Выводит req/s, задержки p50/p99/p999, команды Redis и соединения из пула БД
+на запрос. Результат можно сохранить в JSON и сравнить с прошлым прогоном:
+
+    python -m benchmarks.load --requests 20000 --concurrency 64 --output before.json
+    python -m benchmarks.load --requests 20000 --concurrency 64 --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+from collections import Counter
+from dataclasses import asdict
+
+from src.application.enums import BalancingStrategyEnum
+from src.domain.schemas import CdnHost, CdnServer, OriginServer
+from src.infrastructure.cache.enums import CounterBackendEnum
+from src.infrastructure.database import session as session_module
+from src.main import create_application
+from src.presentation.rest import dependencies
+
+from .asgi import asgi_request
+from .fakes import CountingSessionMaker, InMemoryRedis
+
+# Стратегии, которым хватает подменённого Redis (скрипты он не исполняет)
+STRATEGIES = (
+    BalancingStrategyEnum.NTH_REQUEST,
+    BalancingStrategyEnum.CONSISTENT_HASH,
+    BalancingStrategyEnum.ADAPTIVE_RATIO,
+)
+
+REDIS_COMMANDS = ("get", "set", "incr", "incrby", "delete", "publish", "ping")
+
+CDN_SETTINGS = CdnServer(host_name="cdn.provider.com", default_redirecting_ratio=30)
+
+
+def percentile(sorted_values: list[float], share: float) -> float:
+    # Ближайший ранг
+    index = min(len(sorted_values) - 1, max(0, round(share * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def build_settings(
+    servers: int, cdn_hosts: int
+) -> tuple[list[OriginServer], list[CdnHost]]:
+    origins = [
+        # capacity учитывает только ADAPTIVE_RATIO
+        OriginServer(name=f"s{index}", redirecting_ratio=20, capacity=100)
+        for index in range(1, servers + 1)
+    ]
+    hosts = [
+        CdnHost(host_name=f"edge{index}.cdn.provider.com", weight=index)
+        for index in range(1, cdn_hosts + 1)
+    ]
+
+    return origins, hosts
+
+
+def configure_environment(args) -> None:
+    # Настройки задаём так же, как в проде - переменными окружения; подмена
+    # через dependency_overrides сама стоит заметного времени на каждый запрос
+    os.environ["BALANCING_STRATEGY"] = args.strategy
+    os.environ["COUNTER_BACKEND"] = args.counter_backend
+    os.environ["COUNTER_SHARDS"] = str(args.counter_shards)
+    os.environ["SETTINGS_SNAPSHOT_ENABLED"] = str(args.snapshot).lower()
+    os.environ["HEALTH_CHECK_ENABLED"] = "false"
+    os.environ["REDIRECT_FAST_PATH_ENABLED"] = str(args.fast_path).lower()
+
+
+def bind_redis(redis: InMemoryRedis) -> None:
+    # Команды настоящего клиента (синглтона воркера) уходят в память
+    client = dependencies.get_redis_client()
+
+    for command in REDIS_COMMANDS:
+        setattr(client, command, getattr(redis, command))
+
+
+async def build_application(args, redis: InMemoryRedis):
+    origins, hosts = build_settings(args.servers, args.cdn_hosts)
+    keyspace = dependencies.get_redis_keyspace()
+    cdn_codec = dependencies.get_cdn_settings_codec()
+    origin_codec = dependencies.get_origin_settings_codec()
+
+    redis.data[keyspace.cdn_settings()] = cdn_codec.encode(asdict(CDN_SETTINGS))
+
+    for origin in origins:
+        redis.data[keyspace.origin_settings(origin.name)] = origin_codec.encode(
+            asdict(origin)
+        )
+
+    async def load_balancing_settings():
+        return CDN_SETTINGS, origins, hosts
+
+    dependencies.load_balancing_settings = load_balancing_settings
+    bind_redis(redis)
+
+    if args.snapshot:
+        await dependencies.get_settings_snapshot_store().refresh()
+
+    return create_application()
+
+
+async def run(args) -> dict:
+    configure_environment(args)
+
+    redis = InMemoryRedis()
+    session_maker = CountingSessionMaker()
+    session_module.get_async_session_maker = lambda: session_maker
+
+    application = await build_application(args, redis)
+
+    queries = [
+        {
+            "video_url": f"http://s{index % args.servers + 1}.origin-cluster.com"
+            f"/video/{index % args.paths}/index.m3u8"
+        }
+        for index in range(args.requests)
+    ]
+
+    # Прогрев: кеши разбора URL, ленивые синглтоны, первые блоки счётчиков
+    for query in queries[: args.warmup]:
+        await asgi_request(application, query=query)
+
+    redis.commands.clear()
+    session_maker.sessions = session_maker.checkouts = 0
+
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+    position = iter(range(args.requests))
+
+    async def client() -> None:
+        for index in position:
+            started = time.perf_counter()
+            status, _ = await asgi_request(application, query=queries[index])
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    requests = len(latencies)
+
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "strategy": args.strategy,
+            "counter_backend": args.counter_backend,
+            "counter_shards": args.counter_shards,
+            "snapshot": args.snapshot,
+            "fast_path": args.fast_path,
+            "servers": args.servers,
+            "cdn_hosts": args.cdn_hosts,
+            "paths": args.paths,
+            "python": platform.python_version(),
+        },
+        "results": {
+            "requests_per_second": requests / elapsed,
+            "p50_ms": percentile(latencies, 0.5) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "p999_ms": percentile(latencies, 0.999) * 1000,
+            "redis_commands_per_request": sum(redis.commands.values()) / requests,
+            "db_sessions_per_request": session_maker.sessions / requests,
+            "db_checkouts_per_request": session_maker.checkouts / requests,
+            "errors": sum(count for status, count in statuses.items() if status != 307),
+        },
+        "redis_commands": dict(redis.commands),
+        "statuses": {str(status): count for status, count in statuses.items()},
+    }
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    changes = {}
+
+    for metric, value in current["results"].items():
+        previous = baseline["results"].get(metric)
+
+        if previous is None:
+            continue
+
+        changes[metric] = {
+            "baseline": previous,
+            "current": value,
+            "change_percent": (value - previous) / previous * 100 if previous else None,
+        }
+
+    return changes
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument(
+        "--strategy",
+        type=BalancingStrategyEnum,
+        choices=STRATEGIES,
+        default=BalancingStrategyEnum.NTH_REQUEST,
+    )
+    parser.add_argument(
+        "--counter-backend",
+        type=CounterBackendEnum,
+        choices=list(CounterBackendEnum),
+        default=CounterBackendEnum.INCR,
+    )
+    parser.add_argument("--counter-shards", type=int, default=1)
+    parser.add_argument(
+        "--snapshot", action=argparse.BooleanOptionalAction, default=True
+    )
+    parser.add_argument(
+        "--fast-path", action=argparse.BooleanOptionalAction, default=False
+    )
+    parser.add_argument("--servers", type=int, default=10)
+    parser.add_argument("--cdn-hosts", type=int, default=0)
+    parser.add_argument("--paths", type=int, default=1000)
+    parser.add_argument("--output", help="сохранить результат в JSON файл")
+    parser.add_argument("--compare", help="JSON файл прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    result = await run(args)
+
+    if args.compare:
+        with open(args.compare) as file:
+            result["comparison"] = compare(result, json.load(file))
+
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
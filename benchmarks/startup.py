@@ -0,0 +1,86 @@
+"""
+Время холодного импорта приложения воркером (этап imports метрики
+balancer_worker_startup_seconds): каждый прогон - новый интерпретатор,
+как у воркера uvicorn. Выводит медиану и максимум, а также модули,
+импорт которых занимает больше всего времени (по python -X importtime).
+
+    python -m benchmarks.startup --runs 10 --top 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+IMPORT_APPLICATION = (
+    "import time; started = time.perf_counter(); import src.main; "
+    "print(time.perf_counter() - started)"
+)
+
+# Воркер читает настройки при импорте, подключений при этом нет
+ENVIRONMENT = {
+    "DATABASE_NAME": "balancer_db",
+    "DATABASE_USER": "user",
+    "DATABASE_PASSWORD": "password",
+    "DATABASE_HOST": "localhost",
+    "DATABASE_PORT": "5432",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+}
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        env={**ENVIRONMENT, **os.environ},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def slowest_imports(top: int) -> list[tuple[str, float]]:
+    stderr = run_python("-X", "importtime", "-c", "import src.main").stderr
+    modules = []
+
+    # Строки вида "import time: self [us] | cumulative | module"
+    for line in stderr.splitlines():
+        _, _, timings = line.partition("import time:")
+        parts = timings.split("|")
+
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+
+        modules.append((parts[2].strip(), int(parts[1]) / 1e6))
+
+    return sorted(modules, key=lambda module: module[1], reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    durations = [
+        float(run_python("-c", IMPORT_APPLICATION).stdout) for _ in range(args.runs)
+    ]
+
+    print(
+        json.dumps(
+            {
+                "runs": args.runs,
+                "import_median_seconds": statistics.median(durations),
+                "import_max_seconds": max(durations),
+            }
+        )
+    )
+
+    for module, cumulative in slowest_imports(args.top):
+        print(json.dumps({"module": module, "cumulative_seconds": cumulative}))
+
+
+if __name__ == "__main__":
+    main()
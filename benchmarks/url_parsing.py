@@ -0,0 +1,77 @@
+"""
+Стоимость разбора URL видео на один запрос.
+
+"before" повторяет прежнюю схему: urlparse + регулярка в зависимости
+extract_server_name, в стратегии и ещё раз при сборке CDN адреса.
+"after" - один разбор UrlRewriter (без кеша и с попаданием в LRU) и сборка
+CDN адреса из готовых частей.
+
+    python -m benchmarks.url_parsing --number 200000
+"""
+
+import argparse
+import json
+import re
+import timeit
+from urllib.parse import urlparse
+
+from src.application.config import UrlRewriteSettings
+from src.application.rewrite import RewriteRule, UrlRewriter
+
+ORIGIN_HOST_PATTERN = re.compile(r"^(s\d+)\.")
+VIDEO_URL = "http://s1.origin-cluster.com/video/1488/xcg2djHckad.m3u8"
+CDN_HOST = "cdn.provider.com"
+
+
+def _extract_server_name(video_url: str) -> str:
+    parsed_url = urlparse(video_url)
+    return ORIGIN_HOST_PATTERN.match(parsed_url.hostname).group(1)
+
+
+def _build_cdn_url(video_url: str, cdn_host: str) -> str:
+    parsed_url = urlparse(video_url)
+    server_name = ORIGIN_HOST_PATTERN.match(parsed_url.hostname).group(1)
+    return f"http://{cdn_host}/{server_name}{parsed_url.path or ''}"
+
+
+def before() -> str:
+    _extract_server_name(VIDEO_URL)
+    _extract_server_name(VIDEO_URL)
+    return _build_cdn_url(VIDEO_URL, CDN_HOST)
+
+
+def build_rewriter(cache_size: int) -> UrlRewriter:
+    settings = UrlRewriteSettings()
+
+    return UrlRewriter(
+        rules=[
+            RewriteRule.compile(rule.host_pattern, rule.cdn_url_template)
+            for rule in settings.URL_REWRITE_RULES
+        ],
+        cache_size=cache_size,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    cold = build_rewriter(cache_size=0)
+    warm = build_rewriter(cache_size=1024)
+
+    assert cold.parse(VIDEO_URL).cdn_url(CDN_HOST) == before()
+
+    cases = {
+        "before": before,
+        "after_cold": lambda: cold.parse(VIDEO_URL).cdn_url(CDN_HOST),
+        "after_lru_hit": lambda: warm.parse(VIDEO_URL).cdn_url(CDN_HOST),
+    }
+
+    for name, case in cases.items():
+        elapsed = timeit.timeit(case, number=args.number)
+        print(json.dumps({"case": name, "ns_per_request": elapsed / args.number * 1e9}))
+
+
+if __name__ == "__main__":
+    main()
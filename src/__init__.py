@@ -1,3 +1,7 @@
 import pathlib
+import time
+
+# Момент начала импорта приложения воркером - от него считается время старта
+IMPORT_STARTED_AT: float = time.perf_counter()
 
 APPLICATION_DIR: pathlib.Path = pathlib.Path(__file__).parent.resolve()
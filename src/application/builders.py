@@ -0,0 +1,149 @@
+import abc
+from typing import Callable
+
+from src.application.config import BalancerSettings
+from src.application.enums import BalancingStrategyEnum
+from src.application.strategies import (
+    AdaptiveRatioStrategy,
+    BalancingStrategy,
+    ConsistentHashStrategy,
+    CounterRepositoryFactory,
+    NthRequestStrategy,
+    ScriptedNthRequestStrategy,
+)
+from src.core.hashing import RendezvousHasher
+from src.core.rates import CounterRateEstimator
+from src.core.selectors import WeightedSelector
+from src.domain.health import TargetHealthRegistry
+from src.domain.repositories import (
+    BalancingDecisionRepository,
+    BaseCrudRepository,
+    CdnRequestCounterRepository,
+)
+from src.domain.schemas import CdnServer, OriginServer
+
+
+class StrategyParts(abc.ABC):
+    """
+    Части стратегий балансировки: сборка берёт только то, что нужно
+    выбранной стратегии. Задан либо counter_repo (сервер запроса), либо
+    counter_repo_factory (в запросах встречаются разные сервера)
+    """
+
+    @property
+    @abc.abstractmethod
+    def cdn_repo(self) -> BaseCrudRepository[CdnServer]:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def origin_repo(self) -> BaseCrudRepository[OriginServer]:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def cached_cdn_repo(self) -> BaseCrudRepository[CdnServer]:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def cached_origin_repo(self) -> BaseCrudRepository[OriginServer]:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def counter_repo(self) -> CdnRequestCounterRepository | None:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def counter_repo_factory(self) -> CounterRepositoryFactory | None:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def decision_repo(self) -> BalancingDecisionRepository:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def cdn_selector(self) -> WeightedSelector[str] | None:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def cdn_hasher(self) -> RendezvousHasher[str] | None:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def health(self) -> TargetHealthRegistry | None:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def rates(self) -> CounterRateEstimator:
+        pass
+
+
+def _build_nth_request_strategy(
+    settings: BalancerSettings, parts: StrategyParts
+) -> BalancingStrategy:
+    return NthRequestStrategy(
+        cdn_repo=parts.cdn_repo,
+        origin_repo=parts.origin_repo,
+        counter_repo=parts.counter_repo,
+        cdn_selector=parts.cdn_selector,
+        health=parts.health,
+        counter_repo_factory=parts.counter_repo_factory,
+    )
+
+
+def _build_scripted_nth_request_strategy(
+    settings: BalancerSettings, parts: StrategyParts
+) -> BalancingStrategy:
+    # Скрипт сам читает настройки из Redis, а при промахе заполняем кеш
+    # через кеширующие репозитории
+    return ScriptedNthRequestStrategy(
+        cdn_repo=parts.cached_cdn_repo,
+        origin_repo=parts.cached_origin_repo,
+        decision_repo=parts.decision_repo,
+        cdn_selector=parts.cdn_selector,
+        health=parts.health,
+    )
+
+
+def _build_consistent_hash_strategy(
+    settings: BalancerSettings, parts: StrategyParts
+) -> BalancingStrategy:
+    return ConsistentHashStrategy(
+        cdn_repo=parts.cdn_repo,
+        origin_repo=parts.origin_repo,
+        cdn_hasher=parts.cdn_hasher,
+        health=parts.health,
+    )
+
+
+def _build_adaptive_ratio_strategy(
+    settings: BalancerSettings, parts: StrategyParts
+) -> BalancingStrategy:
+    return AdaptiveRatioStrategy(
+        cdn_repo=parts.cdn_repo,
+        origin_repo=parts.origin_repo,
+        counter_repo=parts.counter_repo,
+        rates=parts.rates,
+        utilization=settings.ADAPTIVE_RATIO_UTILIZATION,
+        cdn_selector=parts.cdn_selector,
+        health=parts.health,
+        counter_repo_factory=parts.counter_repo_factory,
+    )
+
+
+StrategyBuilder = Callable[[BalancerSettings, StrategyParts], BalancingStrategy]
+
+STRATEGY_BUILDERS: dict[BalancingStrategyEnum, StrategyBuilder] = {
+    BalancingStrategyEnum.NTH_REQUEST: _build_nth_request_strategy,
+    BalancingStrategyEnum.SCRIPTED_NTH_REQUEST: _build_scripted_nth_request_strategy,
+    BalancingStrategyEnum.CONSISTENT_HASH: _build_consistent_hash_strategy,
+    BalancingStrategyEnum.ADAPTIVE_RATIO: _build_adaptive_ratio_strategy,
+}
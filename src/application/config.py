@@ -0,0 +1,52 @@
+from pydantic import BaseModel
+
+from src.application.enums import BalancingStrategyEnum
+from src.core.config import BaseSettings
+
+
+class BalancerSettings(BaseSettings):
+    BALANCING_STRATEGY: BalancingStrategyEnum = BalancingStrategyEnum.NTH_REQUEST
+    # Сколько URL можно разрешить одним запросом POST /resolve
+    BATCH_RESOLVE_MAX_URLS: int = 1000
+    # GET / мимо графа зависимостей FastAPI: сервис балансировки на воркер
+    REDIRECT_FAST_PATH_ENABLED: bool = False
+    # Бюджет времени на вызовы Redis и БД при решении о перенаправлении (сек),
+    # 0 - без ограничения. Не уложились - запрос уходит на CDN
+    REQUEST_DEADLINE: float = 0.5
+    # ADAPTIVE_RATIO: окно оценки частоты запросов к origin (сек) и доля
+    # capacity origin, до которой его можно загружать
+    ADAPTIVE_RATIO_WINDOW: float = 5.0
+    ADAPTIVE_RATIO_UTILIZATION: float = 0.9
+
+
+class RewriteRuleConfig(BaseModel):
+    host_pattern: str
+    cdn_url_template: str
+
+
+class UrlRewriteSettings(BaseSettings):
+    # Правила переписывания origin URL в CDN URL (JSON-список), первое подходящее
+    URL_REWRITE_RULES: list[RewriteRuleConfig] = [
+        RewriteRuleConfig(
+            host_pattern=r"^(?P<server>s\d+)\.",
+            cdn_url_template="http://{cdn_host}/{server}{path}",
+        )
+    ]
+    # Сколько последних разобранных URL держать в памяти воркера
+    URL_REWRITE_CACHE_SIZE: int = 10_000
+
+
+class ManifestSettings(BaseSettings):
+    # Хост origin сервера по его имени (например, "{name}.origin.com"): манифест
+    # читается только с него, пусто - переписывание манифестов выключено
+    MANIFEST_ORIGIN_HOST_TEMPLATE: str = ""
+    MANIFEST_ORIGIN_SCHEME: str = "http"
+    # Таймаут подключения к origin и ожидания каждой строки манифеста (сек)
+    MANIFEST_FETCH_TIMEOUT: float = 5.0
+    # Сколько строк манифеста переписывать и отдавать за раз
+    MANIFEST_REWRITE_BATCH_LINES: int = 64
+    # Сколько держать переписанный манифест в памяти воркера (сек), 0 - не держать
+    MANIFEST_CACHE_TTL: float = 2.0
+    MANIFEST_CACHE_MAX_ENTRIES: int = 1000
+    # Манифесты больше этого размера (байт) не кешируются
+    MANIFEST_CACHE_MAX_BYTES: int = 1_048_576
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Sequence
+
+from src.core.metrics import DECISION_LOG_RECORDS
+from src.domain.enums import ResourceTypeEnum
+from src.domain.repositories import DecisionLogRepository
+from src.domain.schemas import DecisionLogRecord, TargetResource, VideoRequest
+
+logger = logging.getLogger(__name__)
+
+WRITTEN = DECISION_LOG_RECORDS.labels("written")
+DROPPED = DECISION_LOG_RECORDS.labels("dropped")
+FAILED = DECISION_LOG_RECORDS.labels("failed")
+
+# Решение в очереди: unix time, имя сервера, куда ушёл запрос
+PendingDecision = tuple[float, str, ResourceTypeEnum]
+
+
+class DecisionLog:
+    """
+    Журнал решений о перенаправлении. Запрос только кладёт решение в очередь
+    воркера (без ожидания и ввода-вывода), а фоновая задача run() пишет
+    очередь в репозиторий пачками по batch_size записей - как только
+    набралась пачка или раз в flush_interval секунд.
+
+    Очередь ограничена max_pending записями: если запись не успевает,
+    новые решения отбрасываются (и считаются), а пачка, которую не удалось
+    записать, не повторяется - журнал не должен влиять на балансировку
+    """
+
+    def __init__(
+        self,
+        repository: DecisionLogRepository,
+        max_pending: int,
+        batch_size: int,
+        flush_interval: float,
+    ) -> None:
+        self._repository = repository
+        self._max_pending = max_pending
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._pending: list[PendingDecision] = []
+        self._batch_ready = asyncio.Event()
+
+    def record(self, request: VideoRequest, target: TargetResource) -> None:
+        pending = self._pending
+
+        if len(pending) >= self._max_pending:
+            DROPPED.inc()
+            return
+
+        pending.append((time.time(), request.server_name, target.type))
+
+        if len(pending) >= self._batch_size:
+            self._batch_ready.set()
+
+    def record_many(
+        self, requests: Sequence[VideoRequest], targets: Sequence[TargetResource]
+    ) -> None:
+        for request, target in zip(requests, targets):
+            self.record(request, target)
+
+    async def flush(self) -> None:
+        # Новые решения копятся в новой очереди, пока пишется эта
+        pending, self._pending = self._pending, []
+        self._batch_ready.clear()
+
+        for start in range(0, len(pending), self._batch_size):
+            batch = [
+                DecisionLogRecord(
+                    created_at=datetime.fromtimestamp(created_at, timezone.utc),
+                    server_name=server_name,
+                    type=resource_type,
+                )
+                for created_at, server_name, resource_type in pending[
+                    start : start + self._batch_size
+                ]
+            ]
+
+            try:
+                await self._repository.write_many(batch)
+
+            except Exception as ex:
+                FAILED.inc(len(batch))
+                logger.warning("decision log batch of %s lost: %r", len(batch), ex)
+
+            else:
+                WRITTEN.inc(len(batch))
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self._flush_interval)
+            except TimeoutError:
+                pass
+
+            await self.flush()
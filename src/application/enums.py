@@ -0,0 +1,15 @@
+from enum import auto
+
+from src.core.enums import AutoStrEnum
+
+
+class BalancingStrategyEnum(AutoStrEnum):
+    NTH_REQUEST = auto()
+    SCRIPTED_NTH_REQUEST = auto()
+    CONSISTENT_HASH = auto()
+    ADAPTIVE_RATIO = auto()
+
+
+class ManifestFormatEnum(AutoStrEnum):
+    HLS = auto()
+    DASH = auto()
@@ -0,0 +1,213 @@
+import html
+import re
+import time
+from collections import OrderedDict
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Sequence
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from xml.sax.saxutils import escape
+
+from src.application.enums import ManifestFormatEnum
+from src.application.rewrite import UrlRewriter
+from src.domain.schemas import TargetResource, VideoRequest
+
+MEDIA_TYPES = {
+    ManifestFormatEnum.HLS: "application/vnd.apple.mpegurl",
+    ManifestFormatEnum.DASH: "application/dash+xml",
+}
+
+# HLS: адрес в атрибуте тега (#EXT-X-KEY, #EXT-X-MAP, #EXT-X-MEDIA ...)
+HLS_URI_ATTRIBUTE = re.compile(r'URI="([^"]+)"')
+# DASH: базовые адреса и адреса сегментов из SegmentList. Шаблоны
+# SegmentTemplate ($Number$ и т.п.) - не адреса, они разрешаются от BaseURL
+DASH_URI = re.compile(
+    r"(?<=<BaseURL>)([^<]+)(?=</BaseURL>)|(?<=\smedia=\")([^\"$]+)(?=\")"
+    r"|(?<=\ssourceURL=\")([^\"$]+)(?=\")"
+)
+
+Resolver = Callable[[Sequence[VideoRequest]], Awaitable[list[TargetResource]]]
+
+
+def manifest_format(path: str) -> ManifestFormatEnum | None:
+    if path.endswith(".m3u8"):
+        return ManifestFormatEnum.HLS
+
+    if path.endswith(".mpd"):
+        return ManifestFormatEnum.DASH
+
+    return None
+
+
+def origin_manifest_url(
+    video_request: VideoRequest, host_template: str, scheme: str
+) -> str:
+    """
+    Адрес манифеста на origin сервере запроса: хост собирается по шаблону
+    из имени сервера, из URL клиента берутся только путь и параметры.
+    URL с другим хостом или портом отклоняется (ValueError) - балансировщик
+    ходит только на свои origin сервера
+    """
+    parsed_url = urlsplit(video_request.url)
+    origin_host = host_template.format(name=video_request.server_name)
+
+    if parsed_url.netloc.lower() != origin_host.lower():
+        raise ValueError("%s не является origin сервером" % parsed_url.netloc)
+
+    return urlunsplit((scheme, origin_host, parsed_url.path, parsed_url.query, ""))
+
+
+class ManifestRewriter:
+    """
+    Переписывает адреса сегментов в манифесте HLS/DASH на CDN или origin
+    потоково: строки обрабатываются пачками по batch_lines, решения по пачке
+    принимаются одним вызовом resolve (как в пакетном POST /resolve), и пачка
+    сразу отдаётся клиенту - память не зависит от размера манифеста.
+
+    Относительные адреса разрешаются от адреса манифеста (в DASH - от
+    последнего встреченного BaseURL). Адреса, которые не подходят ни под одно
+    правило переписывания, остаются как есть
+    """
+
+    def __init__(
+        self, url_rewriter: UrlRewriter, resolve: Resolver, batch_lines: int
+    ) -> None:
+        self._url_rewriter = url_rewriter
+        self._resolve = resolve
+        self._batch_lines = batch_lines
+
+    async def rewrite(
+        self,
+        manifest_url: str,
+        manifest_format: ManifestFormatEnum,
+        lines: AsyncIterable[bytes],
+    ) -> AsyncIterator[bytes]:
+        batch: list[str] = []
+        # Адрес, от которого разрешаются относительные адреса
+        base_url = manifest_url
+
+        async for line in lines:
+            batch.append(line.decode(errors="surrogateescape"))
+
+            if len(batch) >= self._batch_lines:
+                chunk, base_url = await self._rewrite_batch(
+                    base_url, manifest_format, batch
+                )
+                yield chunk
+                batch = []
+
+        if batch:
+            chunk, _ = await self._rewrite_batch(base_url, manifest_format, batch)
+            yield chunk
+
+    async def _rewrite_batch(
+        self, base_url: str, manifest_format: ManifestFormatEnum, lines: list[str]
+    ) -> tuple[bytes, str]:
+        # Позиции адресов: (строка, начало, конец, запрос)
+        spans: list[tuple[int, int, int, VideoRequest]] = []
+
+        for index, line in enumerate(lines):
+            for start, end, uri, is_base in _find_uris(line, manifest_format):
+                if manifest_format is ManifestFormatEnum.DASH:
+                    uri = html.unescape(uri)
+
+                url = urljoin(base_url, uri)
+
+                if is_base:
+                    base_url = url
+
+                try:
+                    request = self._url_rewriter.parse(url)
+                except ValueError:
+                    continue
+
+                spans.append((index, start, end, request))
+
+        if not spans:
+            return _encode(lines), base_url
+
+        targets = await self._resolve([request for *_, request in spans])
+
+        # С конца строки, чтобы не сдвигать позиции следующих замен
+        for (index, start, end, _), target in reversed(list(zip(spans, targets))):
+            url = target.url
+
+            if manifest_format is ManifestFormatEnum.DASH:
+                url = escape(url, {'"': "&quot;"})
+
+            line = lines[index]
+            lines[index] = line[:start] + url + line[end:]
+
+        return _encode(lines), base_url
+
+
+def _encode(lines: list[str]) -> bytes:
+    return "".join(lines).encode(errors="surrogateescape")
+
+
+def _find_uris(
+    line: str, manifest_format: ManifestFormatEnum
+) -> list[tuple[int, int, str, bool]]:
+    """
+    Адреса в строке: (начало, конец, адрес, это BaseURL)
+    """
+    if manifest_format is ManifestFormatEnum.DASH:
+        return [
+            (match.start(), match.end(), match.group(), match.lastindex == 1)
+            for match in DASH_URI.finditer(line)
+        ]
+
+    stripped = line.strip()
+
+    if not stripped:
+        return []
+
+    # Строка без # - адрес сегмента или вложенного плейлиста
+    if not stripped.startswith("#"):
+        start = line.index(stripped)
+        return [(start, start + len(stripped), stripped, False)]
+
+    return [
+        (match.start(1), match.end(1), match.group(1), False)
+        for match in HLS_URI_ATTRIBUTE.finditer(line)
+    ]
+
+
+class ManifestCache:
+    """
+    Переписанные манифесты на короткое время (в памяти воркера): живой
+    плейлист запрашивают все его зрители, а меняется он раз в сегмент.
+    Манифесты больше max_bytes не кешируются
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int) -> None:
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return None
+
+        expires_at, body = entry
+
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+
+        return body
+
+    def put(self, key: str, body: bytes) -> None:
+        if not self._ttl or len(body) > self._max_bytes:
+            return
+
+        self._entries[key] = (time.monotonic() + self._ttl, body)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
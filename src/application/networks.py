@@ -0,0 +1,87 @@
+from typing import Callable, Collection, Mapping
+
+from src.core.metrics import NETWORK_ROUTES
+from src.core.prefixes import PrefixTable
+from src.domain.enums import ResourceTypeEnum
+from src.domain.health import TargetHealthRegistry
+from src.domain.schemas import ClientNetwork, TargetResource, VideoRequest
+
+ORIGIN_ROUTES = NETWORK_ROUTES.labels("origin")
+REGIONAL_CDN_ROUTES = NETWORK_ROUTES.labels("regional_cdn")
+
+
+class NetworkRouter:
+    """
+    Поправка решения стратегии по сети клиента. Клиентов из регионов
+    и автономных систем рядом с origin отправляем сразу на origin (если он
+    доступен), остальных - на хост CDN их региона, если он задан и доступен.
+    Сеть ищется в таблице префиксов, которую отдаёт table() (таблица может
+    смениться между запросами); клиент вне таблицы получает решение
+    стратегии как есть
+    """
+
+    def __init__(
+        self,
+        table: Callable[[], PrefixTable[ClientNetwork]],
+        region_cdn_hosts: Mapping[str, str],
+        origin_regions: Collection[str] = (),
+        origin_asns: Collection[int] = (),
+        health: TargetHealthRegistry | None = None,
+    ):
+        self._table = table
+        self._region_cdn_hosts = dict(region_cdn_hosts)
+        self._origin_regions = frozenset(origin_regions)
+        self._origin_asns = frozenset(origin_asns)
+        self._health = health
+
+    def network(self, client_address: str | None) -> ClientNetwork | None:
+        if not client_address:
+            return None
+
+        return self._table().lookup(client_address)
+
+    def route_key(self, network: ClientNetwork | None) -> str | None:
+        """
+        Какую поправку получат решения для клиентов сети: "origin", регион
+        с собственным хостом CDN или None - решения стратегии как есть.
+        Клиенты с одним ключом получают одинаковые адреса (например,
+        в кешируемых манифестах)
+        """
+        if network is None:
+            return None
+
+        if network.region in self._origin_regions or network.asn in self._origin_asns:
+            return ResourceTypeEnum.ORIGIN.name
+
+        if network.region in self._region_cdn_hosts:
+            return "%s:%s" % (ResourceTypeEnum.CDN.name, network.region)
+
+        return None
+
+    def route(
+        self, request: VideoRequest, target: TargetResource, network: ClientNetwork
+    ) -> TargetResource:
+        health = self._health
+
+        if network.region in self._origin_regions or network.asn in self._origin_asns:
+            if target.type is ResourceTypeEnum.ORIGIN or (
+                health is not None
+                and not health.is_origin_available(request.server_name)
+            ):
+                return target
+
+            ORIGIN_ROUTES.inc()
+            return TargetResource(type=ResourceTypeEnum.ORIGIN, url=request.url)
+
+        if target.type is not ResourceTypeEnum.CDN:
+            return target
+
+        cdn_host = self._region_cdn_hosts.get(network.region)
+
+        if cdn_host is None or (
+            health is not None and not health.is_cdn_available(cdn_host)
+        ):
+            return target
+
+        REGIONAL_CDN_ROUTES.inc()
+        return TargetResource(type=ResourceTypeEnum.CDN, url=request.cdn_url(cdn_host))
@@ -0,0 +1,91 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Sequence
+from urllib.parse import urlsplit
+
+from src.domain.schemas import VideoRequest
+
+CDN_HOST_PLACEHOLDER = "{cdn_host}"
+
+
+@dataclass(slots=True, frozen=True)
+class RewriteRule:
+    """
+    Правило переписывания origin URL в CDN URL.
+
+    host_pattern - регулярное выражение для хоста origin с группой server
+    (или первой группой) - именем сервера; cdn_url_template - шаблон адреса
+    на CDN, поля: {cdn_host}, {server}, {scheme}, {host}, {path}
+    """
+
+    host_pattern: re.Pattern
+    cdn_url_prefix: str
+    cdn_url_suffix: str
+
+    @classmethod
+    def compile(cls, host_pattern: str, cdn_url_template: str) -> "RewriteRule":
+        if cdn_url_template.count(CDN_HOST_PLACEHOLDER) != 1:
+            raise ValueError(
+                "Шаблон CDN URL должен содержать %s ровно один раз"
+                % CDN_HOST_PLACEHOLDER
+            )
+
+        try:
+            pattern = re.compile(host_pattern)
+        except re.error as ex:
+            raise ValueError("Некорректный шаблон хоста: %s" % ex) from ex
+
+        if not pattern.groups:
+            raise ValueError("В шаблоне хоста нет группы с именем сервера")
+
+        prefix, suffix = cdn_url_template.split(CDN_HOST_PLACEHOLDER)
+
+        return cls(
+            host_pattern=pattern,
+            cdn_url_prefix=prefix,
+            cdn_url_suffix=suffix,
+        )
+
+
+class UrlRewriter:
+    """
+    Разбирает URL видео по заранее скомпилированным правилам (первое
+    подходящее) в неизменяемый VideoRequest. Результаты для недавних URL
+    хранятся в ограниченном LRU кеше - популярные видео не разбираются заново
+    """
+
+    def __init__(self, rules: Sequence[RewriteRule], cache_size: int) -> None:
+        self._rules = tuple(rules)
+        self.parse = lru_cache(maxsize=cache_size)(self._parse)
+
+    def _parse(self, video_url: str) -> VideoRequest:
+        parsed_url = urlsplit(video_url)
+        host = parsed_url.hostname
+
+        if not host:
+            raise ValueError("Не смогли получить хост из URL")
+
+        for rule in self._rules:
+            match = rule.host_pattern.match(host)
+
+            if match is None:
+                continue
+
+            fields = {
+                "server": match.groupdict().get("server") or match.group(1),
+                "scheme": parsed_url.scheme,
+                "host": host,
+                "path": parsed_url.path or "",
+            }
+
+            return VideoRequest(
+                url=video_url,
+                host=host,
+                server_name=fields["server"],
+                path=fields["path"],
+                cdn_url_prefix=rule.cdn_url_prefix.format(**fields),
+                cdn_url_suffix=rule.cdn_url_suffix.format(**fields),
+            )
+
+        raise ValueError(f"Некорректный формат хоста: {host}")
@@ -1,11 +1,67 @@
-from src.domain.schemas import TargetResource
+from typing import Sequence
 
+from src.core.deadline import RequestDeadline
+from src.domain.schemas import TargetResource, VideoRequest
+
+from .decision_log import DecisionLog
+from .networks import NetworkRouter
 from .strategies import BalancingStrategy
 
 
 class BalancerService:
-    def __init__(self, strategy: BalancingStrategy):
+    """
+    Решения о перенаправлении; вызовы Redis и БД внутри укладываются
+    в бюджет deadline секунд на запрос (0 - без ограничения). С network_router
+    решение поправляется по адресу клиента. Принятые решения попадают
+    в журнал decision_log, если он задан
+    """
+
+    def __init__(
+        self,
+        strategy: BalancingStrategy,
+        deadline: float = 0,
+        decision_log: DecisionLog | None = None,
+        network_router: NetworkRouter | None = None,
+    ):
         self._strategy = strategy
+        self._deadline = deadline
+        self._decision_log = decision_log
+        self._network_router = network_router
+
+    async def get_redirect_address(
+        self, request: VideoRequest, client_address: str | None = None
+    ) -> TargetResource:
+        with RequestDeadline(self._deadline):
+            target = await self._strategy.get_target_resource(request)
+
+        if self._network_router is not None:
+            network = self._network_router.network(client_address)
+
+            if network is not None:
+                target = self._network_router.route(request, target, network)
+
+        if self._decision_log is not None:
+            self._decision_log.record(request, target)
+
+        return target
+
+    async def get_redirect_addresses(
+        self, requests: Sequence[VideoRequest], client_address: str | None = None
+    ) -> list[TargetResource]:
+        with RequestDeadline(self._deadline):
+            targets = await self._strategy.get_target_resources(requests)
+
+        # Пакет приходит от одного клиента - сеть ищем один раз
+        if self._network_router is not None:
+            network = self._network_router.network(client_address)
+
+            if network is not None:
+                targets = [
+                    self._network_router.route(request, target, network)
+                    for request, target in zip(requests, targets)
+                ]
+
+        if self._decision_log is not None:
+            self._decision_log.record_many(requests, targets)
 
-    async def get_redirect_address(self, source_address: str) -> TargetResource:
-        return await self._strategy.get_target_resource(source_address)
+        return targets
@@ -1,35 +1,81 @@
-import re
+import asyncio
+import math
 from abc import ABC, abstractmethod
-from urllib.parse import urlparse
+from collections import defaultdict
+from typing import Callable, Sequence
 
 from redis import asyncio as aioredis
 
-from src.core.utils import extract_server_name_from_url
+from src.core.hashing import RendezvousHasher, hash_fraction, stable_hash
+from src.core.metrics import ORIGIN_OVERFLOWS, REDIS_FALLBACKS, STAGE_SECONDS
+from src.core.rates import CounterRateEstimator
+from src.core.selectors import WeightedSelector
 from src.domain.enums import ResourceTypeEnum
-from src.domain.repositories import BaseCrudRepository, CdnRequestCounterRepository
-from src.domain.schemas import TargetResource, CdnServer, OriginServer
+from src.domain.health import TargetHealthRegistry
+from src.domain.repositories import (
+    BalancingDecisionRepository,
+    BaseCrudRepository,
+    CdnRequestCounterRepository,
+)
+from src.domain.schemas import (
+    BalancingDecision,
+    CdnServer,
+    OriginServer,
+    TargetResource,
+    VideoRequest,
+)
+
+COUNTER_INCREMENT_SECONDS = STAGE_SECONDS.labels("counter_increment")
+REDIS_FALLBACK = REDIS_FALLBACKS.labels()
+ORIGIN_OVERFLOW = ORIGIN_OVERFLOWS.labels()
+
+# Ошибки Redis и истёкший бюджет запроса (см. RequestDeadline): решение
+# принимается без них
+DEPENDENCY_ERRORS = (aioredis.RedisError, TimeoutError)
+
+# Счётчик запросов по имени сервера (для пакетов с разными серверами)
+CounterRepositoryFactory = Callable[[str], CdnRequestCounterRepository]
 
 
 class BalancingStrategy(ABC):
     @abstractmethod
-    async def get_target_resource(self, video_url: str) -> TargetResource:
+    async def get_target_resource(self, request: VideoRequest) -> TargetResource:
         pass
 
+    async def get_target_resources(
+        self, requests: Sequence[VideoRequest]
+    ) -> list[TargetResource]:
+        """
+        Решения для пакета запросов, в порядке запросов (по умолчанию - по одному)
+        """
+        return [await self.get_target_resource(request) for request in requests]
+
 
 class NthRequestStrategy(BalancingStrategy):
-    ORIGIN_HOST_PATTERN = re.compile(r"^(s\d+)\.")
 
     def __init__(
         self,
         cdn_repo: BaseCrudRepository[CdnServer],
         origin_repo: BaseCrudRepository[OriginServer],
-        counter_repo: CdnRequestCounterRepository,
+        counter_repo: CdnRequestCounterRepository | None,
+        cdn_selector: WeightedSelector[str] | None = None,
+        health: TargetHealthRegistry | None = None,
+        counter_repo_factory: CounterRepositoryFactory | None = None,
     ):
         self._cdn_repo = cdn_repo
         self._origin_repo = origin_repo
         self._counter_repo = counter_repo
+        self._cdn_selector = cdn_selector
+        self._health = health
+        self._counter_repo_factory = counter_repo_factory
 
-    async def get_target_resource(self, video_url: str) -> TargetResource:
+    def _counter(self, server_name: str) -> CdnRequestCounterRepository:
+        if self._counter_repo_factory is not None:
+            return self._counter_repo_factory(server_name)
+
+        return self._counter_repo
+
+    async def get_target_resource(self, request: VideoRequest) -> TargetResource:
         cdn_settings = await self._cdn_repo.read()
 
         if cdn_settings is None:
@@ -37,49 +83,365 @@ class NthRequestStrategy(BalancingStrategy):
 
         try:
             # Получаем данные о сервере (БД или кеш)
-            server_name = extract_server_name_from_url(video_url)
-            server_settings = await self._origin_repo.read(name=server_name)
+            server_settings = await self._origin_repo.read(name=request.server_name)
 
             # Каждый N - ный запрос отдаём в оригинальный URL
-            counter_value = await self._counter_repo.increment()
+            with COUNTER_INCREMENT_SECONDS.time():
+                counter_value = await self._counter(request.server_name).increment()
 
             ratio: int = (
                 getattr(server_settings, "redirecting_ratio", None)
                 or cdn_settings.default_redirecting_ratio
             )
 
-            if not counter_value % ratio:
-                return TargetResource(type=ResourceTypeEnum.ORIGIN, url=video_url)
+            return self._target(
+                request,
+                to_origin=self._to_origin(
+                    request.server_name, server_settings, ratio, counter_value
+                ),
+                cdn_host=cdn_settings.host_name,
+            )
+
+        # Redis свалился или бюджет запроса исчерпан - прокидываем через CDN
+        except DEPENDENCY_ERRORS:
+            REDIS_FALLBACK.inc()
+            return self._target(request, False, cdn_settings.host_name)
+
+    async def get_target_resources(
+        self, requests: Sequence[VideoRequest]
+    ) -> list[TargetResource]:
+        """
+        Пакет решается по серверам: настройки читаются один раз, а значения
+        счётчика сервера берутся на все его запросы сразу (одним INCRBY)
+        """
+        # Счётчик привязан к серверу одного запроса
+        if self._counter_repo_factory is None:
+            return await super().get_target_resources(requests)
+
+        cdn_settings = await self._cdn_repo.read()
+
+        if cdn_settings is None:
+            raise ValueError("Отсутствует установленный CDN")
 
-            return TargetResource(
-                type=ResourceTypeEnum.CDN,
-                url=self._build_cdn_url(video_url, cdn_settings.host_name),
+        groups: defaultdict[str, list[int]] = defaultdict(list)
+
+        for index, request in enumerate(requests):
+            groups[request.server_name].append(index)
+
+        # Настройки читаем по очереди: промах кеша идёт в одну сессию БД
+        ratios: dict[str, int] = {}
+        servers: dict[str, OriginServer | None] = {}
+
+        for server_name in groups:
+            try:
+                server_settings = await self._origin_repo.read(name=server_name)
+            except DEPENDENCY_ERRORS:
+                continue
+
+            servers[server_name] = server_settings
+            ratios[server_name] = (
+                getattr(server_settings, "redirecting_ratio", None)
+                or cdn_settings.default_redirecting_ratio
             )
 
-        # Redis свалился - прокидываем через CDN
-        except aioredis.RedisError:
-            return TargetResource(
-                ResourceTypeEnum.CDN,
-                url=self._build_cdn_url(video_url, cdn_settings.host_name),
+        # Счётчики разных серверов резервируем параллельно
+        with COUNTER_INCREMENT_SECONDS.time():
+            reserved = await asyncio.gather(
+                *(
+                    self._counter(server_name).reserve(len(indexes))
+                    for server_name, indexes in groups.items()
+                    if server_name in ratios
+                ),
+                return_exceptions=True,
             )
 
-        # Неизвестная ошибка - кидаем оригинальный URL
-        except (ValueError, IndexError):
-            return TargetResource(type=ResourceTypeEnum.ORIGIN, url=video_url)
+        targets: list[TargetResource | None] = [None] * len(requests)
+        values_by_server = dict(zip(ratios, reserved))
+
+        for server_name, indexes in groups.items():
+            values = values_by_server.get(server_name)
+
+            if isinstance(values, BaseException) and not isinstance(
+                values, aioredis.RedisError
+            ):
+                raise values
+
+            # Redis свалился - прокидываем через CDN
+            if values is None or isinstance(values, aioredis.RedisError):
+                REDIS_FALLBACK.inc(len(indexes))
+
+                for index in indexes:
+                    targets[index] = self._target(
+                        requests[index], False, cdn_settings.host_name
+                    )
+
+                continue
+
+            ratio = ratios[server_name]
+            server_settings = servers[server_name]
+
+            for index, value in zip(indexes, values):
+                targets[index] = self._target(
+                    requests[index],
+                    to_origin=self._to_origin(
+                        server_name, server_settings, ratio, value
+                    ),
+                    cdn_host=cdn_settings.host_name,
+                )
 
-    def _build_cdn_url(self, origin_url: str, cdn_host: str) -> str:
-        parsed_url = urlparse(origin_url)
+        return targets
 
-        if not parsed_url.hostname:
-            raise ValueError("Не смогли получить хост из URL")
+    def _to_origin(
+        self,
+        server_name: str,
+        server_settings: OriginServer | None,
+        ratio: int,
+        counter_value: int,
+    ) -> bool:
+        return not counter_value % ratio
+
+    def _target(
+        self, request: VideoRequest, to_origin: bool, cdn_host: str
+    ) -> TargetResource:
+        # Если заведено несколько хостов CDN - выбираем по весам,
+        # иначе используем хост из настроек CDN
+        if self._cdn_selector is not None:
+            cdn_host = self._cdn_selector.select()
+
+        # Недоступный origin заменяем на CDN, недоступный CDN - на живой origin
+        if self._health is not None:
+            origin_available = self._health.is_origin_available(request.server_name)
+
+            if to_origin:
+                to_origin = origin_available
+            elif origin_available and not self._health.is_cdn_available(cdn_host):
+                to_origin = True
+
+        if to_origin:
+            return TargetResource(type=ResourceTypeEnum.ORIGIN, url=request.url)
+
+        # Шаблон адреса уже разобран правилом переписывания URL
+        return TargetResource(type=ResourceTypeEnum.CDN, url=request.cdn_url(cdn_host))
+
+
+class AdaptiveRatioStrategy(NthRequestStrategy):
+    """
+    "Каждый N-ный запрос на origin", но N не даёт origin получить больше
+    utilization * capacity запросов в секунду: частота запросов к серверу
+    оценивается по значениям его счётчика за скользящее окно, и при росте
+    нагрузки N увеличивается до ceil(частота / допустимая нагрузка) -
+    лишнее уходит на CDN. Без capacity у сервера - обычное правило.
+
+    Счётчик общий для всех воркеров, поэтому и частота - общая
+    (для SHARED_MEMORY - по хосту)
+    """
+
+    def __init__(
+        self,
+        cdn_repo: BaseCrudRepository[CdnServer],
+        origin_repo: BaseCrudRepository[OriginServer],
+        counter_repo: CdnRequestCounterRepository | None,
+        rates: CounterRateEstimator,
+        utilization: float = 1.0,
+        cdn_selector: WeightedSelector[str] | None = None,
+        health: TargetHealthRegistry | None = None,
+        counter_repo_factory: CounterRepositoryFactory | None = None,
+    ):
+        super().__init__(
+            cdn_repo=cdn_repo,
+            origin_repo=origin_repo,
+            counter_repo=counter_repo,
+            cdn_selector=cdn_selector,
+            health=health,
+            counter_repo_factory=counter_repo_factory,
+        )
+        self._rates = rates
+        self._utilization = utilization
+
+    def _to_origin(
+        self,
+        server_name: str,
+        server_settings: OriginServer | None,
+        ratio: int,
+        counter_value: int,
+    ) -> bool:
+        capacity = getattr(server_settings, "capacity", None)
+
+        if not capacity:
+            return not counter_value % ratio
+
+        rate = self._rates.observe(server_name, counter_value)
+        effective_ratio = max(ratio, math.ceil(rate / (capacity * self._utilization)))
+
+        if not counter_value % effective_ratio:
+            return True
+
+        # По обычному правилу запрос ушёл бы на origin
+        if not counter_value % ratio:
+            ORIGIN_OVERFLOW.inc()
+
+        return False
+
+
+class ScriptedNthRequestStrategy(NthRequestStrategy):
+    """
+    То же правило "каждый N-ный запрос на origin", но настройки, счётчик и
+    решение обрабатываются одним серверным скриптом Redis (1 запрос вместо 3)
+    """
+
+    def __init__(
+        self,
+        cdn_repo: BaseCrudRepository[CdnServer],
+        origin_repo: BaseCrudRepository[OriginServer],
+        decision_repo: BalancingDecisionRepository,
+        cdn_selector: WeightedSelector[str] | None = None,
+        health: TargetHealthRegistry | None = None,
+    ):
+        self._cdn_repo = cdn_repo
+        self._origin_repo = origin_repo
+        self._decision_repo = decision_repo
+        self._cdn_selector = cdn_selector
+        self._health = health
+
+    async def get_target_resource(self, request: VideoRequest) -> TargetResource:
+        try:
+            decision = await self._decide(request.server_name)
+
+        # Redis свалился или бюджет запроса исчерпан - прокидываем через CDN
+        except DEPENDENCY_ERRORS:
+            REDIS_FALLBACK.inc()
+            cdn_settings = await self._cdn_repo.read()
+
+            if cdn_settings is None:
+                raise ValueError("Отсутствует установленный CDN")
+
+            return self._target(request, False, cdn_settings.host_name)
+
+        if decision is None:
+            raise ValueError("Отсутствует установленный CDN")
+
+        return self._target(
+            request,
+            to_origin=decision.type is ResourceTypeEnum.ORIGIN,
+            cdn_host=decision.cdn_host,
+        )
+
+    async def get_target_resources(
+        self, requests: Sequence[VideoRequest]
+    ) -> list[TargetResource]:
+        # Решение принимает скрипт - по одному запросу
+        return await BalancingStrategy.get_target_resources(self, requests)
+
+    async def _decide(self, server_name: str) -> BalancingDecision | None:
+        decision = await self._decision_repo.decide(server_name)
+
+        if decision is not None:
+            return decision
+
+        # Настроек нет в Redis - читаем через кеширующие репозитории (они положат
+        # настройки в кеш) и повторяем
+        cdn_settings = await self._cdn_repo.read()
+
+        if cdn_settings is None:
+            return None
+
+        server_settings = await self._origin_repo.read(name=server_name)
+        decision = await self._decision_repo.decide(
+            server_name, origin_missing=server_settings is None
+        )
+
+        # Кеш так и не заполнился - ведём себя как при недоступном Redis
+        return decision or BalancingDecision(
+            type=ResourceTypeEnum.CDN, cdn_host=cdn_settings.host_name
+        )
+
+
+class ConsistentHashStrategy(BalancingStrategy):
+    """
+    Решение по хешу объекта (имя сервера + путь) вместо счётчика запросов:
+    один и тот же объект всегда уходит в одно и то же место, что бережёт
+    кеш CDN. На origin попадает доля 1 / redirecting_ratio объектов - тех,
+    у кого хеш меньше этой доли, поэтому при изменении коэффициента
+    переезжают только объекты на границе. Хост CDN выбирается rendezvous
+    хешированием по весам. В Redis стратегия не ходит
+    """
+
+    def __init__(
+        self,
+        cdn_repo: BaseCrudRepository[CdnServer],
+        origin_repo: BaseCrudRepository[OriginServer],
+        cdn_hasher: RendezvousHasher[str] | None = None,
+        health: TargetHealthRegistry | None = None,
+    ):
+        self._cdn_repo = cdn_repo
+        self._origin_repo = origin_repo
+        self._cdn_hasher = cdn_hasher
+        self._health = health
+
+    async def get_target_resource(self, request: VideoRequest) -> TargetResource:
+        cdn_settings = await self._cdn_repo.read()
+
+        if cdn_settings is None:
+            raise ValueError("Отсутствует установленный CDN")
+
+        server_settings = await self._origin_repo.read(name=request.server_name)
+
+        return self._target(request, cdn_settings, server_settings)
+
+    async def get_target_resources(
+        self, requests: Sequence[VideoRequest]
+    ) -> list[TargetResource]:
+        cdn_settings = await self._cdn_repo.read()
+
+        if cdn_settings is None:
+            raise ValueError("Отсутствует установленный CDN")
+
+        # Настройки каждого сервера читаем один раз на пакет
+        servers: dict[str, OriginServer | None] = {}
+
+        for request in requests:
+            if request.server_name not in servers:
+                servers[request.server_name] = await self._origin_repo.read(
+                    name=request.server_name
+                )
+
+        return [
+            self._target(request, cdn_settings, servers[request.server_name])
+            for request in requests
+        ]
+
+    def _target(
+        self,
+        request: VideoRequest,
+        cdn_settings: CdnServer,
+        server_settings: OriginServer | None,
+    ) -> TargetResource:
+        ratio: int = (
+            getattr(server_settings, "redirecting_ratio", None)
+            or cdn_settings.default_redirecting_ratio
+        )
+
+        object_hash = stable_hash(request.server_name + request.path)
+        to_origin = hash_fraction(object_hash) * ratio < 1
+        cdn_host = cdn_settings.host_name
+
+        health = self._health
+
+        if self._cdn_hasher is not None:
+            cdn_host = self._cdn_hasher.select(
+                object_hash, health.is_cdn_available if health is not None else None
+            )
 
-        match = self.ORIGIN_HOST_PATTERN.match(parsed_url.hostname)
+        # Недоступный origin заменяем на CDN, недоступный CDN - на живой origin
+        if health is not None:
+            origin_available = health.is_origin_available(request.server_name)
 
-        if not match:
-            raise ValueError(f"Некорректный формат хоста: {parsed_url.hostname}")
+            if to_origin:
+                to_origin = origin_available
+            elif origin_available and not health.is_cdn_available(cdn_host):
+                to_origin = True
 
-        server_name: str = match.group(1)
-        video_path = parsed_url.path or ""
+        if to_origin:
+            return TargetResource(type=ResourceTypeEnum.ORIGIN, url=request.url)
 
-        # TODO: Тут бы куда-то вынести префикс http/https
-        return f"http://{cdn_host}/{server_name}{video_path}"
+        return TargetResource(type=ResourceTypeEnum.CDN, url=request.cdn_url(cdn_host))
@@ -0,0 +1,55 @@
+"""
+Разовые операции с БД, которые не должны выполняться при старте воркеров:
+
+    python -m src.cli migrate      # миграции схемы до последней версии
+    python -m src.cli seed         # тестовые CDN и origin сервера
+"""
+
+import argparse
+import asyncio
+
+from src import APPLICATION_DIR
+
+ALEMBIC_CONFIG = APPLICATION_DIR.parent / "alembic.ini"
+
+
+def migrate(args: argparse.Namespace) -> None:
+    # Alembic нужен только здесь, воркеры его не импортируют
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(str(ALEMBIC_CONFIG)), args.revision)
+
+
+def seed(args: argparse.Namespace) -> None:
+    from src.infrastructure.database.bootstrap import bootstrap_database
+    from src.infrastructure.database.session import get_async_engine
+
+    async def run():
+        try:
+            await bootstrap_database()
+        finally:
+            await get_async_engine().dispose()
+
+    asyncio.run(run())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="применить миграции")
+    migrate_parser.add_argument("revision", nargs="?", default="head")
+    migrate_parser.set_defaults(handler=migrate)
+
+    seed_parser = commands.add_parser("seed", help="заполнить БД тестовыми данными")
+    seed_parser.set_defaults(handler=seed)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import time
+from enum import auto
+
+from src.core.enums import AutoStrEnum
+
+
+class CircuitStateEnum(AutoStrEnum):
+    CLOSED = auto()
+    OPEN = auto()
+    HALF_OPEN = auto()
+
+
+class CircuitBreaker:
+    """
+    Размыкается после failure_threshold ошибок подряд. Через recovery_timeout
+    секунд переходит в полуоткрытое состояние: первый успех замыкает цепь,
+    ошибка - снова размыкает
+    """
+
+    __slots__ = ("_failure_threshold", "_recovery_timeout", "_failures", "_opened_at")
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float) -> None:
+        self._failure_threshold = failure_threshold
+        self._recovery_timeout = recovery_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+
+    @property
+    def state(self) -> CircuitStateEnum:
+        if self._opened_at is None:
+            return CircuitStateEnum.CLOSED
+
+        if time.monotonic() - self._opened_at >= self._recovery_timeout:
+            return CircuitStateEnum.HALF_OPEN
+
+        return CircuitStateEnum.OPEN
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+    @property
+    def is_open(self) -> bool:
+        return self.state is CircuitStateEnum.OPEN
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+
+        if (
+            self.state is CircuitStateEnum.HALF_OPEN
+            or self._failures >= self._failure_threshold
+        ):
+            self._opened_at = time.monotonic()
@@ -0,0 +1,53 @@
+import asyncio
+import contextlib
+from contextvars import ContextVar, Token
+from typing import AsyncContextManager
+
+# Крайний срок текущего запроса (время цикла событий), None - без срока
+_DEADLINE: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+_NO_DEADLINE = contextlib.nullcontext()
+
+
+class RequestDeadline:
+    """
+    Бюджет времени запроса в секундах (0 - без ограничения): вызовы внутри
+    within_deadline() укладываются в общий крайний срок. Вложенный бюджет
+    не продлевает внешний
+    """
+
+    __slots__ = ("_budget", "_token")
+
+    def __init__(self, budget: float) -> None:
+        self._budget = budget
+        self._token: Token | None = None
+
+    def __enter__(self) -> None:
+        if self._budget <= 0:
+            return
+
+        deadline = asyncio.get_running_loop().time() + self._budget
+        current = _DEADLINE.get()
+
+        if current is not None and current < deadline:
+            deadline = current
+
+        self._token = _DEADLINE.set(deadline)
+
+    def __exit__(self, *exc_info) -> None:
+        if self._token is not None:
+            _DEADLINE.reset(self._token)
+            self._token = None
+
+
+def within_deadline() -> AsyncContextManager:
+    """
+    Таймаут до крайнего срока текущего запроса (TimeoutError). Вне запроса
+    с бюджетом - без ограничения (и без затрат на таймер)
+    """
+    deadline = _DEADLINE.get()
+
+    if deadline is None:
+        return _NO_DEADLINE
+
+    return asyncio.timeout_at(deadline)
@@ -0,0 +1,83 @@
+import math
+from hashlib import blake2b
+from typing import Callable, Sequence
+
+_MASK_64 = (1 << 64) - 1
+_SCALE_64 = float(1 << 64)
+
+
+def stable_hash(key: str) -> int:
+    """
+    64-битный хеш строки, одинаковый во всех воркерах и между перезапусками
+    (встроенный hash() для строк рандомизирован)
+    """
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def hash_fraction(value: int) -> float:
+    """
+    Переводит 64-битный хеш в число из интервала (0, 1)
+    """
+    return (value + 0.5) / _SCALE_64
+
+
+def _mix(value: int) -> int:
+    # Финализатор splitmix64: дешёвое перемешивание хеша ключа с хешем элемента
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return value ^ (value >> 31)
+
+
+class RendezvousHasher[Item]:
+    """
+    Взвешенное rendezvous (HRW) хеширование: ключ закрепляется за элементом
+    с наибольшей оценкой -weight / ln(u), где u - хеш пары (ключ, элемент).
+
+    Доля ключей элемента пропорциональна его весу. При добавлении или
+    удалении элемента переезжают только ключи, которые он забирает или
+    отдаёт; остальные остаются на месте
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items: Sequence[tuple[Item, float]]) -> None:
+        self._items = [
+            (item, stable_hash(str(item)), float(weight))
+            for item, weight in items
+            if weight > 0
+        ]
+
+        if not self._items:
+            raise ValueError("Нет элементов с положительным весом")
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def select(
+        self, key: int, is_available: Callable[[Item], bool] | None = None
+    ) -> Item:
+        """
+        Элемент для хеша ключа. Если задан is_available, недоступные элементы
+        пропускаются (ключ уходит к следующему по оценке), а если недоступны
+        все - возвращается элемент без учёта доступности
+        """
+        best_item = available_item = None
+        best_score = available_score = -math.inf
+
+        for item, item_hash, weight in self._items:
+            score = -weight / math.log(hash_fraction(_mix(key ^ item_hash)))
+
+            if score > best_score:
+                best_item, best_score = item, score
+
+            if (
+                is_available is not None
+                and score > available_score
+                and is_available(item)
+            ):
+                available_item, available_score = item, score
+
+        if available_item is not None:
+            return available_item
+
+        return best_item
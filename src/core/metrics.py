@@ -0,0 +1,356 @@
+import abc
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterator, Mapping
+
+# Границы корзин задержек в секундах: от 100 мкс (GET из Redis) до секунд
+DEFAULT_LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+# Разделители в имени поля выгрузки: метрика, значения меток, ячейка
+FIELD_SEPARATOR = "\x1f"
+LABELS_SEPARATOR = "\x1e"
+
+
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def samples(self) -> Iterator[tuple[str, float]]:
+        yield "value", self.value
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: "HistogramValue") -> None:
+        self._histogram = histogram
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._started)
+
+
+class HistogramValue:
+    """
+    Гистограмма с фиксированными корзинами: наблюдение - это поиск корзины
+    бисекцией и два сложения, без выделения памяти
+    """
+
+    __slots__ = ("_bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self._bounds = bounds
+        # Последняя корзина - +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self._bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def samples(self) -> Iterator[tuple[str, float]]:
+        for index, count in enumerate(self.counts):
+            yield str(index), count
+
+        yield "sum", self.sum
+
+
+class Metric(abc.ABC):
+    """
+    Семейство метрик с набором меток. Значения для конкретных меток лучше
+    получить один раз (labels) и держать в модуле - тогда на запросе остаётся
+    только инкремент
+    """
+
+    type_name: str
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = labels
+        self._values: dict[tuple[str, ...], CounterValue | HistogramValue] = {}
+
+    @abc.abstractmethod
+    def _create_value(self) -> CounterValue | HistogramValue:
+        pass
+
+    def labels(self, *values: str) -> CounterValue | HistogramValue:
+        key = values
+
+        if len(key) != len(self.label_names):
+            raise ValueError("Неверное число меток метрики %s" % self.name)
+
+        if key not in self._values:
+            self._values[key] = self._create_value()
+
+        return self._values[key]
+
+    def samples(self) -> Iterator[tuple[str, float]]:
+        for label_values, value in list(self._values.items()):
+            labels = LABELS_SEPARATOR.join(label_values)
+
+            for cell, sample in value.samples():
+                yield FIELD_SEPARATOR.join((self.name, labels, cell)), sample
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def _create_value(self) -> CounterValue:
+        return CounterValue()
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _create_value(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+
+class MetricsRegistry:
+    """
+    Метрики воркера. Значения накапливаются в памяти, а наружу отдаются
+    плоским словарём "поле -> значение" (samples), который можно сложить
+    с такими же словарями других воркеров и отрисовать в формате Prometheus
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def counter(
+        self, name: str, description: str, labels: tuple[str, ...] = ()
+    ) -> Counter:
+        return self._register(Counter(name, description, labels))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, description, labels, buckets))
+
+    def _register[M: Metric](self, metric: M) -> M:
+        # Повторная регистрация (например, при перезагрузке модуля) отдаёт
+        # уже существующую метрику
+        existing = self._metrics.setdefault(metric.name, metric)
+
+        if type(existing) is not type(metric):
+            raise ValueError("Метрика %s уже зарегистрирована" % metric.name)
+
+        return existing
+
+    def samples(self) -> dict[str, float]:
+        return {
+            field: value
+            for metric in list(self._metrics.values())
+            for field, value in metric.samples()
+        }
+
+    def render(self, samples: Mapping[str, float] | None = None) -> str:
+        """
+        Текстовый формат Prometheus. По умолчанию - значения этого воркера,
+        либо переданные (например, сложенные по всем воркерам)
+        """
+        if samples is None:
+            samples = self.samples()
+
+        grouped: dict[str, dict[str, dict[str, float]]] = defaultdict(
+            lambda: defaultdict(dict)
+        )
+
+        for field, value in samples.items():
+            name, labels, cell = field.split(FIELD_SEPARATOR)
+            grouped[name][labels][cell] = value
+
+        lines: list[str] = []
+
+        for name in sorted(grouped):
+            metric = self._metrics.get(name)
+
+            # Метрика известна только другим воркерам (другая версия кода)
+            if metric is None:
+                continue
+
+            lines.append(f"# HELP {name} {metric.description}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+
+            for labels, cells in sorted(grouped[name].items()):
+                label_pairs = list(
+                    zip(
+                        metric.label_names,
+                        labels.split(LABELS_SEPARATOR) if labels else (),
+                    )
+                )
+
+                if isinstance(metric, Histogram):
+                    lines.extend(_histogram_lines(metric, label_pairs, cells))
+                else:
+                    lines.append(
+                        f"{name}{_format_labels(label_pairs)} "
+                        f"{_format_value(cells.get('value', 0))}"
+                    )
+
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(
+    metric: Histogram, label_pairs: list[tuple[str, str]], cells: dict[str, float]
+) -> Iterator[str]:
+    # Корзины хранятся по отдельности (их удобно складывать), в выгрузке -
+    # нарастающим итогом, как требует формат
+    total = 0.0
+    bounds = [*(_format_value(bound) for bound in metric.buckets), "+Inf"]
+
+    for index, bound in enumerate(bounds):
+        total += cells.get(str(index), 0)
+        labels = _format_labels([*label_pairs, ("le", bound)])
+        yield f"{metric.name}_bucket{labels} {_format_value(total)}"
+
+    labels = _format_labels(label_pairs)
+    yield f"{metric.name}_sum{labels} {_format_value(cells.get('sum', 0))}"
+    yield f"{metric.name}_count{labels} {_format_value(total)}"
+
+
+def _format_labels(label_pairs: list[tuple[str, str]]) -> str:
+    if not label_pairs:
+        return ""
+
+    escaped = (
+        '%s="%s"'
+        % (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in label_pairs
+    )
+    return "{%s}" % ",".join(escaped)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Метрики процесса: модули объявляют свои метрики здесь при импорте
+REGISTRY = MetricsRegistry()
+
+# Задержки этапов обработки запроса на балансировку
+STAGE_SECONDS = REGISTRY.histogram(
+    "balancer_stage_seconds",
+    "Длительность этапов обработки GET /",
+    labels=("stage",),
+)
+
+# Итог запроса на балансировку: ORIGIN, CDN или ERROR
+DECISIONS = REGISTRY.counter(
+    "balancer_decisions_total",
+    "Решения балансировщика",
+    labels=("outcome",),
+)
+
+# Решения, принятые без Redis (входят и в balancer_decisions_total)
+REDIS_FALLBACKS = REGISTRY.counter(
+    "balancer_redis_fallbacks_total",
+    "Решения, принятые без Redis из-за его ошибки или истёкшего бюджета запроса",
+)
+
+# Вызовы Redis и БД, не уложившиеся в бюджет времени запроса
+DEADLINE_EXCEEDED = REGISTRY.counter(
+    "balancer_deadline_exceeded_total",
+    "Вызовы, прерванные по бюджету времени запроса",
+    labels=("dependency",),
+)
+
+# Переходы предохранителя Redis: OPEN (Redis пропускается) и CLOSED
+REDIS_CIRCUIT_CHANGES = REGISTRY.counter(
+    "balancer_redis_circuit_changes_total",
+    "Размыкания и замыкания цепи Redis",
+    labels=("state",),
+)
+
+# Обращения, обслуженные в обход Redis при разомкнутой цепи: значения
+# локального счётчика (counter) и последние известные настройки (settings)
+DEGRADED_REQUESTS = REGISTRY.counter(
+    "balancer_degraded_total",
+    "Обращения, обслуженные без Redis при разомкнутой цепи",
+    labels=("component",),
+)
+
+# Запросы, которые ADAPTIVE_RATIO отправил на CDN из-за capacity origin
+ORIGIN_OVERFLOWS = REGISTRY.counter(
+    "balancer_origin_overflows_total",
+    "Запросы, перенаправленные на CDN сверх пропускной способности origin",
+)
+
+# Записи журнала решений: written (записаны), dropped (очередь переполнена),
+# failed (не удалось записать пачку)
+DECISION_LOG_RECORDS = REGISTRY.counter(
+    "balancer_decision_log_records_total",
+    "Записи журнала решений по итогу",
+    labels=("result",),
+)
+
+# Решения, изменённые по сети клиента: origin (сеть рядом с origin)
+# и regional_cdn (хост CDN региона клиента)
+NETWORK_ROUTES = REGISTRY.counter(
+    "balancer_network_routes_total",
+    "Решения, изменённые по сети клиента",
+    labels=("route",),
+)
+
+# Загрузки таблицы префиксов сетей: loaded (новая таблица), failed (ошибка,
+# остаётся прежняя)
+NETWORK_TABLE_RELOADS = REGISTRY.counter(
+    "balancer_network_table_reloads_total",
+    "Загрузки таблицы префиксов сетей клиентов",
+    labels=("result",),
+)
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "balancer_cache_requests_total",
+    "Обращения к кешу настроек по репозиториям",
+    labels=("repository", "result"),
+)
+
+# Старт воркера: imports (импорт приложения), checks (проверки подключений),
+# ready (от начала импорта до готовности принимать запросы)
+WORKER_STARTUP_SECONDS = REGISTRY.histogram(
+    "balancer_worker_startup_seconds",
+    "Длительность старта воркера по этапам",
+    labels=("phase",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
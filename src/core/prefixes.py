@@ -0,0 +1,194 @@
+import ipaddress
+import socket
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable
+
+# Индексы значений в массиве беззнаковых 32-битных чисел
+_INDEX_TYPECODE = "I" if array("I").itemsize == 4 else "L"
+# Адрес без значения (вне всех префиксов)
+_NO_VALUE = 0
+# IPv4 диапазоны разложены по корзинам старших 16 бит адреса
+_V4_BUCKET_BITS = 16
+# Сколько последних адресов помнит таблица
+CACHE_MAX_ENTRIES = 65_536
+
+_IPV4_MAPPED_PREFIX = "::ffff:"
+
+_AF_INET = socket.AF_INET
+_AF_INET6 = socket.AF_INET6
+_inet_pton = socket.inet_pton
+
+
+class PrefixTable[Value]:
+    """
+    Поиск самого длинного совпавшего префикса IP-сети (longest prefix match).
+    Вложенные префиксы при построении разворачиваются в непересекающиеся
+    диапазоны адресов, поэтому поиск - двоичный поиск по началам диапазонов
+    (bisect на C) без обхода дерева. Для IPv4 он идёт только среди диапазонов
+    корзины старших 16 бит адреса - обычно это несколько сравнений. Начала
+    IPv4 диапазонов и индексы значений лежат в array (4 байта на диапазон),
+    одинаковые значения хранятся один раз.
+
+    Клиент обычно приходит много раз подряд (сегменты одного видео), поэтому
+    последние cache_size адресов запоминаются вместе с ответом - повторный
+    поиск стоит одного обращения к словарю. Таблица неизменяема: для
+    обновления строится новая (с пустым кешем)
+    """
+
+    __slots__ = (
+        "_values",
+        "_v4_starts",
+        "_v4_indexes",
+        "_v4_buckets",
+        "_v6_starts",
+        "_v6_indexes",
+        "_cache",
+        "_cache_size",
+    )
+
+    def __init__(
+        self,
+        prefixes: Iterable[tuple[str, Value]],
+        cache_size: int = CACHE_MAX_ENTRIES,
+    ) -> None:
+        # Нулевой индекс - "нет значения"
+        values: list[Value | None] = [None]
+        value_indexes: dict[Value, int] = {}
+        networks: tuple[list, list] = ([], [])
+
+        for position, (prefix, value) in enumerate(prefixes):
+            network = ipaddress.ip_network(prefix, strict=False)
+            index = value_indexes.get(value)
+
+            if index is None:
+                index = value_indexes[value] = len(values)
+                values.append(value)
+
+            # Вложенный префикс идёт после внешнего, при повторе побеждает последний
+            networks[network.version == 6].append(
+                (
+                    int(network.network_address),
+                    -network.num_addresses,
+                    position,
+                    int(network.broadcast_address),
+                    index,
+                )
+            )
+
+        v4_starts, v4_indexes = _ranges(networks[0], 2**32)
+        v6_starts, v6_indexes = _ranges(networks[1], 2**128)
+
+        self._values = values
+        self._v4_starts = array(_INDEX_TYPECODE, v4_starts)
+        self._v4_indexes = array(_INDEX_TYPECODE, v4_indexes)
+        # Корзина h - диапазоны с номерами [buckets[h], buckets[h + 1])
+        self._v4_buckets = array(
+            _INDEX_TYPECODE,
+            (
+                bisect_left(v4_starts, bucket << (32 - _V4_BUCKET_BITS))
+                for bucket in range(2**_V4_BUCKET_BITS + 1)
+            ),
+        )
+        # Начала IPv6 диапазонов не помещаются в array - остаются списком
+        self._v6_starts = v6_starts
+        self._v6_indexes = array(_INDEX_TYPECODE, v6_indexes)
+        self._cache: dict[str, Value | None] = {}
+        self._cache_size = cache_size
+
+    def __len__(self) -> int:
+        return len(self._v4_starts) + len(self._v6_starts)
+
+    def lookup(self, address: str) -> Value | None:
+        """
+        Значение самого длинного префикса, в который попадает адрес
+        (None - ни в один или адрес некорректен)
+        """
+        try:
+            return self._cache[address]
+        except KeyError:
+            pass
+
+        value = self._find(address)
+
+        # Кеш не растёт бесконечно: переполнился - начинаем заново
+        if len(self._cache) >= self._cache_size:
+            self._cache.clear()
+
+        self._cache[address] = value
+        return value
+
+    def _find(self, address: str) -> Value | None:
+        if address.startswith(_IPV4_MAPPED_PREFIX) and "." in address:
+            # IPv4 клиент на двухстековом сокете
+            address = address[len(_IPV4_MAPPED_PREFIX) :]
+
+        try:
+            if ":" in address:
+                ip = int.from_bytes(_inet_pton(_AF_INET6, address))
+                position = bisect_right(self._v6_starts, ip) - 1
+                indexes = self._v6_indexes
+            else:
+                ip = int.from_bytes(_inet_pton(_AF_INET, address))
+                bucket = ip >> (32 - _V4_BUCKET_BITS)
+                position = (
+                    bisect_right(
+                        self._v4_starts,
+                        ip,
+                        self._v4_buckets[bucket],
+                        self._v4_buckets[bucket + 1],
+                    )
+                    - 1
+                )
+                indexes = self._v4_indexes
+
+        except OSError:
+            return None
+
+        if position < 0:
+            return None
+
+        return self._values[indexes[position]]
+
+
+def _ranges(networks: list[tuple], size: int) -> tuple[list[int], list[int]]:
+    """
+    Непересекающиеся диапазоны [начало, следующее начало) с индексом значения
+    самого длинного префикса, покрывающего диапазон
+    """
+    starts: list[int] = []
+    indexes: list[int] = []
+
+    def add(start: int, index: int) -> None:
+        if start >= size:
+            return
+
+        # Диапазон нулевой длины заменяется следующим
+        if starts and starts[-1] == start:
+            starts.pop()
+            indexes.pop()
+
+        # Соседние диапазоны с одним значением сливаются
+        if indexes and indexes[-1] == index:
+            return
+
+        starts.append(start)
+        indexes.append(index)
+
+    # Открытые префиксы: (последний адрес, индекс значения), внешние ниже
+    stack: list[tuple[int, int]] = []
+
+    for start, _, _, end, index in sorted(networks):
+        # Закрываем префиксы, которые кончились до этого
+        while stack and stack[-1][0] < start:
+            closed_end, _ = stack.pop()
+            add(closed_end + 1, stack[-1][1] if stack else _NO_VALUE)
+
+        add(start, index)
+        stack.append((end, index))
+
+    while stack:
+        closed_end, _ = stack.pop()
+        add(closed_end + 1, stack[-1][1] if stack else _NO_VALUE)
+
+    return starts, indexes
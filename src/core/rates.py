@@ -0,0 +1,60 @@
+import time
+from collections import deque
+from typing import Callable, Hashable
+
+# Как часто запоминать точку счётчика (сек)
+POINT_INTERVAL = 1.0
+
+
+class CounterRateEstimator:
+    """
+    Частота событий (в секунду) по значениям счётчика, который растёт на
+    каждое событие, за скользящее окно. Раз в секунду на ключ запоминается
+    точка (время, значение), оценка - прирост значения от самой старой точки
+    окна, но не меньше прироста за последнюю секунду-две: всплеск заметен
+    сразу, а спад - когда пройдёт окно. Если счётчик общий для воркеров
+    (Redis), то и частота получается общей - без обмена данными между ними.
+
+    O(1) на вызов: точки добавляются и выбрасываются не чаще раза в секунду.
+    Первую секунду после простоя частота занижена - знаменатель не меньше
+    секунды
+    """
+
+    __slots__ = ("_window", "_clock", "_points")
+
+    def __init__(
+        self, window: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        if window <= 0:
+            raise ValueError("Окно оценки частоты должно быть больше нуля")
+
+        self._window = window
+        self._clock = clock
+        self._points: dict[Hashable, deque[tuple[float, int]]] = {}
+
+    def observe(self, key: Hashable, value: int) -> float:
+        now = self._clock()
+        points = self._points.get(key)
+
+        if points is None:
+            points = self._points[key] = deque()
+
+        if not points or now - points[-1][0] >= POINT_INTERVAL:
+            points.append((now, value))
+
+            # Точки старше окна не нужны; последняя (текущая) остаётся всегда
+            while now - points[0][0] > self._window + POINT_INTERVAL:
+                points.popleft()
+
+        # Рост частоты виден по последней секунде, спад - только по всему окну
+        return max(
+            _rate(points[0], now, value),
+            _rate(points[-2] if len(points) > 1 else points[0], now, value),
+        )
+
+
+def _rate(point: tuple[float, int], now: float, value: int) -> float:
+    started_at, start_value = point
+
+    # Значения из блоков счётчика разных воркеров идут не строго по порядку
+    return max(value - start_value, 0) / max(now - started_at, POINT_INTERVAL)
@@ -0,0 +1,51 @@
+import random
+from typing import Sequence
+
+
+class WeightedSelector[Item]:
+    """
+    Случайный выбор элемента с учётом весов за O(1) (alias method, Vose).
+    Таблицы строятся один раз за O(n) - при изменении набора элементов
+    """
+
+    __slots__ = ("_items", "_probabilities", "_aliases", "_random")
+
+    def __init__(self, items: Sequence[tuple[Item, float]]) -> None:
+        items = [(item, weight) for item, weight in items if weight > 0]
+
+        if not items:
+            raise ValueError("Нет элементов с положительным весом")
+
+        count = len(items)
+        total = sum(weight for _, weight in items)
+
+        self._items = [item for item, _ in items]
+        self._probabilities = [1.0] * count
+        self._aliases = list(range(count))
+        self._random = random.random
+
+        # Нормируем веса так, чтобы средний был равен 1
+        scaled = [weight * count / total for _, weight in items]
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+
+        while small and large:
+            less, more = small.pop(), large.pop()
+
+            self._probabilities[less] = scaled[less]
+            self._aliases[less] = more
+
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def select(self) -> Item:
+        position = self._random() * len(self._items)
+        index = int(position)
+
+        if position - index < self._probabilities[index]:
+            return self._items[index]
+
+        return self._items[self._aliases[index]]
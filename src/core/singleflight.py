@@ -0,0 +1,52 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+
+class SingleFlight[Result]:
+    """
+    Схлопывание одинаковых одновременных вызовов в пределах воркера: первый
+    вызов по ключу выполняется, остальные ждут его результат (или ошибку).
+
+    Вызов выполняется в задаче первого вызывающего, а не в отдельной: он может
+    пользоваться ресурсами запроса (например, сессией БД). Если первого
+    вызывающего отменили, ожидающие повторяют попытку сами
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Result]]) -> Result:
+        while (future := self._calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+
+            except asyncio.CancelledError:
+                # Отменили нас самих, а не первый вызов
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+
+        try:
+            result = await call()
+
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+        except Exception as ex:
+            future.set_exception(ex)
+            # Ошибку получат ожидающие (если они есть), не логируем её как потерянную
+            future.exception()
+            raise
+
+        else:
+            future.set_result(result)
+            return result
+
+        finally:
+            del self._calls[key]
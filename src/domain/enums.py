@@ -1,6 +1,18 @@
 from enum import Enum, auto
 
+from src.core.enums import AutoStrEnum
+
 
 class ResourceTypeEnum(Enum):
     CDN = auto()
     ORIGIN = auto()
+
+
+class BulkRowStatusEnum(AutoStrEnum):
+    CREATED = auto()
+    UPDATED = auto()
+    # Запись уже есть с теми же значениями
+    UNCHANGED = auto()
+    # Запись уже есть, а режим - только создание
+    EXISTS = auto()
+    INVALID = auto()
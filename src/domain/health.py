@@ -0,0 +1,16 @@
+import abc
+
+
+class TargetHealthRegistry(abc.ABC):
+    """
+    Текущее состояние целей перенаправления. Проверки должны быть дешёвыми:
+    они вызываются на каждом запросе
+    """
+
+    @abc.abstractmethod
+    def is_cdn_available(self, host_name: str) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def is_origin_available(self, server_name: str) -> bool:
+        pass
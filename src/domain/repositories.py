@@ -1,5 +1,9 @@
 import abc
+from datetime import datetime
 from functools import cached_property
+from typing import Sequence
+
+from src.domain.schemas import BalancingDecision, DecisionLogRecord, DecisionRollup
 
 
 class BaseCrudRepository[Entity](abc.ABC):
@@ -33,3 +37,39 @@ class CdnRequestCounterRepository(abc.ABC):
     @abc.abstractmethod
     async def reset(self) -> None:
         pass
+
+    async def reserve(self, count: int) -> Sequence[int]:
+        """
+        Берёт сразу count значений счётчика (пакет запросов к одному серверу)
+        """
+        return [await self.increment() for _ in range(count)]
+
+
+class BalancingDecisionRepository(abc.ABC):
+
+    @abc.abstractmethod
+    async def decide(
+        self, server_name: str, origin_missing: bool = False
+    ) -> BalancingDecision | None:
+        """
+        Увеличивает счётчик сервера и принимает решение о перенаправлении.
+        Возвращает None, если в хранилище нет нужных настроек
+        (origin_missing - сервера заведомо нет, берём коэффициент CDN)
+        """
+        pass
+
+
+class DecisionLogRepository(abc.ABC):
+
+    @abc.abstractmethod
+    async def write_many(self, records: Sequence[DecisionLogRecord]) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def rollup(
+        self, since: datetime, until: datetime, server_name: str | None = None
+    ) -> list[DecisionRollup]:
+        """
+        Число решений ORIGIN/CDN по серверам и минутам за [since, until)
+        """
+        pass
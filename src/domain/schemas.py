@@ -1,6 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 
-from src.domain.enums import ResourceTypeEnum
+from src.domain.enums import ResourceTypeEnum, BulkRowStatusEnum
 
 
 @dataclass(slots=True)
@@ -13,9 +14,130 @@ class CdnServer:
 class OriginServer:
     name: str
     redirecting_ratio: int | None = None
+    # Сколько запросов в секунду origin выдерживает (для ADAPTIVE_RATIO)
+    capacity: int | None = None
 
 
 @dataclass(slots=True)
 class TargetResource:
     type: ResourceTypeEnum
     url: str
+
+
+@dataclass(slots=True)
+class ResolvedVideoUrl:
+    """
+    Итог разрешения одного URL из пакета: адрес перенаправления или ошибка
+    """
+
+    video_url: str
+    type: str | None = None
+    url: str | None = None
+    error: str | None = None
+
+
+@dataclass(slots=True)
+class BalancingDecision:
+    type: ResourceTypeEnum
+    cdn_host: str
+
+
+@dataclass(slots=True)
+class DecisionLogRecord:
+    """
+    Запись журнала решений: куда ушёл запрос к серверу
+    """
+
+    created_at: datetime
+    server_name: str
+    type: ResourceTypeEnum
+
+
+@dataclass(slots=True)
+class DecisionRollup:
+    """
+    Число решений по серверу за минуту
+    """
+
+    minute: datetime
+    server_name: str
+    origin: int
+    cdn: int
+
+
+@dataclass(slots=True, frozen=True)
+class ClientNetwork:
+    """
+    Сеть клиента из таблицы префиксов: регион и автономная система
+    """
+
+    region: str
+    asn: int | None = None
+
+
+@dataclass(slots=True, frozen=True)
+class VideoRequest:
+    """
+    Разобранный один раз URL видео. CDN-адрес собирается из готовых частей:
+    cdn_url_prefix + host CDN + cdn_url_suffix
+    """
+
+    url: str
+    host: str
+    server_name: str
+    path: str
+    cdn_url_prefix: str
+    cdn_url_suffix: str
+
+    def cdn_url(self, cdn_host: str) -> str:
+        return self.cdn_url_prefix + cdn_host + self.cdn_url_suffix
+
+
+@dataclass(slots=True)
+class CdnHost:
+    host_name: str
+    weight: int = 1
+    # Пропускная способность хоста (запросов в секунду) - для оператора
+    # и планирования. На выбор не влияет: без общей по кластеру частоты
+    # запросов на CDN её не с чем сравнить, а доли по capacity заменили бы
+    # веса целиком - долю хоста задаёт weight
+    capacity: int | None = None
+    id: int | None = None
+
+
+@dataclass(slots=True)
+class BulkRowResult:
+    """
+    Итог одной строки пакетной загрузки (index - номер строки во входных данных)
+    """
+
+    index: int
+    status: BulkRowStatusEnum
+    name: str | None = None
+    id: int | None = None
+    error: str | None = None
+
+
+@dataclass(slots=True)
+class BulkResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    exists: int = 0
+    failed: int = 0
+    rows: list[BulkRowResult] = field(default_factory=list)
+
+    def add(self, row: BulkRowResult) -> None:
+        self.rows.append(row)
+
+        match row.status:
+            case BulkRowStatusEnum.CREATED:
+                self.created += 1
+            case BulkRowStatusEnum.UPDATED:
+                self.updated += 1
+            case BulkRowStatusEnum.UNCHANGED:
+                self.unchanged += 1
+            case BulkRowStatusEnum.EXISTS:
+                self.exists += 1
+            case BulkRowStatusEnum.INVALID:
+                self.failed += 1
@@ -0,0 +1,197 @@
+import abc
+import dataclasses
+import json
+import types
+import typing
+from hashlib import blake2b
+from typing import Any, Callable
+
+from redis import asyncio as aioredis
+
+from src.infrastructure.cache.enums import CacheCodecEnum
+
+Pipeline = aioredis.client.Pipeline | aioredis.cluster.ClusterPipeline
+
+# Повышается вручную, если меняется смысл полей, а не их состав
+CACHE_SCHEMA_VERSION = 1
+
+# Служебные поля записи (см. ReadThroughCache)
+REFRESH_AT_FIELD = "_refresh_at"
+MISSING_FIELD = "_missing"
+
+
+def schema_fingerprint(entity_type: type) -> str:
+    """
+    Отпечаток состава полей сущности: после деплоя с другими полями ключи
+    кеша меняются, и несовместимые записи просто не читаются
+    """
+    fields = ";".join(
+        f"{field.name}:{field.type}" for field in dataclasses.fields(entity_type)
+    )
+    return blake2b(fields.encode(), digest_size=4).hexdigest()
+
+
+def schema_tag(entity_type: type, codec: CacheCodecEnum) -> str:
+    return f"v{CACHE_SCHEMA_VERSION}.{codec.lower()}.{schema_fingerprint(entity_type)}"
+
+
+class CacheCodec(abc.ABC):
+    """
+    Формат записи настроек в Redis.
+
+    Запись - словарь полей сущности и служебных полей (_refresh_at, _missing).
+    По умолчанию запись хранится строкой (GET/SET)
+    """
+
+    @abc.abstractmethod
+    def encode(self, record: dict) -> Any:
+        pass
+
+    @abc.abstractmethod
+    def decode(self, raw: Any) -> dict:
+        pass
+
+    async def get(
+        self, client: aioredis.Redis | aioredis.RedisCluster, key: str
+    ) -> dict | None:
+        raw = await client.get(key)
+        return self.decode(raw) if raw is not None else None
+
+    async def set(
+        self,
+        client: aioredis.Redis | aioredis.RedisCluster,
+        key: str,
+        record: dict,
+        px: int | None = None,
+    ) -> None:
+        await client.set(key, self.encode(record), px=px)
+
+    def queue_set(
+        self, pipeline: Pipeline, key: str, record: dict, px: int | None
+    ) -> None:
+        """
+        Добавляет запись в пайплайн (для пакетной записи многих ключей)
+        """
+        pipeline.set(key, self.encode(record), px=px)
+
+
+class JsonCodec(CacheCodec):
+    """
+    JSON-объект с именами полей. Этот формат читает Lua-скрипт решения
+    """
+
+    def encode(self, record: dict) -> str:
+        return json.dumps(record)
+
+    def decode(self, raw: str) -> dict:
+        return json.loads(raw)
+
+
+class TupleJsonCodec(CacheCodec):
+    """
+    Компактный JSON-массив значений в порядке полей сущности (без имён полей).
+    Служебные поля - объектом в конце массива, отметка "нет в БД" - объектом
+    """
+
+    def __init__(self, entity_type: type) -> None:
+        self._fields = tuple(field.name for field in dataclasses.fields(entity_type))
+
+    def encode(self, record: dict) -> str:
+        if record.get(MISSING_FIELD):
+            return json.dumps(record)
+
+        values: list = [record.get(field) for field in self._fields]
+        extra = {key: value for key, value in record.items() if key.startswith("_")}
+
+        if extra:
+            values.append(extra)
+
+        return json.dumps(values, separators=(",", ":"))
+
+    def decode(self, raw: str) -> dict:
+        values = json.loads(raw)
+
+        if isinstance(values, dict):
+            return values
+
+        record = dict(zip(self._fields, values))
+
+        if len(values) > len(self._fields):
+            record.update(values[-1])
+
+        return record
+
+
+class RedisHashCodec(CacheCodec):
+    """
+    Поля записи - поля хеша Redis (HGETALL/HSET). Значения приводятся
+    к типам полей сущности, поля со значением None не хранятся
+    """
+
+    def __init__(self, entity_type: type) -> None:
+        hints = typing.get_type_hints(entity_type)
+        self._converters: dict[str, Callable[[str], Any]] = {
+            field.name: _converter(hints[field.name])
+            for field in dataclasses.fields(entity_type)
+        }
+        self._converters[REFRESH_AT_FIELD] = float
+        self._converters[MISSING_FIELD] = lambda value: value == "1"
+
+    def encode(self, record: dict) -> dict[str, str]:
+        return {
+            key: "1" if value is True else str(value)
+            for key, value in record.items()
+            if value is not None
+        }
+
+    def decode(self, raw: dict[str, str]) -> dict:
+        converters = self._converters
+        return {
+            key: converters[key](value) if key in converters else value
+            for key, value in raw.items()
+        }
+
+    async def get(
+        self, client: aioredis.Redis | aioredis.RedisCluster, key: str
+    ) -> dict | None:
+        raw = await client.hgetall(key)
+        return self.decode(raw) if raw else None
+
+    async def set(
+        self,
+        client: aioredis.Redis | aioredis.RedisCluster,
+        key: str,
+        record: dict,
+        px: int | None = None,
+    ) -> None:
+        # Все команды про один ключ - один слот и в кластере
+        async with client.pipeline(transaction=False) as pipeline:
+            self.queue_set(pipeline, key, record, px)
+            await pipeline.execute()
+
+    def queue_set(
+        self, pipeline: Pipeline, key: str, record: dict, px: int | None
+    ) -> None:
+        pipeline.delete(key)
+        pipeline.hset(key, mapping=self.encode(record))
+
+        if px is not None:
+            pipeline.pexpire(key, px)
+
+
+def _converter(hint: Any) -> Callable[[str], Any]:
+    # int | None -> int
+    if isinstance(hint, types.UnionType) or typing.get_origin(hint) is typing.Union:
+        hint = next(arg for arg in typing.get_args(hint) if arg is not type(None))
+
+    return hint if hint in (int, float) else str
+
+
+def build_codec(codec: CacheCodecEnum, entity_type: type) -> CacheCodec:
+    match codec:
+        case CacheCodecEnum.TUPLE_JSON:
+            return TupleJsonCodec(entity_type)
+        case CacheCodecEnum.REDIS_HASH:
+            return RedisHashCodec(entity_type)
+        case _:
+            return JsonCodec()
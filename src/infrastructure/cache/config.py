@@ -1,12 +1,74 @@
 from functools import cached_property
 
 from src.core.config import BaseSettings
+from src.infrastructure.cache.enums import CounterBackendEnum, CacheCodecEnum
 
 
 class RedisSettings(BaseSettings):
     REDIS_HOST: str
     REDIS_PORT: int
+    # REDIS_HOST:REDIS_PORT - один из узлов Redis Cluster (остальные узнаем от него)
+    REDIS_CLUSTER: bool = False
+    REDIS_MAX_CONNECTIONS: int = 100
+    # Таймауты подключения к Redis и ответа на команду (сек), 0 - без таймаута
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 1.0
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    # После скольких таймаутов и ошибок соединения подряд запросы перестают
+    # ходить в Redis, и через сколько секунд пробовать снова
+    REDIS_BREAKER_FAILURE_THRESHOLD: int = 5
+    REDIS_BREAKER_RECOVERY_TIMEOUT: float = 5.0
 
     @cached_property
     def url(self) -> str:
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}"
+
+
+class SnapshotSettings(BaseSettings):
+    # Держать ли в памяти воркера снимок настроек CDN/origin серверов
+    SETTINGS_SNAPSHOT_ENABLED: bool = True
+    # Максимальный возраст снимка (сек), если сообщения об изменениях потерялись
+    SETTINGS_SNAPSHOT_TTL: float = 60.0
+    # Канал Redis pub/sub, в который публикуются изменения настроек
+    SETTINGS_CHANGES_CHANNEL: str = "settings_changes"
+
+
+class SettingsCacheSettings(BaseSettings):
+    # Формат записей настроек в Redis (SCRIPTED_NTH_REQUEST читает только JSON)
+    SETTINGS_CACHE_CODEC: CacheCodecEnum = CacheCodecEnum.JSON
+    # Срок жизни настроек в кеше (сек), 0 - без срока (обновляются при изменении)
+    SETTINGS_CACHE_TTL: float = 0
+    # Разброс срока жизни (доля), чтобы записи не истекали одновременно
+    SETTINGS_CACHE_TTL_JITTER: float = 0.1
+    # Сколько ещё секунд после срока отдавать старое значение, пока его обновляют
+    SETTINGS_CACHE_STALE_TTL: float = 30.0
+    # Сколько помнить, что настроек нет в БД (сек), 0 - не помнить
+    SETTINGS_CACHE_NEGATIVE_TTL: float = 30.0
+    # Загрузка из БД при промахе - одним воркером на весь кластер
+    SETTINGS_CACHE_LOCK_ENABLED: bool = False
+    # Время жизни блокировки и сколько остальные воркеры ждут значение (сек)
+    SETTINGS_CACHE_LOCK_TIMEOUT: float = 5.0
+    SETTINGS_CACHE_LOCK_WAIT: float = 0.5
+    # Прогрев кеша настроек при старте и его период (сек), 0 - только при старте
+    SETTINGS_CACHE_WARMUP_ENABLED: bool = True
+    SETTINGS_CACHE_WARMUP_INTERVAL: float = 60.0
+
+
+class CounterSettings(BaseSettings):
+    COUNTER_BACKEND: CounterBackendEnum = CounterBackendEnum.INCR
+    # На сколько ключей разбивать счётчик сервера (для INCR)
+    COUNTER_SHARDS: int = 1
+
+    # Размер блока значений, который воркер берёт одним INCRBY (начальный)
+    COUNTER_BLOCK_SIZE: int = 100
+    # Подстраивать размер блока под интенсивность запросов
+    COUNTER_BLOCK_ADAPTIVE: bool = True
+    COUNTER_BLOCK_MIN_SIZE: int = 10
+    COUNTER_BLOCK_MAX_SIZE: int = 10_000
+    # Желаемое время (сек), за которое воркер расходует один блок
+    COUNTER_BLOCK_LEASE_INTERVAL: float = 1.0
+
+    # Файл разделяемой памяти со счётчиками (SHARED_MEMORY) и число слотов в нём
+    COUNTER_SHARED_MEMORY_PATH: str = "/dev/shm/balancer_counters"
+    COUNTER_SHARED_MEMORY_SLOTS: int = 65_536
+    # Как часто (сек) воркер копирует счётчики из разделяемой памяти в Redis
+    COUNTER_SNAPSHOT_INTERVAL: float = 5.0
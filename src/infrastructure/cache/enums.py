@@ -0,0 +1,18 @@
+from enum import auto
+
+from src.core.enums import AutoStrEnum
+
+
+class CounterBackendEnum(AutoStrEnum):
+    # Точный счётчик: INCR на каждый запрос
+    INCR = auto()
+    # Счётчик с выдачей значений блоками: INCRBY раз в блок
+    BLOCK_LEASE = auto()
+    # Счётчик в разделяемой памяти хоста (все воркеры на одной машине)
+    SHARED_MEMORY = auto()
+
+
+class CacheCodecEnum(AutoStrEnum):
+    JSON = auto()
+    TUPLE_JSON = auto()
+    REDIS_HASH = auto()
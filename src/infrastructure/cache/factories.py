@@ -0,0 +1,114 @@
+from typing import Callable
+
+from redis import asyncio as aioredis
+
+from src.application.strategies import CounterRepositoryFactory
+from src.domain.repositories import CdnRequestCounterRepository
+from src.infrastructure.cache.config import CounterSettings, RedisSettings
+from src.infrastructure.cache.enums import CounterBackendEnum
+from src.infrastructure.cache.guard import LocalCounters, RedisGuard
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.cache.leasing import CounterBlockLeaser
+from src.infrastructure.cache.repository import (
+    BlockLeasedCdnRequestCounterRepository,
+    GuardedCdnRequestCounterRepository,
+    RedisCdnRequestCounterRepository,
+    ShardCursors,
+    ShardedRedisCdnRequestCounterRepository,
+    SharedMemoryCdnRequestCounterRepository,
+)
+from src.infrastructure.cache.shared_counters import SharedCounters
+
+
+def create_redis_client(
+    settings: RedisSettings,
+) -> aioredis.Redis | aioredis.RedisCluster:
+    if settings.REDIS_CLUSTER:
+        return aioredis.RedisCluster(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT or None,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT or None,
+            decode_responses=True,
+        )
+
+    # Таймауты сокета - страховка для вызовов вне бюджета запроса
+    # (фоновые задачи); pub/sub ждёт сообщений со своим таймаутом
+    pool = aioredis.ConnectionPool.from_url(
+        url=settings.url,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT or None,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT or None,
+        decode_responses=True,
+    )
+
+    return aioredis.Redis(connection_pool=pool)
+
+
+def create_redis_pubsub_client(
+    settings: RedisSettings, client: aioredis.Redis | aioredis.RedisCluster
+) -> aioredis.Redis:
+    # Клиент кластера не умеет pub/sub, а сообщения в кластере расходятся
+    # по всем узлам - поэтому слушаем и публикуем через обычный клиент узла
+    if not settings.REDIS_CLUSTER:
+        return client
+
+    return aioredis.Redis.from_url(
+        url=settings.url, max_connections=10, decode_responses=True
+    )
+
+
+def create_counter_repo_factory(
+    settings: CounterSettings,
+    client: aioredis.Redis | aioredis.RedisCluster,
+    keyspace: RedisKeyspace,
+    guard: RedisGuard,
+    local_counters: LocalCounters,
+    shard_cursors: ShardCursors,
+    shared_counters: Callable[[], SharedCounters],
+    leaser: Callable[[], CounterBlockLeaser],
+) -> CounterRepositoryFactory:
+    """
+    Счётчики запросов по имени сервера для выбранного бэкенда.
+    Разделяемая память и аренда блоков создаются при первом счётчике
+    """
+
+    def create(server_name: str) -> CdnRequestCounterRepository:
+        # Счётчик в разделяемой памяти ходит в Redis только вне пути запроса
+        if settings.COUNTER_BACKEND is CounterBackendEnum.SHARED_MEMORY:
+            return SharedMemoryCdnRequestCounterRepository(
+                server_name=server_name,
+                counters=shared_counters(),
+                keyspace=keyspace,
+            )
+
+        return GuardedCdnRequestCounterRepository(
+            server_name=server_name,
+            counter_repository=create_redis_counter(server_name),
+            guard=guard,
+            local_counters=local_counters,
+        )
+
+    def create_redis_counter(server_name: str) -> CdnRequestCounterRepository:
+        if settings.COUNTER_BACKEND is CounterBackendEnum.BLOCK_LEASE:
+            return BlockLeasedCdnRequestCounterRepository(
+                server_name=server_name,
+                leaser=leaser(),
+                keyspace=keyspace,
+            )
+
+        if settings.COUNTER_SHARDS > 1:
+            return ShardedRedisCdnRequestCounterRepository(
+                server_name=server_name,
+                client=client,
+                shards=settings.COUNTER_SHARDS,
+                cursors=shard_cursors,
+                keyspace=keyspace,
+            )
+
+        return RedisCdnRequestCounterRepository(
+            server_name=server_name, client=client, keyspace=keyspace
+        )
+
+    return create
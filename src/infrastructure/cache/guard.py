@@ -0,0 +1,132 @@
+import logging
+from typing import Awaitable, Callable, Hashable
+
+from redis import asyncio as aioredis
+
+from src.core.circuit_breaker import CircuitBreaker, CircuitStateEnum
+from src.core.deadline import within_deadline
+from src.core.metrics import DEADLINE_EXCEEDED, REDIS_CIRCUIT_CHANGES
+
+logger = logging.getLogger(__name__)
+
+REDIS_DEADLINE_EXCEEDED = DEADLINE_EXCEEDED.labels("redis")
+REDIS_CIRCUIT_OPENED = REDIS_CIRCUIT_CHANGES.labels(CircuitStateEnum.OPEN.name)
+REDIS_CIRCUIT_CLOSED = REDIS_CIRCUIT_CHANGES.labels(CircuitStateEnum.CLOSED.name)
+
+# Сколько локальных счётчиков держит воркер
+LOCAL_COUNTERS_MAX_ENTRIES = 10_000
+
+
+class RedisCircuitOpenError(aioredis.ConnectionError):
+    """
+    Вызов Redis пропущен: цепь разомкнута
+    """
+
+
+class RedisGuard:
+    """
+    Вызовы Redis на пути запроса. Каждый вызов ограничен бюджетом времени
+    запроса (within_deadline), а после failure_threshold таймаутов и ошибок
+    соединения подряд цепь размыкается: Redis не вызывается совсем
+    (RedisCircuitOpenError), пока через recovery_timeout секунд один пробный
+    вызов не пройдёт успешно. Все ошибки - подклассы RedisError, поэтому
+    работают обычные обходы недоступного Redis
+    """
+
+    def __init__(self, breaker: CircuitBreaker) -> None:
+        self._breaker = breaker
+        self._probing = False
+
+    @property
+    def state(self) -> CircuitStateEnum:
+        return self._breaker.state
+
+    def stats(self) -> dict:
+        state = self._breaker.state
+
+        return {
+            "circuit": state,
+            "degraded": state is not CircuitStateEnum.CLOSED,
+            "failures": self._breaker.failures,
+        }
+
+    async def call[Result](self, operation: Callable[[], Awaitable[Result]]) -> Result:
+        state = self._breaker.state
+
+        # В полуоткрытом состоянии Redis проверяет один вызов, остальные ждут итога
+        if state is CircuitStateEnum.OPEN or (
+            state is CircuitStateEnum.HALF_OPEN and self._probing
+        ):
+            raise RedisCircuitOpenError("Redis circuit is open")
+
+        probing = state is CircuitStateEnum.HALF_OPEN
+
+        if probing:
+            self._probing = True
+
+        try:
+            async with within_deadline():
+                result = await operation()
+
+        except TimeoutError as ex:
+            REDIS_DEADLINE_EXCEEDED.inc()
+            self._record_failure()
+            raise aioredis.TimeoutError("Redis call exceeded request deadline") from ex
+
+        except (aioredis.ConnectionError, aioredis.TimeoutError):
+            self._record_failure()
+            raise
+
+        finally:
+            if probing:
+                self._probing = False
+
+        if state is not CircuitStateEnum.CLOSED or self._breaker.failures:
+            self._record_success()
+
+        return result
+
+    def _record_failure(self) -> None:
+        was_open = self._breaker.state is CircuitStateEnum.OPEN
+        self._breaker.record_failure()
+
+        if not was_open and self._breaker.state is CircuitStateEnum.OPEN:
+            REDIS_CIRCUIT_OPENED.inc()
+            logger.warning(
+                "Redis circuit opened after %s failures, degraded mode",
+                self._breaker.failures,
+            )
+
+    def _record_success(self) -> None:
+        was_closed = self._breaker.state is CircuitStateEnum.CLOSED
+        self._breaker.record_success()
+
+        if not was_closed:
+            REDIS_CIRCUIT_CLOSED.inc()
+            logger.warning("Redis circuit closed, degraded mode is over")
+
+
+class LocalCounters:
+    """
+    Счётчики воркера на то время, пока Redis пропускается: продолжают
+    последнее значение, полученное из Redis. Правило "каждый N-ный запрос"
+    при этом соблюдается в потоке запросов каждого воркера
+    """
+
+    __slots__ = ("_values", "_max_entries")
+
+    def __init__(self, max_entries: int = LOCAL_COUNTERS_MAX_ENTRIES) -> None:
+        self._values: dict[Hashable, int] = {}
+        self._max_entries = max_entries
+
+    def remember(self, key: Hashable, value: int) -> None:
+        if key not in self._values and len(self._values) >= self._max_entries:
+            # Выбрасываем самый старый счётчик
+            del self._values[next(iter(self._values))]
+
+        self._values[key] = value
+
+    def add(self, key: Hashable, count: int) -> int:
+        value = self._values.get(key, 0) + count
+        self.remember(key, value)
+        return value
@@ -0,0 +1,75 @@
+class RedisKeyspace:
+    """
+    Имена ключей Redis.
+
+    В режиме кластера ключи настроек получают общий hash tag {settings}: они
+    лежат в одном слоте, поэтому с ними работают MGET, пайплайны и скрипты.
+    Счётчики получают собственный тег на сервер (и на шард), чтобы нагрузка
+    от INCR расходилась по разным узлам кластера.
+    Без кластера имена ключей остаются прежними.
+
+    Ключи записей настроек могут начинаться с тега схемы (версия, формат
+    и отпечаток полей сущности, см. schema_tag): записи в старом формате
+    после деплоя не читаются, а истекают сами.
+    """
+
+    SETTINGS_TAG = "{settings}"
+
+    def __init__(
+        self,
+        cluster: bool = False,
+        cdn_schema: str | None = None,
+        origin_schema: str | None = None,
+    ) -> None:
+        self._cluster = cluster
+        self._cdn_schema = cdn_schema
+        self._origin_schema = origin_schema
+
+    @property
+    def cluster(self) -> bool:
+        return self._cluster
+
+    def _settings_key(self, key: str, schema: str | None = None) -> str:
+        if schema is not None:
+            key = f"{schema}:{key}"
+
+        return f"{self.SETTINGS_TAG}:{key}" if self._cluster else key
+
+    def cdn_settings(self) -> str:
+        return self._settings_key("CDN_SERVER", self._cdn_schema)
+
+    def origin_settings(self, server_name: str) -> str:
+        return self._settings_key("server: %s" % server_name, self._origin_schema)
+
+    def settings_version(self) -> str:
+        return self._settings_key("SETTINGS_VERSION")
+
+    def cache_lock(self, key: str) -> str:
+        # Ключ блокировки попадает в слот самой записи (тот же hash tag)
+        return "lock: %s" % key
+
+    def cache_warmup_lock(self) -> str:
+        return self._settings_key("lock: WARMUP")
+
+    def metrics(self) -> str:
+        # Один ключ - один слот, тег не нужен
+        return "METRICS"
+
+    def counter(self, server_name: str, shard: int | None = None) -> str:
+        name = server_name if shard is None else f"{server_name}:{shard}"
+
+        if self._cluster:
+            name = "{%s}" % name
+
+        return "counter: %s" % name
+
+    def scripted_counter(self, server_name: str) -> str:
+        # Скрипт работает с ключами одного слота, поэтому в кластере его счётчики
+        # лежат рядом с настройками - все INCR стратегии SCRIPTED_NTH_REQUEST
+        # идут в слот {settings}. Такой счётчик не шардируется: стратегию
+        # нельзя совместить с COUNTER_SHARDS > 1 (проверяется при старте)
+        return (
+            self._settings_key("counter: %s" % server_name)
+            if self._cluster
+            else self.counter(server_name)
+        )
@@ -0,0 +1,371 @@
+import asyncio
+import logging
+import random
+import secrets
+import time
+from typing import Awaitable, Callable, Iterable
+
+from redis import asyncio as aioredis
+
+from src.core.deadline import within_deadline
+from src.core.metrics import (
+    STAGE_SECONDS,
+    CACHE_REQUESTS,
+    DEADLINE_EXCEEDED,
+    DEGRADED_REQUESTS,
+)
+from src.core.singleflight import SingleFlight
+from src.infrastructure.cache.codecs import CacheCodec, REFRESH_AT_FIELD, MISSING_FIELD
+from src.infrastructure.cache.config import SettingsCacheSettings
+from src.infrastructure.cache.guard import RedisCircuitOpenError, RedisGuard
+from src.infrastructure.cache.keys import RedisKeyspace
+
+logger = logging.getLogger(__name__)
+
+CACHE_GET_SECONDS = STAGE_SECONDS.labels("cache_get")
+DB_READ_SECONDS = STAGE_SECONDS.labels("db_read")
+DB_DEADLINE_EXCEEDED = DEADLINE_EXCEEDED.labels("db")
+DEGRADED_SETTINGS = DEGRADED_REQUESTS.labels("settings")
+
+# Снимаем блокировку, только если она всё ещё наша
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Сколько последних известных значений настроек держит воркер
+LAST_KNOWN_MAX_ENTRIES = 10_000
+
+# Как часто ожидающий воркер проверяет, не появилось ли значение в кеше (сек)
+LOCK_POLL_INTERVAL = 0.05
+
+Loader = Callable[[], Awaitable[dict | None]]
+
+# Ключ, значение и формат записи
+CacheEntry = tuple[str, dict, CacheCodec]
+
+
+class LastKnownValues:
+    """
+    Последние прочитанные воркером значения настроек - на время, пока
+    недоступны и Redis, и БД
+    """
+
+    __slots__ = ("_values", "_max_entries")
+
+    def __init__(self, max_entries: int = LAST_KNOWN_MAX_ENTRIES) -> None:
+        self._values: dict[str, dict] = {}
+        self._max_entries = max_entries
+
+    def get(self, key: str) -> dict | None:
+        return self._values.get(key)
+
+    def remember(self, key: str, value: dict | None) -> None:
+        # В БД значения больше нет
+        if value is None:
+            self._values.pop(key, None)
+            return
+
+        if key not in self._values and len(self._values) >= self._max_entries:
+            del self._values[next(iter(self._values))]
+
+        self._values[key] = value
+
+
+class ReadThroughCache:
+    """
+    Чтение настроек через кеш Redis с защитой БД от "набегов" при промахе.
+
+    Кроме полей настроек запись хранит служебные: _refresh_at (когда пора
+    обновить, unix time) и _missing (в БД ничего нет). Скрипт решения читает
+    только поля настроек и понимает отметку _missing.
+
+    - Промах: загрузку из БД по ключу выполняет один запрос воркера, остальные
+      ждут его результат (SingleFlight). С включённой блокировкой из БД читает
+      один воркер, остальные ждут появления значения в кеше.
+    - Если в БД ничего не нашлось, в кеш кладётся отметка об этом на
+      SETTINGS_CACHE_NEGATIVE_TTL секунд, чтобы неизвестные имена не
+      приводили к запросу в БД каждый раз.
+    - Срок жизни записи (если задан) разбрасывается на +-jitter, чтобы записи
+      не истекали одновременно. После срока запись ещё stale_ttl секунд
+      отдаётся как есть, а обновляет её один запрос (в своём воркере
+      и, с блокировкой, во всём кластере) - stale-while-revalidate.
+    - С guard чтение кеша и взятие блокировки ограничены бюджетом запроса,
+      а пока цепь Redis разомкнута, отдаётся последнее прочитанное воркером
+      значение. Ожидание значения от другого воркера и чтение из БД тоже
+      ограничены бюджетом; если БД не ответила, отдаётся последнее
+      известное значение.
+    """
+
+    def __init__(
+        self,
+        client: aioredis.Redis | aioredis.RedisCluster,
+        single_flight: SingleFlight,
+        settings: SettingsCacheSettings,
+        keyspace: RedisKeyspace,
+        guard: RedisGuard | None = None,
+        last_known: LastKnownValues | None = None,
+    ) -> None:
+        self._client = client
+        self._single_flight = single_flight
+        self._settings = settings
+        self._keyspace = keyspace
+        self._guard = guard
+        self._last_known = last_known if last_known is not None else LastKnownValues()
+        self._release_lock_script = (
+            client.register_script(RELEASE_LOCK_SCRIPT)
+            if settings.SETTINGS_CACHE_LOCK_ENABLED
+            else None
+        )
+
+    async def read(
+        self, key: str, load: Loader, codec: CacheCodec, repository: str
+    ) -> dict | None:
+        try:
+            with CACHE_GET_SECONDS.time():
+                value = await self._get(key, codec)
+
+        # Redis пропускается - отдаём последнее известное значение
+        except RedisCircuitOpenError:
+            CACHE_REQUESTS.labels(repository, "error").inc()
+
+            last_known = self._last_known.get(key)
+
+            if last_known is not None:
+                DEGRADED_SETTINGS.inc()
+                return last_known
+
+            return await self._single_flight.do(key, lambda: self._load(key, load))
+
+        # Кеш отвалился - читаем из БД, но по одному запросу на ключ
+        except aioredis.RedisError:
+            CACHE_REQUESTS.labels(repository, "error").inc()
+            return await self._single_flight.do(key, lambda: self._load(key, load))
+
+        if value is None:
+            CACHE_REQUESTS.labels(repository, "miss").inc()
+            return await self._single_flight.do(
+                key, lambda: self._load_missing(key, load, codec)
+            )
+
+        # В БД этого нет - не ходим туда, пока запись не истечёт
+        if value.get(MISSING_FIELD):
+            CACHE_REQUESTS.labels(repository, "negative").inc()
+            return None
+
+        refresh_at = value.pop(REFRESH_AT_FIELD, None)
+        self._last_known.remember(key, value)
+
+        if refresh_at is None or time.time() < refresh_at:
+            CACHE_REQUESTS.labels(repository, "hit").inc()
+            return value
+
+        CACHE_REQUESTS.labels(repository, "stale").inc()
+
+        # Устаревшее значение обновляет один запрос, остальные отдают старое
+        if self._single_flight.in_flight(key):
+            return value
+
+        refreshed = await self._single_flight.do(
+            key, lambda: self._refresh_stale(key, load, codec, value)
+        )
+        return refreshed if refreshed is not None else value
+
+    async def write(self, key: str, value: dict, codec: CacheCodec) -> None:
+        record, px = self._with_ttl(value)
+        await codec.set(self._client, key, record, px=px)
+
+    async def write_many(self, entries: Iterable[CacheEntry]) -> int:
+        """
+        Запись многих значений одним пайплайном (прогрев кеша).
+        Возвращает число записанных значений
+        """
+        written = 0
+
+        async with self._client.pipeline(transaction=False) as pipeline:
+            for key, value, codec in entries:
+                record, px = self._with_ttl(value)
+                codec.queue_set(pipeline, key, record, px)
+                written += 1
+
+            await pipeline.execute()
+
+        return written
+
+    async def write_missing(self, key: str, codec: CacheCodec) -> None:
+        ttl = self._settings.SETTINGS_CACHE_NEGATIVE_TTL
+
+        if ttl:
+            await codec.set(
+                self._client, key, {MISSING_FIELD: True}, px=int(ttl * 1000)
+            )
+
+    def _with_ttl(self, value: dict) -> tuple[dict, int | None]:
+        ttl = self._settings.SETTINGS_CACHE_TTL
+
+        if not ttl:
+            return value, None
+
+        jitter = self._settings.SETTINGS_CACHE_TTL_JITTER
+        ttl *= random.uniform(1 - jitter, 1 + jitter)
+
+        return (
+            {**value, REFRESH_AT_FIELD: time.time() + ttl},
+            int((ttl + self._settings.SETTINGS_CACHE_STALE_TTL) * 1000),
+        )
+
+    async def invalidate(self, key: str) -> None:
+        try:
+            await self._client.delete(key)
+
+        # Положительная запись с TTL и отрицательная истекут сами
+        except aioredis.RedisError as ex:
+            logger.warning("cache invalidation of %s failed: %s", key, ex)
+
+    async def _get(self, key: str, codec: CacheCodec) -> dict | None:
+        return await self._call(lambda: codec.get(self._client, key))
+
+    async def _call[Result](self, operation: Callable[[], Awaitable[Result]]) -> Result:
+        if self._guard is None:
+            return await operation()
+
+        return await self._guard.call(operation)
+
+    async def _load(self, key: str, load: Loader) -> dict | None:
+        try:
+            with DB_READ_SECONDS.time():
+                async with within_deadline():
+                    value = await load()
+
+        # БД не ответила (или не уложилась в бюджет запроса) - отдаём
+        # последнее известное значение, если оно есть
+        except Exception as ex:
+            if isinstance(ex, TimeoutError):
+                DB_DEADLINE_EXCEEDED.inc()
+
+            last_known = self._last_known.get(key)
+
+            if last_known is None:
+                raise
+
+            logger.warning("settings %s served from memory: %r", key, ex)
+            DEGRADED_SETTINGS.inc()
+            return last_known
+
+        self._last_known.remember(key, value)
+        return value
+
+    async def _load_and_store(
+        self, key: str, load: Loader, codec: CacheCodec
+    ) -> dict | None:
+        value = await self._load(key, load)
+
+        try:
+            if value is not None:
+                await self.write(key, value, codec)
+            else:
+                await self.write_missing(key, codec)
+
+        except aioredis.RedisError:
+            pass
+
+        return value
+
+    async def _load_missing(
+        self, key: str, load: Loader, codec: CacheCodec
+    ) -> dict | None:
+        if not self._settings.SETTINGS_CACHE_LOCK_ENABLED:
+            return await self._load_and_store(key, load, codec)
+
+        try:
+            token = await self._acquire_lock(key)
+
+            # Загружает другой воркер - ждём значение в кеше
+            if token is None:
+                cached = await self._wait_for_value(key, codec)
+
+                if cached is not None:
+                    return self._strip(cached)
+
+                # Не дождались - читаем сами
+                return await self._load_and_store(key, load, codec)
+
+        except aioredis.RedisError:
+            return await self._load(key, load)
+
+        try:
+            return await self._load_and_store(key, load, codec)
+        finally:
+            await self._release_lock(key, token)
+
+    async def _refresh_stale(
+        self, key: str, load: Loader, codec: CacheCodec, stale: dict
+    ) -> dict | None:
+        if not self._settings.SETTINGS_CACHE_LOCK_ENABLED:
+            return await self._load_and_store(key, load, codec)
+
+        try:
+            token = await self._acquire_lock(key)
+        except aioredis.RedisError:
+            return stale
+
+        # Обновляет другой воркер
+        if token is None:
+            return stale
+
+        try:
+            return await self._load_and_store(key, load, codec)
+        finally:
+            await self._release_lock(key, token)
+
+    async def _acquire_lock(self, key: str) -> str | None:
+        token = secrets.token_hex(8)
+        acquired = await self._call(
+            lambda: self._client.set(
+                self._keyspace.cache_lock(key),
+                token,
+                nx=True,
+                px=int(self._settings.SETTINGS_CACHE_LOCK_TIMEOUT * 1000),
+            )
+        )
+
+        return token if acquired else None
+
+    async def _release_lock(self, key: str, token: str) -> None:
+        # Снимаем и после бюджета запроса: иначе другие воркеры ждут таймаута
+        try:
+            await self._release_lock_script(
+                keys=[self._keyspace.cache_lock(key)], args=[token]
+            )
+
+        # Блокировка снимется сама по таймауту
+        except aioredis.RedisError:
+            pass
+
+    async def _wait_for_value(self, key: str, codec: CacheCodec) -> dict | None:
+        wait_until = time.monotonic() + self._settings.SETTINGS_CACHE_LOCK_WAIT
+
+        try:
+            async with within_deadline():
+                while time.monotonic() < wait_until:
+                    await asyncio.sleep(LOCK_POLL_INTERVAL)
+                    cached = await self._get(key, codec)
+
+                    if cached is not None:
+                        return cached
+
+        # Бюджет запроса кончился раньше, чем появилось значение
+        except TimeoutError:
+            pass
+
+        return None
+
+    @staticmethod
+    def _strip(value: dict) -> dict | None:
+        if value.get(MISSING_FIELD):
+            return None
+
+        value.pop(REFRESH_AT_FIELD, None)
+        return value
@@ -1,119 +1,423 @@
-import json
+import asyncio
+import itertools
+from collections import Counter
+from typing import AbstractSet, Awaitable, Callable, Iterator, Sequence
 from dataclasses import asdict
+from functools import cached_property
 
 from redis import asyncio as aioredis
+from redis.commands.core import AsyncScript
 
-from src.domain.repositories import CdnRequestCounterRepository, BaseCrudRepository
+from src.core.metrics import STAGE_SECONDS, CACHE_REQUESTS, DEGRADED_REQUESTS
+from src.domain.enums import ResourceTypeEnum
+from src.domain.repositories import (
+    CdnRequestCounterRepository,
+    BaseCrudRepository,
+    BalancingDecisionRepository,
+)
 from src.domain.schemas import (
+    BalancingDecision,
     CdnServer as DomainCdnServer,
     OriginServer as DomainOriginServer,
 )
+from src.infrastructure.cache.codecs import CacheCodec, JsonCodec
+from src.infrastructure.cache.guard import (
+    LocalCounters,
+    RedisCircuitOpenError,
+    RedisGuard,
+)
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.cache.leasing import CounterBlockLeaser
+from src.infrastructure.cache.read_through import ReadThroughCache
+from src.infrastructure.cache.shared_counters import SharedCounters
+
+DEFAULT_KEYSPACE = RedisKeyspace()
+DEFAULT_CODEC = JsonCodec()
+
+SCRIPTED_DECISION_SECONDS = STAGE_SECONDS.labels("scripted_decision")
+UNKNOWN_ORIGINS = CACHE_REQUESTS.labels("origin", "unknown")
+DEGRADED_COUNTER = DEGRADED_REQUESTS.labels("counter")
+
+# Сколько курсоров раскладки по шардам (по серверам) держит воркер
+SHARD_CURSORS_MAX_ENTRIES = 10_000
 
 
 class RedisCdnRequestCounterRepository(CdnRequestCounterRepository):
-    def __init__(self, server_name: str, client: aioredis.Redis):
+    def __init__(
+        self,
+        server_name: str,
+        client: aioredis.Redis,
+        keyspace: RedisKeyspace = DEFAULT_KEYSPACE,
+    ):
         super().__init__(server_name)
         self._client = client
+        self._keyspace = keyspace
+
+    @cached_property
+    def counter_key(self):
+        return self._keyspace.counter(self._server_name)
 
     async def increment(self) -> int:
         return await self._client.incr(self.counter_key)
 
+    async def reserve(self, count: int) -> Sequence[int]:
+        last_value = await self._client.incrby(self.counter_key, count)
+        return range(last_value - count + 1, last_value + 1)
+
     async def reset(self) -> None:
         return await self._client.delete(self.counter_key)
 
 
-# TODO: тут прям совсем сырой дублирующийся код, по идее можно обобщить, но на это нужно время :)
-class CachedCdnServerRepository(BaseCrudRepository[DomainCdnServer]):
+class ShardCursors:
+    """
+    Курсоры шардов воркера по серверам: запросы сервера раскладываются по его
+    шардам по кругу. С одним курсором на все сервера чередование запросов
+    разных серверов закрепило бы каждый сервер за одними и теми же шардами
+    """
+
+    __slots__ = ("_cursors", "_max_entries")
+
+    def __init__(self, max_entries: int = SHARD_CURSORS_MAX_ENTRIES) -> None:
+        self._cursors: dict[str, Iterator[int]] = {}
+        self._max_entries = max_entries
+
+    def cursor(self, server_name: str) -> Iterator[int]:
+        cursor = self._cursors.get(server_name)
+
+        if cursor is None:
+            if len(self._cursors) >= self._max_entries:
+                # Выбрасываем самый старый курсор
+                del self._cursors[next(iter(self._cursors))]
+
+            cursor = self._cursors[server_name] = itertools.count()
+
+        return cursor
+
+
+class ShardedRedisCdnRequestCounterRepository(CdnRequestCounterRepository):
+    """
+    Счётчик, разбитый на несколько ключей (в кластере - в разных слотах).
+
+    Запросы по очереди раскладываются по шардам, а значение i-го шарда v
+    превращается в общее значение (v - 1) * shards + i + 1. Каждое общее
+    значение выдаётся один раз, и при равномерной раскладке доля "каждого
+    N-ного запроса" сохраняется без чтения остальных шардов.
+    """
 
     def __init__(
         self,
-        persistent_repository: BaseCrudRepository[DomainCdnServer],
-        cache_client: aioredis.Redis,
-    ) -> None:
-        self._cache_client = cache_client
-        self._persistent_repository = persistent_repository
+        server_name: str,
+        client: aioredis.Redis,
+        shards: int,
+        cursors: ShardCursors,
+        keyspace: RedisKeyspace = DEFAULT_KEYSPACE,
+    ):
+        super().__init__(server_name)
+        self._client = client
+        self._shards = shards
+        self._keyspace = keyspace
+        self._shard_cursor = cursors.cursor(server_name)
+
+    async def increment(self) -> int:
+        shard = next(self._shard_cursor) % self._shards
+        value = await self._client.incr(
+            self._keyspace.counter(self._server_name, shard)
+        )
 
-    async def create(self, data: DomainCdnServer) -> int:
-        return await self._persistent_repository.create(data)
+        return (value - 1) * self._shards + shard + 1
 
-    async def update(self, id_: int, data: DomainCdnServer) -> None:
-        await self._persistent_repository.update(id_=id_, data=data)
-        await self._cache_client.set("CDN_SERVER", json.dumps(asdict(data)))
+    async def reserve(self, count: int) -> Sequence[int]:
+        # Пакет раскладываем по шардам так же, как одиночные запросы: значения
+        # одного шарда дают одинаковый остаток от деления на shards, и пакет
+        # из одного шарда мог бы целиком разминуться с "каждым N-ным"
+        counts = Counter(next(self._shard_cursor) % self._shards for _ in range(count))
+        last_values = await asyncio.gather(
+            *(
+                self._client.incrby(self._keyspace.counter(self._server_name, shard), n)
+                for shard, n in counts.items()
+            )
+        )
 
-    async def read(self, **filters) -> DomainCdnServer | None:
-        cache_healthy: bool = True
+        return [
+            (value - 1) * self._shards + shard + 1
+            for (shard, n), last_value in zip(counts.items(), last_values)
+            for value in range(last_value - n + 1, last_value + 1)
+        ]
 
-        # Пытаемся забрать из кеша
-        try:
-            cached_settings = await self._cache_client.get("CDN_SERVER")
+    async def reset(self) -> None:
+        # Шарды лежат в разных слотах - удаляем по одному
+        for shard in range(self._shards):
+            await self._client.delete(self._keyspace.counter(self._server_name, shard))
 
-            if cached_settings is not None:
-                return DomainCdnServer(**json.loads(cached_settings))
 
-        except aioredis.RedisError:
-            cache_healthy = False
+class BlockLeasedCdnRequestCounterRepository(CdnRequestCounterRepository):
+    """
+    Счётчик, который ходит в Redis раз в блок значений, а не на каждый запрос
+    (см. CounterBlockLeaser про отличия от точного INCR)
+    """
 
-        # Получаем из базы (если кеш пуст или отвалился)
-        orm_settings = await self._persistent_repository.read(**filters)
+    def __init__(
+        self,
+        server_name: str,
+        leaser: CounterBlockLeaser,
+        keyspace: RedisKeyspace = DEFAULT_KEYSPACE,
+    ):
+        super().__init__(server_name)
+        self._leaser = leaser
+        self._keyspace = keyspace
 
-        # Кладём в кеш, если что-то нашли и кеш живой
-        if orm_settings is not None and cache_healthy:
-            try:
-                await self._cache_client.set(
-                    "CDN_SERVER", json.dumps(asdict(orm_settings))
-                )
-            except aioredis.RedisError:
-                pass
+    @cached_property
+    def counter_key(self):
+        return self._keyspace.counter(self._server_name)
 
-        return orm_settings
+    async def increment(self) -> int:
+        return await self._leaser.next_value(self.counter_key)
+
+    async def reset(self) -> None:
+        await self._leaser.reset(self.counter_key)
 
 
-class CachedOriginServerRepository(BaseCrudRepository[DomainOriginServer]):
+class SharedMemoryCdnRequestCounterRepository(CdnRequestCounterRepository):
+    """
+    Точный счётчик в разделяемой памяти хоста, без Redis на пути запроса
+    (см. SharedCounters)
+    """
+
+    def __init__(
+        self,
+        server_name: str,
+        counters: SharedCounters,
+        keyspace: RedisKeyspace = DEFAULT_KEYSPACE,
+    ):
+        super().__init__(server_name)
+        self._counters = counters
+        self._keyspace = keyspace
+
+    @cached_property
+    def counter_key(self):
+        return self._keyspace.counter(self._server_name)
+
+    async def increment(self) -> int:
+        return await self._counters.add(self.counter_key, 1)
+
+    async def reserve(self, count: int) -> Sequence[int]:
+        last_value = await self._counters.add(self.counter_key, count)
+        return range(last_value - count + 1, last_value + 1)
+
+    async def reset(self) -> None:
+        await self._counters.reset(self.counter_key)
+
+
+class GuardedCdnRequestCounterRepository(CdnRequestCounterRepository):
+    """
+    Счётчик в Redis за предохранителем (см. RedisGuard): вызовы ограничены
+    бюджетом запроса, а пока цепь разомкнута, значения выдаёт локальный
+    счётчик воркера (см. LocalCounters)
+    """
 
     def __init__(
         self,
-        persistent_repository: BaseCrudRepository[DomainOriginServer],
         server_name: str,
-        cache_client: aioredis.Redis,
+        counter_repository: CdnRequestCounterRepository,
+        guard: RedisGuard,
+        local_counters: LocalCounters,
+    ):
+        super().__init__(server_name)
+        self._counter_repository = counter_repository
+        self._guard = guard
+        self._local_counters = local_counters
+
+    async def increment(self) -> int:
+        try:
+            value = await self._guard.call(self._counter_repository.increment)
+
+        except RedisCircuitOpenError:
+            DEGRADED_COUNTER.inc()
+            return self._local_counters.add(self._server_name, 1)
+
+        self._local_counters.remember(self._server_name, value)
+        return value
+
+    async def reserve(self, count: int) -> Sequence[int]:
+        try:
+            values = await self._guard.call(
+                lambda: self._counter_repository.reserve(count)
+            )
+
+        except RedisCircuitOpenError:
+            DEGRADED_COUNTER.inc(count)
+            last_value = self._local_counters.add(self._server_name, count)
+            return range(last_value - count + 1, last_value + 1)
+
+        if values:
+            self._local_counters.remember(self._server_name, max(values))
+
+        return values
+
+    async def reset(self) -> None:
+        await self._counter_repository.reset()
+
+
+class RedisScriptedDecisionRepository(BalancingDecisionRepository):
+    """
+    Читает настройки, увеличивает счётчик и принимает решение одним скриптом
+    """
+
+    def __init__(
+        self,
+        script: AsyncScript,
+        keyspace: RedisKeyspace = DEFAULT_KEYSPACE,
+        known_origins: AbstractSet[str] | None = None,
+        guard: RedisGuard | None = None,
+    ) -> None:
+        self._script = script
+        self._keyspace = keyspace
+        self._known_origins = known_origins
+        self._guard = guard
+
+    async def decide(
+        self, server_name: str, origin_missing: bool = False
+    ) -> BalancingDecision | None:
+        # Неизвестный сервер - скрипт сразу берёт коэффициент CDN
+        if self._known_origins is not None and server_name not in self._known_origins:
+            origin_missing = True
+
+        def run_script() -> Awaitable:
+            return self._script(
+                keys=[
+                    self._keyspace.cdn_settings(),
+                    self._keyspace.origin_settings(server_name),
+                    self._keyspace.scripted_counter(server_name),
+                ],
+                args=["1" if origin_missing else "0"],
+            )
+
+        with SCRIPTED_DECISION_SECONDS.time():
+            if self._guard is not None:
+                result = await self._guard.call(run_script)
+            else:
+                result = await run_script()
+
+        if result[0] == "MISS":
+            return None
+
+        return BalancingDecision(type=ResourceTypeEnum[result[0]], cdn_host=result[1])
+
+
+class CachedRepository[Entity](BaseCrudRepository[Entity]):
+    """
+    Репозиторий настроек с кешем Redis поверх репозитория БД (cache-aside).
+    Запись хранится по ключу key в формате codec; name - имя репозитория
+    в метриках кеша
+    """
+
+    def __init__(
+        self,
+        persistent_repository: BaseCrudRepository[Entity],
+        cache: ReadThroughCache,
+        codec: CacheCodec,
+        entity_type: type[Entity],
+        key: str,
+        name: str,
     ) -> None:
-        self._server_name = server_name
-        self._cache_client = cache_client
         self._persistent_repository = persistent_repository
+        self._cache = cache
+        self._codec = codec
+        self._entity_type = entity_type
+        self._key = key
+        self._name = name
 
-    @property
-    def server_name(self) -> str:
-        return "server: %s" % self._server_name
+    async def create(self, data: Entity) -> int:
+        id_ = await self._persistent_repository.create(data)
+        # Сбрасываем отметку "в БД нет"
+        await self._cache.invalidate(self._key)
 
-    async def create(self, data: DomainOriginServer) -> None:
-        await self._persistent_repository.create(data)
+        return id_
 
-    async def update(self, id_: int, data: DomainOriginServer) -> None:
+    async def update(self, id_: int | None, data: Entity) -> None:
         await self._persistent_repository.update(id_, data)
-        await self._cache_client.set(self.server_name, json.dumps(asdict(data)))
+        await self._cache.write(self._key, asdict(data), self._codec)
+
+    async def read(self, **filters) -> Entity | None:
+        async def load() -> dict | None:
+            entity = await self._persistent_repository.read(**filters)
+            return asdict(entity) if entity is not None else None
+
+        # Кеш, а при промахе или его недоступности - база
+        record = await self._cache.read(self._key, load, self._codec, self._name)
+        return self._entity_type(**record) if record is not None else None
+
+
+class CachedCdnServerRepository(CachedRepository[DomainCdnServer]):
+
+    def __init__(
+        self,
+        persistent_repository: BaseCrudRepository[DomainCdnServer],
+        cache: ReadThroughCache,
+        keyspace: RedisKeyspace = DEFAULT_KEYSPACE,
+        codec: CacheCodec = DEFAULT_CODEC,
+    ) -> None:
+        super().__init__(
+            persistent_repository,
+            cache,
+            codec,
+            DomainCdnServer,
+            keyspace.cdn_settings(),
+            "cdn",
+        )
+
+
+class CachedOriginServerRepository(CachedRepository[DomainOriginServer]):
+
+    def __init__(
+        self,
+        persistent_repository: BaseCrudRepository[DomainOriginServer],
+        server_name: str,
+        cache: ReadThroughCache,
+        keyspace: RedisKeyspace = DEFAULT_KEYSPACE,
+        known_origins: AbstractSet[str] | None = None,
+        codec: CacheCodec = DEFAULT_CODEC,
+    ) -> None:
+        super().__init__(
+            persistent_repository,
+            cache,
+            codec,
+            DomainOriginServer,
+            keyspace.origin_settings(server_name),
+            "origin",
+        )
+        self._server_name = server_name
+        self._known_origins = known_origins
 
     async def read(self, **filters) -> DomainOriginServer | None:
-        cache_healthy: bool = True
+        # Сервера нет среди известных - не ходим ни в кеш, ни в базу
+        if (
+            self._known_origins is not None
+            and self._server_name not in self._known_origins
+        ):
+            UNKNOWN_ORIGINS.inc()
+            return None
+
+        return await super().read(**filters)
 
-        # Пытаемся забрать из кеша
-        try:
-            cached_settings = await self._cache_client.get(self.server_name)
 
-            if cached_settings is not None:
-                return DomainOriginServer(**json.loads(cached_settings))
+class PerServerOriginRepository(BaseCrudRepository[DomainOriginServer]):
+    """
+    Кеширующие репозитории привязаны к имени сервера (ключу в кеше). Этот
+    репозиторий создаёт их по имени из фильтра или данных - для запросов,
+    в которых встречаются разные сервера
+    """
 
-        except aioredis.RedisError:
-            cache_healthy = False
+    def __init__(
+        self, factory: Callable[[str], BaseCrudRepository[DomainOriginServer]]
+    ) -> None:
+        self._factory = factory
 
-        # Получаем из базы (если кеш пуст или отвалился)
-        orm_settings = await self._persistent_repository.read(**filters)
+    async def create(self, data: DomainOriginServer) -> int:
+        return await self._factory(data.name).create(data)
 
-        # Кладём в кеш, если что-то нашли и кеш живой
-        if orm_settings is not None and cache_healthy:
-            try:
-                await self._cache_client.set(
-                    self.server_name, json.dumps(asdict(orm_settings))
-                )
-            except aioredis.RedisError:
-                pass
+    async def read(self, **filters) -> DomainOriginServer | None:
+        return await self._factory(filters["name"]).read(**filters)
 
-        return orm_settings
+    async def update(self, id_: int | None, data: DomainOriginServer) -> None:
+        await self._factory(data.name).update(id_, data)
@@ -0,0 +1,45 @@
+# Решение "каждый N-ный запрос на origin" за один вызов EVALSHA.
+#
+# KEYS[1] - настройки CDN, KEYS[2] - настройки origin сервера, KEYS[3] - счётчик
+# ARGV[1] - "1", если origin сервера заведомо нет (берём коэффициент CDN)
+#
+# Возвращает {"ORIGIN" | "CDN", host CDN} или {"MISS"}, если настроек нет в кеше
+# (счётчик в этом случае не трогаем). Отметка {"_missing": true} вместо настроек
+# origin равносильна ARGV[1] = "1", вместо настроек CDN - даёт {"MISS"}.
+NTH_REQUEST_DECISION_SCRIPT = """
+local cdn_raw = redis.call('GET', KEYS[1])
+if not cdn_raw then
+    return {'MISS'}
+end
+
+local cdn = cjson.decode(cdn_raw)
+-- CDN заведомо нет - решение принимает приложение
+if cdn['_missing'] then
+    return {'MISS'}
+end
+
+local ratio = nil
+
+local origin_raw = redis.call('GET', KEYS[2])
+if origin_raw then
+    local origin = cjson.decode(origin_raw)
+    -- Для отметки "origin нет" поля коэффициента нет - берём коэффициент CDN
+    if origin['redirecting_ratio'] and origin['redirecting_ratio'] ~= cjson.null then
+        ratio = origin['redirecting_ratio']
+    end
+elseif ARGV[1] ~= '1' then
+    return {'MISS'}
+end
+
+if not ratio or ratio == 0 then
+    ratio = cdn['default_redirecting_ratio']
+end
+
+local counter = redis.call('INCR', KEYS[3])
+
+if counter % ratio == 0 then
+    return {'ORIGIN', cdn['host_name']}
+end
+
+return {'CDN', cdn['host_name']}
+"""
@@ -0,0 +1,267 @@
+import asyncio
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+
+from redis import asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+# Заголовок области: метка формата, число слотов
+HEADER = struct.Struct("<8sQ")
+HEADER_SIZE = 64
+MAGIC = b"SLBCNT01"
+
+# Слот: отпечаток ключа счётчика и значение
+SLOT = struct.Struct("<16sq")
+SLOT_SIZE = 32
+VALUE_OFFSET = 16
+VALUE = struct.Struct("<q")
+EMPTY_DIGEST = bytes(16)
+
+
+class SharedCounterRegion:
+    """
+    Счётчики в разделяемой памяти (файл в /dev/shm, отображённый в память):
+    все воркеры хоста видят одни и те же значения.
+
+    Слот счётчика ищется открытой адресацией по отпечатку ключа, слоты
+    не освобождаются. Атомарных операций над памятью в Python нет, поэтому
+    каждый слот на время чтения-записи закрывается блокировкой POSIX на его
+    диапазон байт файла - это системный вызов, но без похода по сети.
+    Блокировки POSIX принадлежат процессу, поэтому между захватом и снятием
+    блокировки не должно быть await
+    """
+
+    def __init__(self, path: str, slots: int) -> None:
+        self._path = path
+        self._slots = slots
+        self._fd: int | None = None
+        self._memory: mmap.mmap | None = None
+
+    @property
+    def slots(self) -> int:
+        return self._slots
+
+    def open(self) -> None:
+        if self._memory is not None:
+            return
+
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        try:
+            # Размечает область тот воркер, который первым взял заголовок
+            with _locked(fd, 0, HEADER_SIZE):
+                if os.fstat(fd).st_size >= HEADER_SIZE:
+                    magic, slots = HEADER.unpack(os.pread(fd, HEADER.size, 0))
+                else:
+                    magic, slots = MAGIC, self._slots
+                    os.ftruncate(fd, HEADER_SIZE + slots * SLOT_SIZE)
+                    os.pwrite(fd, HEADER.pack(MAGIC, slots), 0)
+
+            if magic != MAGIC:
+                raise ValueError(f"{self._path} is not a shared counter region")
+
+            if slots != self._slots:
+                logger.warning(
+                    "shared counter region %s has %s slots, %s configured",
+                    self._path,
+                    slots,
+                    self._slots,
+                )
+                self._slots = slots
+
+            self._memory = mmap.mmap(fd, HEADER_SIZE + slots * SLOT_SIZE)
+
+        except BaseException:
+            os.close(fd)
+            raise
+
+        self._fd = fd
+
+    def close(self) -> None:
+        if self._memory is not None:
+            self._memory.close()
+            os.close(self._fd)
+            self._memory = None
+            self._fd = None
+
+    def find(self, key: str) -> int | None:
+        return self._probe(digest(key), initial=None)
+
+    def claim(self, key: str, initial: int) -> int | None:
+        """
+        Слот ключа; новый слот заводится со значением initial.
+        None - свободных слотов не осталось
+        """
+        return self._probe(digest(key), initial=initial)
+
+    def add(self, slot: int, count: int) -> int:
+        offset = self._value_offset(slot)
+
+        with _locked(self._fd, offset, VALUE.size):
+            value = VALUE.unpack_from(self._memory, offset)[0] + count
+            VALUE.pack_into(self._memory, offset, value)
+
+        return value
+
+    def get(self, slot: int) -> int:
+        offset = self._value_offset(slot)
+
+        with _locked(self._fd, offset, VALUE.size):
+            return VALUE.unpack_from(self._memory, offset)[0]
+
+    def set(self, slot: int, value: int) -> None:
+        offset = self._value_offset(slot)
+
+        with _locked(self._fd, offset, VALUE.size):
+            VALUE.pack_into(self._memory, offset, value)
+
+    def _probe(self, key_digest: bytes, initial: int | None) -> int | None:
+        self.open()
+        start = int.from_bytes(key_digest[:8], "little") % self._slots
+
+        for step in range(self._slots):
+            slot = (start + step) % self._slots
+            offset = HEADER_SIZE + slot * SLOT_SIZE
+
+            with _locked(self._fd, offset, SLOT_SIZE):
+                slot_digest, _ = SLOT.unpack_from(self._memory, offset)
+
+                if slot_digest == key_digest:
+                    return slot
+
+                if slot_digest == EMPTY_DIGEST:
+                    if initial is None:
+                        return None
+
+                    SLOT.pack_into(self._memory, offset, key_digest, initial)
+                    return slot
+
+        return None
+
+    def _value_offset(self, slot: int) -> int:
+        return HEADER_SIZE + slot * SLOT_SIZE + VALUE_OFFSET
+
+
+class _locked:
+    __slots__ = ("_fd", "_start", "_length")
+
+    def __init__(self, fd: int, start: int, length: int) -> None:
+        self._fd = fd
+        self._start = start
+        self._length = length
+
+    def __enter__(self) -> None:
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self._length, self._start)
+
+    def __exit__(self, *exc_info) -> None:
+        fcntl.lockf(self._fd, fcntl.LOCK_UN, self._length, self._start)
+
+
+def digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+class SharedCounters:
+    """
+    Счётчики обращений в разделяемой памяти хоста с копией в Redis.
+
+    Ключи - те же, что у счётчиков INCR в Redis. Новый для области счётчик
+    начинается со значения из Redis, а воркер раз в snapshot_interval секунд
+    записывает туда значения своих счётчиков: после перезагрузки хоста
+    правило "каждый N-ный запрос" продолжается с последней копии (повтор -
+    не больше запросов за один интервал). Если слоты закончились, счётчик
+    работает через INCRBY в Redis
+    """
+
+    def __init__(
+        self,
+        region: SharedCounterRegion,
+        client: aioredis.Redis | aioredis.RedisCluster,
+        snapshot_interval: float,
+    ) -> None:
+        self._region = region
+        self._client = client
+        self._snapshot_interval = snapshot_interval
+        self._slots: dict[str, int | None] = {}
+        self._snapshotted: dict[str, int] = {}
+
+    async def add(self, key: str, count: int) -> int:
+        try:
+            slot = self._slots[key]
+        except KeyError:
+            slot = await self._attach(key)
+
+        if slot is None:
+            return await self._client.incrby(key, count)
+
+        return self._region.add(slot, count)
+
+    async def reset(self, key: str) -> None:
+        slot = self._slots[key] if key in self._slots else self._region.find(key)
+
+        if slot is not None:
+            self._region.set(slot, 0)
+
+        self._snapshotted.pop(key, None)
+        await self._client.delete(key)
+
+    async def snapshot(self) -> None:
+        values = {
+            key: self._region.get(slot)
+            for key, slot in self._slots.items()
+            if slot is not None
+        }
+        changed = {
+            key: value
+            for key, value in values.items()
+            if self._snapshotted.get(key) != value
+        }
+
+        if not changed:
+            return
+
+        async with self._client.pipeline(transaction=False) as pipeline:
+            for key, value in changed.items():
+                pipeline.set(key, value)
+
+            await pipeline.execute()
+
+        self._snapshotted.update(changed)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self._snapshot_interval)
+
+            try:
+                await self.snapshot()
+            except aioredis.RedisError as ex:
+                logger.warning("shared counters snapshot failed: %s", ex)
+
+    async def _attach(self, key: str) -> int | None:
+        slot = self._region.find(key)
+
+        if slot is None:
+            # Копию читаем до захвата слота: под блокировкой await нельзя.
+            # Если слот тем временем завёл другой воркер, копия не нужна
+            try:
+                initial = int(await self._client.get(key) or 0)
+            except aioredis.RedisError as ex:
+                logger.warning("shared counter %s restored from zero: %s", key, ex)
+                initial = 0
+
+            slot = self._region.claim(key, initial)
+
+            if slot is None:
+                logger.warning(
+                    "shared counter region is full (%s slots), %s stays in Redis",
+                    self._region.slots,
+                    key,
+                )
+
+        self._slots[key] = slot
+        return slot
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import AbstractSet, Awaitable, Callable, Mapping
+
+from redis import asyncio as aioredis
+
+from src.core.hashing import RendezvousHasher
+from src.core.metrics import CACHE_REQUESTS
+from src.core.selectors import WeightedSelector
+from src.domain.repositories import BaseCrudRepository
+from src.domain.schemas import (
+    CdnHost as DomainCdnHost,
+    CdnServer as DomainCdnServer,
+    OriginServer as DomainOriginServer,
+)
+from src.infrastructure.cache.keys import RedisKeyspace
+
+logger = logging.getLogger(__name__)
+
+SettingsLoader = Callable[
+    [],
+    Awaitable[
+        tuple[DomainCdnServer | None, list[DomainOriginServer], list[DomainCdnHost]]
+    ],
+]
+
+
+@dataclass(slots=True, frozen=True)
+class SettingsSnapshot:
+    version: int
+    cdn: DomainCdnServer | None
+    origins: Mapping[str, DomainOriginServer] = field(default_factory=dict)
+    cdn_hosts: tuple[DomainCdnHost, ...] = ()
+    # Выбор хоста CDN по весам, строится один раз на снимок
+    cdn_selector: WeightedSelector[str] | None = None
+    # Закрепление объектов за хостами CDN для стратегии CONSISTENT_HASH
+    cdn_hasher: RendezvousHasher[str] | None = None
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+class SettingsSnapshotStore:
+    """
+    Снимок настроек CDN и origin серверов в памяти воркера.
+
+    Обновляется по сообщениям из канала изменений Redis, а если сообщения
+    не приходят - не реже, чем раз в ttl секунд.
+    Канал слушается через pubsub_client (в кластере - отдельный клиент узла,
+    сообщения pub/sub расходятся по всему кластеру).
+    """
+
+    def __init__(
+        self,
+        loader: SettingsLoader,
+        cache_client: aioredis.Redis | aioredis.RedisCluster,
+        pubsub_client: aioredis.Redis,
+        channel: str,
+        ttl: float,
+        keyspace: RedisKeyspace,
+    ) -> None:
+        self._loader = loader
+        self._cache_client = cache_client
+        self._pubsub_client = pubsub_client
+        self._channel = channel
+        self._ttl = ttl
+        self._version_key = keyspace.settings_version()
+        self._snapshot: SettingsSnapshot | None = None
+
+    @property
+    def snapshot(self) -> SettingsSnapshot | None:
+        return self._snapshot
+
+    @property
+    def known_origins(self) -> AbstractSet[str] | None:
+        """
+        Имена заведённых origin серверов (None - снимок ещё не загружен).
+        Неизвестное имя отсекается без обращений к Redis и БД
+        """
+        return self._snapshot.origins.keys() if self._snapshot else None
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version if self._snapshot else -1
+
+    async def refresh(self) -> SettingsSnapshot:
+        # Версию читаем до загрузки, чтобы не пропустить изменение во время неё
+        try:
+            version = int(await self._cache_client.get(self._version_key) or 0)
+        except aioredis.RedisError:
+            version = max(self.version, 0)
+
+        cdn_settings, origins, cdn_hosts = await self._loader()
+        weighted_hosts = [(host.host_name, host.weight) for host in cdn_hosts]
+        has_weighted_hosts = any(weight > 0 for _, weight in weighted_hosts)
+
+        self._snapshot = SettingsSnapshot(
+            version=version,
+            cdn=cdn_settings,
+            origins={origin.name: origin for origin in origins},
+            cdn_hosts=tuple(cdn_hosts),
+            cdn_selector=(
+                WeightedSelector(weighted_hosts) if has_weighted_hosts else None
+            ),
+            cdn_hasher=(
+                RendezvousHasher(weighted_hosts) if has_weighted_hosts else None
+            ),
+        )
+
+        return self._snapshot
+
+    async def run(self) -> None:
+        """
+        Фоновая задача: слушает канал изменений и обновляет снимок
+        """
+        while True:
+            try:
+                async with self._pubsub_client.pubsub() as pubsub:
+                    await pubsub.subscribe(self._channel)
+
+                    # Подписались - перечитываем, чтобы не потерять изменения
+                    await self._safe_refresh()
+
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=self._ttl
+                        )
+
+                        if message is not None and self._is_newer(message):
+                            await self._safe_refresh()
+
+                        elif self._is_expired():
+                            await self._safe_refresh()
+
+            # Redis недоступен - живём на обновлении по TTL
+            except aioredis.RedisError as ex:
+                logger.warning("settings changes channel is unavailable: %s", ex)
+                await asyncio.sleep(self._ttl)
+
+                if self._is_expired():
+                    await self._safe_refresh()
+
+    def _is_newer(self, message: dict) -> bool:
+        try:
+            return int(message["data"]) > self.version
+
+        # Чужое сообщение в канале - пропускаем, подписка остаётся
+        except ValueError:
+            logger.warning("unexpected settings change message: %r", message["data"])
+            return False
+
+    def _is_expired(self) -> bool:
+        return (
+            self._snapshot is None
+            or time.monotonic() - self._snapshot.loaded_at >= self._ttl
+        )
+
+    async def _safe_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("settings snapshot refresh failed")
+
+
+class SettingsChangeNotifier:
+    """
+    Сообщает всем воркерам об изменении настроек
+    """
+
+    def __init__(
+        self,
+        cache_client: aioredis.Redis | aioredis.RedisCluster,
+        pubsub_client: aioredis.Redis,
+        channel: str,
+        keyspace: RedisKeyspace,
+    ) -> None:
+        self._cache_client = cache_client
+        self._pubsub_client = pubsub_client
+        self._channel = channel
+        self._version_key = keyspace.settings_version()
+
+    async def notify(self) -> None:
+        try:
+            version = await self._cache_client.incr(self._version_key)
+            await self._pubsub_client.publish(self._channel, version)
+
+        # Воркеры всё равно перечитают настройки по TTL
+        except aioredis.RedisError as ex:
+            logger.warning("settings change notification failed: %s", ex)
+
+
+class SnapshotCdnServerRepository(BaseCrudRepository[DomainCdnServer]):
+    _snapshot_hits = CACHE_REQUESTS.labels("snapshot_cdn", "hit")
+    _snapshot_misses = CACHE_REQUESTS.labels("snapshot_cdn", "miss")
+
+    def __init__(
+        self,
+        fallback_repository: BaseCrudRepository[DomainCdnServer],
+        store: SettingsSnapshotStore,
+    ) -> None:
+        self._fallback_repository = fallback_repository
+        self._store = store
+
+    async def create(self, data: DomainCdnServer) -> int:
+        return await self._fallback_repository.create(data)
+
+    async def update(self, id_: int | None, data: DomainCdnServer) -> None:
+        await self._fallback_repository.update(id_=id_, data=data)
+
+    async def read(self, **filters) -> DomainCdnServer | None:
+        snapshot = self._store.snapshot
+
+        if snapshot is not None and not filters:
+            self._snapshot_hits.inc()
+            return snapshot.cdn
+
+        self._snapshot_misses.inc()
+        return await self._fallback_repository.read(**filters)
+
+
+class SnapshotOriginServerRepository(BaseCrudRepository[DomainOriginServer]):
+    _snapshot_hits = CACHE_REQUESTS.labels("snapshot_origin", "hit")
+    _snapshot_misses = CACHE_REQUESTS.labels("snapshot_origin", "miss")
+
+    def __init__(
+        self,
+        fallback_repository: BaseCrudRepository[DomainOriginServer],
+        store: SettingsSnapshotStore,
+    ) -> None:
+        self._fallback_repository = fallback_repository
+        self._store = store
+
+    async def create(self, data: DomainOriginServer) -> int:
+        return await self._fallback_repository.create(data)
+
+    async def update(self, id_: int | None, data: DomainOriginServer) -> None:
+        await self._fallback_repository.update(id_=id_, data=data)
+
+    async def read(self, **filters) -> DomainOriginServer | None:
+        snapshot = self._store.snapshot
+
+        # Из снимка отдаём только поиск по имени
+        if snapshot is not None and filters.keys() == {"name"}:
+            self._snapshot_hits.inc()
+            return snapshot.origins.get(filters["name"])
+
+        self._snapshot_misses.inc()
+        return await self._fallback_repository.read(**filters)
@@ -0,0 +1,193 @@
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Callable
+
+from redis import asyncio as aioredis
+from redis.commands.core import AsyncScript
+
+from src.application.builders import StrategyParts
+from src.application.strategies import CounterRepositoryFactory
+from src.core.hashing import RendezvousHasher
+from src.core.rates import CounterRateEstimator
+from src.core.selectors import WeightedSelector
+from src.core.singleflight import SingleFlight
+from src.domain.health import TargetHealthRegistry
+from src.domain.repositories import (
+    BalancingDecisionRepository,
+    BaseCrudRepository,
+    CdnRequestCounterRepository,
+)
+from src.domain.schemas import CdnServer, OriginServer
+from src.infrastructure.cache.codecs import CacheCodec
+from src.infrastructure.cache.config import SettingsCacheSettings
+from src.infrastructure.cache.guard import RedisGuard
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.cache.read_through import LastKnownValues, ReadThroughCache
+from src.infrastructure.cache.repository import (
+    CachedCdnServerRepository,
+    CachedOriginServerRepository,
+    PerServerOriginRepository,
+    RedisScriptedDecisionRepository,
+)
+from src.infrastructure.cache.snapshot import (
+    SettingsSnapshotStore,
+    SnapshotCdnServerRepository,
+    SnapshotOriginServerRepository,
+)
+from src.infrastructure.health.checker import HealthChecker
+
+
+@dataclass(slots=True, frozen=True)
+class StrategyResources:
+    """
+    Синглтоны воркера, из которых собираются части стратегий.
+    health_checker - None, если проверки доступности выключены
+    """
+
+    client: aioredis.Redis | aioredis.RedisCluster
+    keyspace: RedisKeyspace
+    store: SettingsSnapshotStore
+    cache_settings: SettingsCacheSettings
+    single_flight: SingleFlight
+    last_known: LastKnownValues
+    guard: RedisGuard
+    cdn_codec: CacheCodec
+    origin_codec: CacheCodec
+    counter_repo_factory: CounterRepositoryFactory
+    decision_script: AsyncScript
+    health_checker: HealthChecker | None
+    rates: CounterRateEstimator
+
+    @property
+    def cdn_selector(self) -> WeightedSelector[str] | None:
+        # Выбор по весам строится при обновлении снимка (или после раунда
+        # проверок доступности - только среди живых хостов), здесь только
+        # забираем готовый
+        if self.health_checker is not None:
+            return self.health_checker.cdn_selector
+
+        snapshot = self.store.snapshot
+        return snapshot.cdn_selector if snapshot is not None else None
+
+
+class SnapshotStrategyParts(StrategyParts):
+    """
+    Части стратегий поверх снимка настроек и кеша Redis. Собираются при
+    первом обращении, поэтому на запрос создаётся только то, что нужно
+    выбранной стратегии. server_name - сервер запроса, None - в запросах
+    встречаются разные сервера (репозитории и счётчики создаются по имени).
+    С repository_cache_size созданные по имени репозитории переиспользуются
+    """
+
+    def __init__(
+        self,
+        resources: StrategyResources,
+        cdn_persistent_repo: BaseCrudRepository[CdnServer],
+        origin_persistent_repo: BaseCrudRepository[OriginServer],
+        server_name: str | None = None,
+        repository_cache_size: int | None = None,
+    ) -> None:
+        self._resources = resources
+        self._cdn_persistent_repo = cdn_persistent_repo
+        self._origin_persistent_repo = origin_persistent_repo
+        self._server_name = server_name
+        self._repository_cache_size = repository_cache_size
+
+    @cached_property
+    def _cache(self) -> ReadThroughCache:
+        return ReadThroughCache(
+            client=self._resources.client,
+            single_flight=self._resources.single_flight,
+            settings=self._resources.cache_settings,
+            keyspace=self._resources.keyspace,
+            guard=self._resources.guard,
+            last_known=self._resources.last_known,
+        )
+
+    @cached_property
+    def cached_cdn_repo(self) -> BaseCrudRepository[CdnServer]:
+        return CachedCdnServerRepository(
+            persistent_repository=self._cdn_persistent_repo,
+            cache=self._cache,
+            keyspace=self._resources.keyspace,
+            codec=self._resources.cdn_codec,
+        )
+
+    @cached_property
+    def cached_origin_repo(self) -> BaseCrudRepository[OriginServer]:
+        if self._server_name is not None:
+            return self._create_origin_repo(self._server_name)
+
+        return PerServerOriginRepository(self._per_server(self._create_origin_repo))
+
+    @cached_property
+    def cdn_repo(self) -> BaseCrudRepository[CdnServer]:
+        return SnapshotCdnServerRepository(
+            fallback_repository=self.cached_cdn_repo, store=self._resources.store
+        )
+
+    @cached_property
+    def origin_repo(self) -> BaseCrudRepository[OriginServer]:
+        return SnapshotOriginServerRepository(
+            fallback_repository=self.cached_origin_repo, store=self._resources.store
+        )
+
+    @cached_property
+    def _counter_repo_factory(self) -> CounterRepositoryFactory:
+        return self._per_server(self._resources.counter_repo_factory)
+
+    @property
+    def counter_repo(self) -> CdnRequestCounterRepository | None:
+        if self._server_name is None:
+            return None
+
+        return self._counter_repo_factory(self._server_name)
+
+    @property
+    def counter_repo_factory(self) -> CounterRepositoryFactory | None:
+        return self._counter_repo_factory if self._server_name is None else None
+
+    @property
+    def decision_repo(self) -> BalancingDecisionRepository:
+        return RedisScriptedDecisionRepository(
+            self._resources.decision_script,
+            keyspace=self._resources.keyspace,
+            known_origins=self._resources.store.known_origins,
+            guard=self._resources.guard,
+        )
+
+    @property
+    def cdn_selector(self) -> WeightedSelector[str] | None:
+        return self._resources.cdn_selector
+
+    @property
+    def cdn_hasher(self) -> RendezvousHasher[str] | None:
+        # Доступность хостов учитывается при выборе, пересобирать не нужно
+        snapshot = self._resources.store.snapshot
+        return snapshot.cdn_hasher if snapshot is not None else None
+
+    @property
+    def health(self) -> TargetHealthRegistry | None:
+        return self._resources.health_checker
+
+    @property
+    def rates(self) -> CounterRateEstimator:
+        return self._resources.rates
+
+    def _create_origin_repo(self, server_name: str) -> BaseCrudRepository[OriginServer]:
+        return CachedOriginServerRepository(
+            persistent_repository=self._origin_persistent_repo,
+            cache=self._cache,
+            server_name=server_name,
+            keyspace=self._resources.keyspace,
+            known_origins=self._resources.store.known_origins,
+            codec=self._resources.origin_codec,
+        )
+
+    def _per_server[
+        Result
+    ](self, factory: Callable[[str], Result]) -> Callable[[str], Result]:
+        if self._repository_cache_size is None:
+            return factory
+
+        return lru_cache(maxsize=self._repository_cache_size)(factory)
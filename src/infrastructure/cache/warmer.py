@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from dataclasses import asdict
+
+from redis import asyncio as aioredis
+
+from src.infrastructure.cache.codecs import CacheCodec
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.cache.read_through import CacheEntry, ReadThroughCache
+from src.infrastructure.cache.snapshot import SettingsLoader
+
+logger = logging.getLogger(__name__)
+
+
+class SettingsCacheWarmer:
+    """
+    Прогрев кеша настроек: CDN и все origin сервера загружаются из БД одной
+    сессией и пишутся в Redis одним пайплайном - после деплоя или очистки
+    Redis первые запросы не промахиваются по одному.
+
+    Раунд прогрева выполняет один воркер на кластер: кто первым взял
+    блокировку на interval секунд, тот и прогревает
+    """
+
+    def __init__(
+        self,
+        loader: SettingsLoader,
+        client: aioredis.Redis | aioredis.RedisCluster,
+        cache: ReadThroughCache,
+        keyspace: RedisKeyspace,
+        cdn_codec: CacheCodec,
+        origin_codec: CacheCodec,
+        interval: float,
+    ) -> None:
+        self._loader = loader
+        self._client = client
+        self._cache = cache
+        self._keyspace = keyspace
+        self._cdn_codec = cdn_codec
+        self._origin_codec = origin_codec
+        self._interval = interval
+        self._lock_key = keyspace.cache_warmup_lock()
+
+    async def warm(self) -> int:
+        """
+        Возвращает число записанных значений (0 - прогревает другой воркер)
+        """
+        acquired = await self._client.set(
+            self._lock_key,
+            "warmup",
+            nx=True,
+            # Без периодического прогрева блокировка нужна только на время старта
+            px=int((self._interval or 60) * 1000),
+        )
+
+        if not acquired:
+            return 0
+
+        cdn_settings, origins, _ = await self._loader()
+        entries: list[CacheEntry] = [
+            (
+                self._keyspace.origin_settings(origin.name),
+                asdict(origin),
+                self._origin_codec,
+            )
+            for origin in origins
+        ]
+
+        if cdn_settings is not None:
+            entries.append(
+                (self._keyspace.cdn_settings(), asdict(cdn_settings), self._cdn_codec)
+            )
+
+        return await self._cache.write_many(entries)
+
+    async def safe_warm(self) -> None:
+        try:
+            written = await self.warm()
+        except Exception:
+            logger.exception("settings cache warmup failed")
+            return
+
+        if written:
+            logger.info("settings cache warmed up: %s records", written)
+
+    async def run(self) -> None:
+        """
+        Фоновая задача: периодически перезаписывает настройки в кеше
+        """
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.safe_warm()
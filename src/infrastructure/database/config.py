@@ -12,6 +12,8 @@ class DatabaseSettings(BaseSettings):
 
     DATABASE_POOL_SIZE: int = 100
     DATABASE_POOL_OVERFLOW: int = 25
+    # Таймаут установки соединения с БД (сек)
+    DATABASE_CONNECT_TIMEOUT: float = 5.0
 
     @computed_field(alias="DATABASE_URI")
     def database_uri(self) -> PostgresDsn:
@@ -0,0 +1,23 @@
+from src.domain.schemas import CdnHost, CdnServer, OriginServer
+from src.infrastructure.database.repositories.cdn import SqlAlchemyCdnServerRepository
+from src.infrastructure.database.repositories.cdn_host import (
+    SqlAlchemyCdnHostRepository,
+)
+from src.infrastructure.database.repositories.origin import (
+    SqlAlchemyOriginServerRepository,
+)
+from src.infrastructure.database.session import get_async_session
+
+
+async def load_balancing_settings() -> (
+    tuple[CdnServer | None, list[OriginServer], list[CdnHost]]
+):
+    """
+    Загружает настройки CDN, хосты CDN и все origin сервера в рамках одной сессии
+    """
+    async with get_async_session() as session:
+        cdn_settings = await SqlAlchemyCdnServerRepository(session).read()
+        origins = await SqlAlchemyOriginServerRepository(session).read_all()
+        cdn_hosts = await SqlAlchemyCdnHostRepository(session).read_all()
+
+    return cdn_settings, origins, cdn_hosts
@@ -0,0 +1,52 @@
+"""initial schema
+
+Схема, которую раньше создавал Base.metadata.create_all при старте
+воркера. Для такой БД: alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+"""
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cdn_server",
+        sa.Column("host_name", sa.String(), nullable=False),
+        sa.Column("default_redirecting_ratio", sa.Integer(), nullable=False),
+        sa.Column("id", sa.BigInteger(), sa.Identity(always=False), nullable=False),
+        sa.PrimaryKeyConstraint("id", name="cdn_server_pkey"),
+    )
+    op.create_table(
+        "origin_server",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("redirecting_ratio", sa.Integer(), nullable=True),
+        sa.Column("id", sa.BigInteger(), sa.Identity(always=False), nullable=False),
+        sa.PrimaryKeyConstraint("id", name="origin_server_pkey"),
+        sa.UniqueConstraint("name", name="uq__origin_server__name"),
+    )
+    op.create_table(
+        "cdn_host",
+        sa.Column("host_name", sa.String(), nullable=False),
+        sa.Column("weight", sa.Integer(), nullable=False),
+        sa.Column("capacity", sa.Integer(), nullable=True),
+        sa.Column("id", sa.BigInteger(), sa.Identity(always=False), nullable=False),
+        sa.PrimaryKeyConstraint("id", name="cdn_host_pkey"),
+        sa.UniqueConstraint("host_name", name="uq__cdn_host__host_name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("cdn_host")
+    op.drop_table("origin_server")
+    op.drop_table("cdn_server")
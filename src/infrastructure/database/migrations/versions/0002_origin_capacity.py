@@ -0,0 +1,27 @@
+"""origin capacity
+
+Пропускная способность origin (запросов в секунду) для стратегии
+ADAPTIVE_RATIO. NULL - без ограничения
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 15:00:00
+"""
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0002"
+down_revision: str | None = "0001"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("origin_server", sa.Column("capacity", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("origin_server", "capacity")
@@ -0,0 +1,40 @@
+"""balancing decision log
+
+Журнал решений о перенаправлении (DECISION_LOG_SINK=POSTGRES)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 18:00:00
+"""
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: str | None = "0002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "balancing_decision",
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("server_name", sa.String(), nullable=False),
+        sa.Column("resource_type", sa.String(), nullable=False),
+        sa.Column("id", sa.BigInteger(), sa.Identity(always=False), nullable=False),
+        sa.PrimaryKeyConstraint("id", name="balancing_decision_pkey"),
+    )
+    op.create_index(
+        "ix__balancing_decision__created_at",
+        "balancing_decision",
+        ["created_at"],
+        postgresql_using="brin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix__balancing_decision__created_at", table_name="balancing_decision")
+    op.drop_table("balancing_decision")
@@ -0,0 +1,6 @@
+# Все модели, чтобы Base.metadata знала все таблицы (нужно миграциям)
+from .base import Base
+from .cdn import CdnServer
+from .cdn_host import CdnHost
+from .origin import OriginServer
+from .decision import BalancingDecision
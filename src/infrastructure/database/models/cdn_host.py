@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String
+
+from src.infrastructure.database.models.base import BaseBigIntegerIdentity
+
+
+class CdnHost(BaseBigIntegerIdentity):
+    __tablename__ = "cdn_host"
+
+    host_name: str = Column(String, nullable=False, unique=True)
+    weight: int = Column(Integer, nullable=False, default=1)
+    capacity: int = Column(Integer, nullable=True)
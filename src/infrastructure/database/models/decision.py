@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, String
+
+from src.infrastructure.database.models.base import BaseBigIntegerIdentity
+
+
+class BalancingDecision(BaseBigIntegerIdentity):
+    __tablename__ = "balancing_decision"
+    # Журнал пишется по времени: BRIN-индекс маленький и дешёвый на вставке
+    __table_args__ = (
+        Index(
+            "ix__balancing_decision__created_at",
+            "created_at",
+            postgresql_using="brin",
+        ),
+    )
+
+    created_at: datetime = Column(DateTime(timezone=True), nullable=False)
+    server_name: str = Column(String, nullable=False)
+    # Имя ResourceTypeEnum: ORIGIN или CDN
+    resource_type: str = Column(String, nullable=False)
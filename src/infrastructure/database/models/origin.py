@@ -8,3 +8,4 @@ class OriginServer(BaseBigIntegerIdentity):
 
     name: str = Column(String, nullable=False, unique=True)
     redirecting_ratio: int = Column(Integer, nullable=True)
+    capacity: int = Column(Integer, nullable=True)
@@ -1,7 +1,9 @@
-from typing import Generic, Type, Sequence
+from typing import Callable, Generic, Type, Sequence
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.domain.repositories import BaseCrudRepository
+from src.infrastructure.database.session import get_async_session
 from src.infrastructure.database.types import BaseSqaModel
 
 
@@ -23,3 +25,28 @@ class BaseSqlAlchemyRepository(Generic[BaseSqaModel]):
 
     async def flush(self, objects: Sequence[BaseSqaModel] | None = None) -> None:
         await self._session.flush(objects)
+
+
+class SessionPerCallRepository[Entity](BaseCrudRepository[Entity]):
+    """
+    Репозиторий БД для долгоживущих объектов (граф балансировки на воркер):
+    на каждый вызов открывается своя сессия. На горячем пути в БД ходят
+    только при промахе кеша, поэтому сессия на вызов дешевле сессии на запрос
+    """
+
+    def __init__(
+        self, factory: Callable[[AsyncSession], BaseCrudRepository[Entity]]
+    ) -> None:
+        self._factory = factory
+
+    async def create(self, data: Entity) -> int:
+        async with get_async_session() as session:
+            return await self._factory(session).create(data)
+
+    async def read(self, **filters) -> Entity | None:
+        async with get_async_session() as session:
+            return await self._factory(session).read(**filters)
+
+    async def update(self, id_: int | None, data: Entity) -> None:
+        async with get_async_session() as session:
+            await self._factory(session).update(id_, data)
@@ -0,0 +1,59 @@
+from sqlalchemy import select, update, delete
+
+from src.domain.repositories import BaseCrudRepository
+from src.domain.schemas import CdnHost as DomainCdnHost
+from src.infrastructure.database.models.cdn_host import CdnHost as OrmCdnHost
+from src.infrastructure.database.repositories.base import BaseSqlAlchemyRepository
+
+
+class SqlAlchemyCdnHostRepository(
+    BaseCrudRepository[DomainCdnHost], BaseSqlAlchemyRepository
+):
+    _class = OrmCdnHost
+
+    async def create(self, data: DomainCdnHost) -> int:
+        orm_host = self._class(
+            host_name=data.host_name,
+            weight=data.weight,
+            capacity=data.capacity,
+        )
+        self.session.add(orm_host)
+        await self.session.commit()
+        return orm_host.id
+
+    async def read(self, **filters) -> DomainCdnHost | None:
+        stmt = select(self._class)
+
+        if filters:
+            stmt = stmt.filter_by(**filters)
+
+        orm_host: OrmCdnHost = await self.session.scalar(stmt)
+
+        if not orm_host:
+            return None
+
+        return DomainCdnHost(**orm_host.to_dict())
+
+    async def read_all(self) -> list[DomainCdnHost]:
+        orm_hosts = await self.session.scalars(
+            select(self._class).order_by(self._class.id)
+        )
+
+        return [DomainCdnHost(**orm_host.to_dict()) for orm_host in orm_hosts]
+
+    async def update(self, id_: int | None, data: DomainCdnHost) -> None:
+        stmt = update(self._class).values(
+            host_name=data.host_name,
+            weight=data.weight,
+            capacity=data.capacity,
+        )
+
+        if id_ is not None:
+            stmt = stmt.filter_by(id=id_)
+
+        await self.session.execute(stmt)
+        await self.session.commit()
+
+    async def delete(self, id_: int) -> None:
+        await self.session.execute(delete(self._class).filter_by(id=id_))
+        await self.session.commit()
@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import func, select
+
+from src.domain.enums import ResourceTypeEnum
+from src.domain.repositories import DecisionLogRepository
+from src.domain.schemas import DecisionLogRecord, DecisionRollup
+from src.infrastructure.database.models.decision import (
+    BalancingDecision as OrmBalancingDecision,
+)
+from src.infrastructure.database.repositories.base import BaseSqlAlchemyRepository
+from src.infrastructure.database.session import get_async_session
+
+COPY_COLUMNS = ("created_at", "server_name", "resource_type")
+
+
+class SqlAlchemyDecisionLogRepository(DecisionLogRepository, BaseSqlAlchemyRepository):
+    _class = OrmBalancingDecision
+
+    async def write_many(self, records: Sequence[DecisionLogRecord]) -> None:
+        # COPY драйвера в обход ORM: пачка уходит одним потоком данных
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+
+        await raw_connection.driver_connection.copy_records_to_table(
+            self._class.__tablename__,
+            records=[
+                (record.created_at, record.server_name, record.type.name)
+                for record in records
+            ],
+            columns=COPY_COLUMNS,
+        )
+        await self.session.commit()
+
+    async def rollup(
+        self, since: datetime, until: datetime, server_name: str | None = None
+    ) -> list[DecisionRollup]:
+        minute = func.date_trunc("minute", self._class.created_at).label("minute")
+        stmt = (
+            select(
+                minute,
+                self._class.server_name,
+                func.count()
+                .filter(self._class.resource_type == ResourceTypeEnum.ORIGIN.name)
+                .label("origin"),
+                func.count()
+                .filter(self._class.resource_type == ResourceTypeEnum.CDN.name)
+                .label("cdn"),
+            )
+            .where(self._class.created_at >= since, self._class.created_at < until)
+            .group_by(minute, self._class.server_name)
+            .order_by(minute, self._class.server_name)
+        )
+
+        if server_name is not None:
+            stmt = stmt.where(self._class.server_name == server_name)
+
+        result = await self.session.execute(stmt)
+
+        return [
+            DecisionRollup(
+                minute=row.minute,
+                server_name=row.server_name,
+                origin=row.origin,
+                cdn=row.cdn,
+            )
+            for row in result
+        ]
+
+
+class SessionPerCallDecisionLogRepository(DecisionLogRepository):
+    """
+    Журнал решений в БД для фонового писателя и отчётов: сессия на вызов
+    """
+
+    async def write_many(self, records: Sequence[DecisionLogRecord]) -> None:
+        async with get_async_session() as session:
+            await SqlAlchemyDecisionLogRepository(session).write_many(records)
+
+    async def rollup(
+        self, since: datetime, until: datetime, server_name: str | None = None
+    ) -> list[DecisionRollup]:
+        async with get_async_session() as session:
+            return await SqlAlchemyDecisionLogRepository(session).rollup(
+                since, until, server_name
+            )
@@ -1,10 +1,16 @@
-from sqlalchemy import select, update
+from typing import Sequence
+
+from sqlalchemy import select, update, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert
 
 from src.domain.repositories import BaseCrudRepository
 from src.domain.schemas import OriginServer as DomainOriginServer
 from src.infrastructure.database.models.origin import OriginServer as OrmOriginServer
 from src.infrastructure.database.repositories.base import BaseSqlAlchemyRepository
 
+# Строк в одном INSERT: asyncpg принимает не больше 32767 параметров
+UPSERT_CHUNK_SIZE = 5000
+
 
 class SqlAlchemyOriginServerRepository(
     BaseCrudRepository[DomainOriginServer], BaseSqlAlchemyRepository
@@ -15,6 +21,7 @@ class SqlAlchemyOriginServerRepository(
         orm_origin = self._class(
             name=data.name,
             redirecting_ratio=data.redirecting_ratio,
+            capacity=data.capacity,
         )
         self.session.add(orm_origin)
         await self.session.commit()
@@ -33,10 +40,19 @@ class SqlAlchemyOriginServerRepository(
 
         return DomainOriginServer(**orm_settings.to_dict(exclude={"id"}))
 
+    async def read_all(self) -> list[DomainOriginServer]:
+        orm_servers = await self.session.scalars(select(self._class))
+
+        return [
+            DomainOriginServer(**orm_server.to_dict(exclude={"id"}))
+            for orm_server in orm_servers
+        ]
+
     async def update(self, id_: int | None, data: DomainOriginServer) -> None:
         stmt = update(self._class).values(
             name=data.name,
             redirecting_ratio=data.redirecting_ratio,
+            capacity=data.capacity,
         )
 
         if id_ is not None:
@@ -44,3 +60,59 @@ class SqlAlchemyOriginServerRepository(
 
         await self.session.execute(stmt)
         await self.session.commit()
+
+    async def upsert_many(
+        self, data: Sequence[DomainOriginServer], update_existing: bool = True
+    ) -> dict[str, tuple[int, bool]]:
+        """
+        Создаёт (и, если update_existing, обновляет) сервера набором INSERT ...
+        ON CONFLICT в одной транзакции. Имена в data не должны повторяться.
+
+        Возвращает {имя: (id, создан ли)} только по записанным строкам:
+        уже существующие (без update_existing) и не изменившиеся сервера
+        в результат не попадают
+        """
+        written: dict[str, tuple[int, bool]] = {}
+
+        for start in range(0, len(data), UPSERT_CHUNK_SIZE):
+            stmt = insert(self._class).values(
+                [
+                    {
+                        "name": item.name,
+                        "redirecting_ratio": item.redirecting_ratio,
+                        "capacity": item.capacity,
+                    }
+                    for item in data[start : start + UPSERT_CHUNK_SIZE]
+                ]
+            )
+
+            if update_existing:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[self._class.name],
+                    set_={
+                        "redirecting_ratio": stmt.excluded.redirecting_ratio,
+                        "capacity": stmt.excluded.capacity,
+                    },
+                    # Не переписываем строки, где ничего не поменялось
+                    where=or_(
+                        self._class.redirecting_ratio.is_distinct_from(
+                            stmt.excluded.redirecting_ratio
+                        ),
+                        self._class.capacity.is_distinct_from(stmt.excluded.capacity),
+                    ),
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=[self._class.name])
+
+            # xmax = 0 - строка вставлена, а не обновлена
+            result = await self.session.execute(
+                stmt.returning(
+                    self._class.id,
+                    self._class.name,
+                    literal_column("xmax = 0").label("inserted"),
+                )
+            )
+            written.update((name, (id_, inserted)) for id_, name, inserted in result)
+
+        await self.session.commit()
+        return written
@@ -5,8 +5,10 @@ from functools import lru_cache
 
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
     create_async_engine,
-    AsyncEngine, async_sessionmaker, AsyncSession,
 )
 
 from src.infrastructure.database.config import DatabaseSettings
@@ -25,6 +27,7 @@ def get_async_engine() -> AsyncEngine:
         pool_recycle=300,
         pool_timeout=30,
         max_overflow=settings.DATABASE_POOL_OVERFLOW,
+        connect_args={"timeout": settings.DATABASE_CONNECT_TIMEOUT},
     )
 
     return async_engine
@@ -48,17 +51,80 @@ async def get_async_session():
         # Специфичные БД ошибки
         except SQLAlchemyError:
             await session.rollback()
-            session_logger.exception('session rollback due to DB exception')
+            session_logger.exception("session rollback due to DB exception")
             raise
 
         # Остальные исключения
         except Exception:
             await session.rollback()
-            session_logger.exception('session rollback due to unhandled exception')
+            session_logger.exception("session rollback due to unhandled exception")
             raise
 
         # Безопасно закрываем сессию
         finally:
             if session:
-                session_logger.info("closing session")
+                session_logger.debug("closing session")
                 await shield(session.close())
+
+
+class LazyAsyncSession:
+    """
+    Прокси над AsyncSession: сессия создаётся при первом обращении к ней,
+    поэтому запрос, которому хватило кеша, не трогает БД и пул соединений
+    """
+
+    __slots__ = ("_session_maker", "_session")
+
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        self._session_maker = session_maker
+        self._session: AsyncSession | None = None
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_maker()
+
+        return self._session
+
+    def __getattr__(self, name: str):
+        return getattr(self.session, name)
+
+    async def aclose(self) -> None:
+        """
+        Закрывает сессию, если её открывали. Нужна, когда сессией пользуются
+        после выхода из зависимости (например, при потоковом ответе)
+        """
+        if self._session is not None:
+            session_logger.debug("closing session")
+            await shield(self._session.close())
+            self._session = None
+
+
+@contextlib.asynccontextmanager
+async def get_lazy_async_session():
+    lazy_session = LazyAsyncSession(get_async_session_maker())
+
+    try:
+        yield lazy_session
+
+    # Специфичные БД ошибки
+    except SQLAlchemyError:
+        if lazy_session.started:
+            await lazy_session.rollback()
+            session_logger.exception("session rollback due to DB exception")
+        raise
+
+    # Остальные исключения
+    except Exception:
+        if lazy_session.started:
+            await lazy_session.rollback()
+            session_logger.exception("session rollback due to unhandled exception")
+        raise
+
+    # Закрываем сессию, только если её действительно открыли
+    finally:
+        await lazy_session.aclose()
@@ -0,0 +1,17 @@
+from src.core.config import BaseSettings
+from src.infrastructure.decision_log.enums import DecisionLogSinkEnum
+
+
+class DecisionLogSettings(BaseSettings):
+    # Писать ли журнал решений о перенаправлении и куда
+    DECISION_LOG_ENABLED: bool = False
+    DECISION_LOG_SINK: DecisionLogSinkEnum = DecisionLogSinkEnum.POSTGRES
+    # Сколько решений воркер держит в очереди, сверх - отбрасывает
+    DECISION_LOG_MAX_PENDING: int = 100_000
+    # Пачка записи и как часто (сек) писать неполную пачку
+    DECISION_LOG_BATCH_SIZE: int = 5_000
+    DECISION_LOG_FLUSH_INTERVAL: float = 1.0
+    # FILE: каталог, размер файла (байт) и сколько последних файлов хранить
+    DECISION_LOG_DIRECTORY: str = "decision_log"
+    DECISION_LOG_FILE_MAX_BYTES: int = 64 * 1024 * 1024
+    DECISION_LOG_FILE_MAX_FILES: int = 100
@@ -0,0 +1,10 @@
+from enum import auto
+
+from src.core.enums import AutoStrEnum
+
+
+class DecisionLogSinkEnum(AutoStrEnum):
+    # Таблица balancing_decision в Postgres (COPY)
+    POSTGRES = auto()
+    # Локальные файлы CSV со сменой по размеру
+    FILE = auto()
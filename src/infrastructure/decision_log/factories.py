@@ -0,0 +1,20 @@
+from src.domain.repositories import DecisionLogRepository
+from src.infrastructure.database.repositories.decision_log import (
+    SessionPerCallDecisionLogRepository,
+)
+from src.infrastructure.decision_log.config import DecisionLogSettings
+from src.infrastructure.decision_log.enums import DecisionLogSinkEnum
+from src.infrastructure.decision_log.files import RotatingFileDecisionLogRepository
+
+
+def create_decision_log_repository(
+    settings: DecisionLogSettings,
+) -> DecisionLogRepository:
+    if settings.DECISION_LOG_SINK is DecisionLogSinkEnum.FILE:
+        return RotatingFileDecisionLogRepository(
+            directory=settings.DECISION_LOG_DIRECTORY,
+            max_bytes=settings.DECISION_LOG_FILE_MAX_BYTES,
+            max_files=settings.DECISION_LOG_FILE_MAX_FILES,
+        )
+
+    return SessionPerCallDecisionLogRepository()
@@ -0,0 +1,134 @@
+import asyncio
+import csv
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Sequence
+
+from src.domain.enums import ResourceTypeEnum
+from src.domain.repositories import DecisionLogRepository
+from src.domain.schemas import DecisionLogRecord, DecisionRollup
+
+FILE_PATTERN = "decisions-*.csv"
+
+# Тип решения одной буквой
+TYPE_CODES = {ResourceTypeEnum.ORIGIN: "O", ResourceTypeEnum.CDN: "C"}
+CODE_TYPES = {code: resource_type for resource_type, code in TYPE_CODES.items()}
+
+MINUTE_MS = 60_000
+
+
+class RotatingFileDecisionLogRepository(DecisionLogRepository):
+    """
+    Журнал решений в локальных файлах CSV: строка на решение (unix time
+    в миллисекундах, имя сервера, O или C). Воркер дописывает свой файл
+    и начинает новый, когда тот перерос max_bytes; в каталоге остаются
+    max_files последних файлов всех воркеров. Имя файла начинается со
+    времени его создания, поэтому сортировка по имени - хронологическая.
+    Файлы пишутся и читаются в потоке, не занимая цикл событий
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_files: int) -> None:
+        self._directory = Path(directory)
+        self._max_bytes = max_bytes
+        self._max_files = max_files
+        self._path: Path | None = None
+
+    async def write_many(self, records: Sequence[DecisionLogRecord]) -> None:
+        await asyncio.to_thread(self._write, records)
+
+    async def rollup(
+        self, since: datetime, until: datetime, server_name: str | None = None
+    ) -> list[DecisionRollup]:
+        return await asyncio.to_thread(self._rollup, since, until, server_name)
+
+    def _write(self, records: Sequence[DecisionLogRecord]) -> None:
+        if self._path is None or _size(self._path) >= self._max_bytes:
+            self._path = self._new_file()
+
+        with self._path.open("a", newline="") as file:
+            csv.writer(file).writerows(
+                (
+                    int(record.created_at.timestamp() * 1000),
+                    record.server_name,
+                    TYPE_CODES[record.type],
+                )
+                for record in records
+            )
+
+    def _new_file(self) -> Path:
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+        # Вместе с новым файлом останется max_files
+        files = sorted(self._directory.glob(FILE_PATTERN))
+
+        for path in files[: max(0, len(files) - self._max_files + 1)]:
+            path.unlink(missing_ok=True)
+
+        return self._directory / (
+            "decisions-%013d-%d.csv" % (time.time_ns() // 1_000_000, os.getpid())
+        )
+
+    def _rollup(
+        self, since: datetime, until: datetime, server_name: str | None
+    ) -> list[DecisionRollup]:
+        since_ms = int(since.timestamp() * 1000)
+        until_ms = int(until.timestamp() * 1000)
+        counts: defaultdict[tuple[int, str], list[int]] = defaultdict(lambda: [0, 0])
+
+        for path in sorted(self._directory.glob(FILE_PATTERN)):
+            # Файл начат после конца окна
+            if _started_at(path) >= until_ms:
+                continue
+
+            try:
+                with path.open(newline="") as file:
+                    for row in csv.reader(file):
+                        # Строка, которую воркер ещё дописывает
+                        if (
+                            len(row) != 3
+                            or not row[0].isdigit()
+                            or row[2] not in CODE_TYPES
+                        ):
+                            continue
+
+                        created_at, name, code = int(row[0]), row[1], row[2]
+
+                        if not since_ms <= created_at < until_ms:
+                            continue
+
+                        if server_name is not None and name != server_name:
+                            continue
+
+                        minute = created_at - created_at % MINUTE_MS
+                        counts[minute, name][
+                            CODE_TYPES[code] is ResourceTypeEnum.CDN
+                        ] += 1
+
+            # Файл удалён при смене файлов другим воркером
+            except FileNotFoundError:
+                continue
+
+        return [
+            DecisionRollup(
+                minute=datetime.fromtimestamp(minute / 1000, timezone.utc),
+                server_name=name,
+                origin=origin,
+                cdn=cdn,
+            )
+            for (minute, name), (origin, cdn) in sorted(counts.items())
+        ]
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _started_at(path: Path) -> int:
+    # decisions-<мс>-<pid>.csv
+    return int(path.name.split("-")[1])
@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.selectors import WeightedSelector
+from src.domain.health import TargetHealthRegistry
+from src.infrastructure.cache.snapshot import SettingsSnapshot, SettingsSnapshotStore
+from src.infrastructure.health.config import HealthCheckSettings
+from src.infrastructure.health.enums import HealthTargetKindEnum
+from src.infrastructure.http.client import request_status
+
+logger = logging.getLogger(__name__)
+
+Probe = Callable[[str, float], Awaitable[int]]
+
+
+@dataclass(slots=True, frozen=True)
+class HealthTarget:
+    kind: HealthTargetKindEnum
+    # Хост CDN или имя origin сервера
+    name: str
+    url: str
+
+
+class TargetStats:
+    """
+    Скользящая статистика проверок цели и её предохранитель
+    """
+
+    __slots__ = ("latencies", "breaker", "checked_at")
+
+    def __init__(self, window: int, breaker: CircuitBreaker) -> None:
+        # Задержка успешной проверки или None для неудачной
+        self.latencies: deque[float | None] = deque(maxlen=window)
+        self.breaker = breaker
+        self.checked_at: float | None = None
+
+    @property
+    def error_rate(self) -> float:
+        if not self.latencies:
+            return 0.0
+
+        return sum(latency is None for latency in self.latencies) / len(self.latencies)
+
+    @property
+    def average_latency(self) -> float | None:
+        successful = [latency for latency in self.latencies if latency is not None]
+        return sum(successful) / len(successful) if successful else None
+
+    def record(self, latency: float | None) -> None:
+        self.latencies.append(latency)
+        self.checked_at = time.time()
+
+        if latency is None:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+
+class HealthChecker(TargetHealthRegistry):
+    """
+    Фоновая проверка хостов CDN и origin серверов из снимка настроек.
+
+    Всё, что нужно запросу, считается после каждого раунда проверок: множества
+    недоступных целей и выбор хоста CDN по весам только среди доступных.
+    На запросе остаётся проверка вхождения в множество
+    """
+
+    def __init__(
+        self,
+        store: SettingsSnapshotStore,
+        settings: HealthCheckSettings,
+        probe: Probe = request_status,
+    ) -> None:
+        self._store = store
+        self._settings = settings
+        self._probe = probe
+
+        self._stats: dict[tuple[HealthTargetKindEnum, str], TargetStats] = {}
+        self._unavailable_cdn: frozenset[str] = frozenset()
+        self._unavailable_origins: frozenset[str] = frozenset()
+
+        self._selector_snapshot: SettingsSnapshot | None = None
+        self._cdn_selector: WeightedSelector[str] | None = None
+
+    def is_cdn_available(self, host_name: str) -> bool:
+        return host_name not in self._unavailable_cdn
+
+    def is_origin_available(self, server_name: str) -> bool:
+        return server_name not in self._unavailable_origins
+
+    @property
+    def cdn_selector(self) -> WeightedSelector[str] | None:
+        snapshot = self._store.snapshot
+
+        # Снимок обновился после последнего раунда - пока берём выбор из него
+        if snapshot is not self._selector_snapshot:
+            return snapshot.cdn_selector if snapshot is not None else None
+
+        return self._cdn_selector
+
+    def targets(self, snapshot: SettingsSnapshot) -> list[HealthTarget]:
+        settings = self._settings
+        cdn_hosts = {host.host_name for host in snapshot.cdn_hosts}
+
+        if snapshot.cdn is not None:
+            cdn_hosts.add(snapshot.cdn.host_name)
+
+        targets = [
+            HealthTarget(
+                kind=HealthTargetKindEnum.CDN,
+                name=host_name,
+                url=f"{settings.HEALTH_CHECK_SCHEME}://{host_name}"
+                f"{settings.HEALTH_CHECK_PATH}",
+            )
+            for host_name in sorted(cdn_hosts)
+        ]
+
+        # Имя origin сервера - не адрес: без шаблона хоста не проверяем
+        if not settings.HEALTH_CHECK_ORIGIN_HOST_TEMPLATE:
+            return targets
+
+        for name in snapshot.origins:
+            origin_host = settings.HEALTH_CHECK_ORIGIN_HOST_TEMPLATE.format(name=name)
+            targets.append(
+                HealthTarget(
+                    kind=HealthTargetKindEnum.ORIGIN,
+                    name=name,
+                    url=f"{settings.HEALTH_CHECK_SCHEME}://{origin_host}"
+                    f"{settings.HEALTH_CHECK_PATH}",
+                )
+            )
+
+        return targets
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "kind": kind,
+                "name": name,
+                "available": not stats.breaker.is_open,
+                "circuit": stats.breaker.state,
+                "error_rate": stats.error_rate,
+                "average_latency": stats.average_latency,
+                "checked_at": stats.checked_at,
+            }
+            for (kind, name), stats in self._stats.items()
+        ]
+
+    async def check_once(self) -> None:
+        snapshot = self._store.snapshot
+
+        if snapshot is None:
+            return
+
+        targets = self.targets(snapshot)
+        semaphore = asyncio.Semaphore(self._settings.HEALTH_CHECK_CONCURRENCY)
+
+        async def check(target: HealthTarget) -> None:
+            async with semaphore:
+                latency = await self._measure(target.url)
+
+            self._stats_for(target).record(latency)
+
+        await asyncio.gather(*(check(target) for target in targets))
+
+        # Забываем цели, которых больше нет в настройках
+        actual = {(target.kind, target.name) for target in targets}
+        for key in self._stats.keys() - actual:
+            del self._stats[key]
+
+        self._publish(snapshot)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.check_once()
+            except Exception:
+                logger.exception("health check round failed")
+
+            await asyncio.sleep(self._settings.HEALTH_CHECK_INTERVAL)
+
+    async def _measure(self, url: str) -> float | None:
+        started = time.perf_counter()
+
+        try:
+            status_code = await self._probe(url, self._settings.HEALTH_CHECK_TIMEOUT)
+        except (OSError, TimeoutError):
+            return None
+
+        if status_code >= 500:
+            return None
+
+        return time.perf_counter() - started
+
+    def _stats_for(self, target: HealthTarget) -> TargetStats:
+        key = (target.kind, target.name)
+
+        if key not in self._stats:
+            self._stats[key] = TargetStats(
+                window=self._settings.HEALTH_CHECK_WINDOW,
+                breaker=CircuitBreaker(
+                    failure_threshold=self._settings.HEALTH_CHECK_FAILURE_THRESHOLD,
+                    recovery_timeout=self._settings.HEALTH_CHECK_RECOVERY_TIMEOUT,
+                ),
+            )
+
+        return self._stats[key]
+
+    def _publish(self, snapshot: SettingsSnapshot) -> None:
+        unavailable = {
+            kind: frozenset(
+                name
+                for (stats_kind, name), stats in self._stats.items()
+                if stats_kind is kind and stats.breaker.is_open
+            )
+            for kind in HealthTargetKindEnum
+        }
+        unavailable_cdn = unavailable[HealthTargetKindEnum.CDN]
+        unavailable_origins = unavailable[HealthTargetKindEnum.ORIGIN]
+
+        for name in unavailable_cdn ^ self._unavailable_cdn:
+            self._log_transition(
+                HealthTargetKindEnum.CDN, name, name in unavailable_cdn
+            )
+
+        for name in unavailable_origins ^ self._unavailable_origins:
+            self._log_transition(
+                HealthTargetKindEnum.ORIGIN, name, name in unavailable_origins
+            )
+
+        # Выбор по весам среди доступных хостов (если недоступны все - среди всех)
+        if (
+            snapshot is not self._selector_snapshot
+            or unavailable_cdn != self._unavailable_cdn
+        ):
+            healthy_hosts = [
+                (host.host_name, host.weight)
+                for host in snapshot.cdn_hosts
+                if host.host_name not in unavailable_cdn and host.weight > 0
+            ]
+            self._cdn_selector = (
+                WeightedSelector(healthy_hosts)
+                if healthy_hosts
+                else snapshot.cdn_selector
+            )
+            self._selector_snapshot = snapshot
+
+        self._unavailable_cdn = unavailable_cdn
+        self._unavailable_origins = unavailable_origins
+
+    @staticmethod
+    def _log_transition(kind: HealthTargetKindEnum, name: str, failed: bool) -> None:
+        if failed:
+            logger.warning(
+                "%s target %s is unavailable, circuit opened", kind.value, name
+            )
+        else:
+            logger.info("%s target %s is available again", kind.value, name)
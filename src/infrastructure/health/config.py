@@ -0,0 +1,22 @@
+from src.core.config import BaseSettings
+
+
+class HealthCheckSettings(BaseSettings):
+    HEALTH_CHECK_ENABLED: bool = False
+    # Период и таймаут проверки (сек)
+    HEALTH_CHECK_INTERVAL: float = 5.0
+    HEALTH_CHECK_TIMEOUT: float = 1.0
+    # Что запрашиваем у цели: ответ с кодом < 500 считается успехом
+    HEALTH_CHECK_SCHEME: str = "http"
+    HEALTH_CHECK_PATH: str = "/"
+    # Хост origin сервера для проверки по его имени в настройках
+    # (например, "{name}.origin.com"), пусто - origin сервера не проверяются
+    # и считаются доступными
+    HEALTH_CHECK_ORIGIN_HOST_TEMPLATE: str = ""
+    # Сколько проверок подряд должно провалиться, чтобы исключить цель,
+    # и через сколько секунд снова пробовать её
+    HEALTH_CHECK_FAILURE_THRESHOLD: int = 3
+    HEALTH_CHECK_RECOVERY_TIMEOUT: float = 30.0
+    # Размер окна статистики (последние проверки) и число одновременных проверок
+    HEALTH_CHECK_WINDOW: int = 20
+    HEALTH_CHECK_CONCURRENCY: int = 50
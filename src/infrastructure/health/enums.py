@@ -0,0 +1,8 @@
+from enum import auto
+
+from src.core.enums import AutoStrEnum
+
+
+class HealthTargetKindEnum(AutoStrEnum):
+    CDN = auto()
+    ORIGIN = auto()
@@ -0,0 +1,104 @@
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+
+
+async def request_status(url: str, timeout: float, method: str = "HEAD") -> int:
+    """
+    Минимальный HTTP/1.0 запрос: возвращает только код ответа.
+    Без сторонних зависимостей, соединение закрывается сразу после статуса
+    """
+    async with asyncio.timeout(timeout):
+        reader, writer = await _send_request(url, method)
+
+        try:
+            status_line = await reader.readline()
+        finally:
+            writer.close()
+
+    return _parse_status(status_line)
+
+
+@dataclass(slots=True)
+class StreamedResponse:
+    status: int
+    headers: dict[str, str]
+    reader: asyncio.StreamReader
+    # Сколько ждать каждую следующую строку тела (сек)
+    read_timeout: float
+
+    async def lines(self) -> AsyncIterator[bytes]:
+        while True:
+            async with asyncio.timeout(self.read_timeout):
+                line = await self.reader.readline()
+
+            if not line:
+                return
+
+            yield line
+
+
+@asynccontextmanager
+async def stream_get(url: str, timeout: float) -> AsyncIterator[StreamedResponse]:
+    """
+    GET по HTTP/1.0 с потоковым чтением тела по строкам. HTTP/1.0 ответ
+    не бывает chunked и без Accept-Encoding приходит без сжатия, поэтому
+    тело - это просто байты до закрытия соединения
+    """
+    async with asyncio.timeout(timeout):
+        reader, writer = await _send_request(url, "GET")
+
+    try:
+        async with asyncio.timeout(timeout):
+            status = _parse_status(await reader.readline())
+            headers: dict[str, str] = {}
+
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+        yield StreamedResponse(
+            status=status, headers=headers, reader=reader, read_timeout=timeout
+        )
+
+    finally:
+        writer.close()
+
+
+async def _send_request(
+    url: str, method: str
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    parsed_url = urlsplit(url)
+    secure = parsed_url.scheme == "https"
+    port = parsed_url.port or (443 if secure else 80)
+    target = parsed_url.path or "/"
+
+    if parsed_url.query:
+        target = f"{target}?{parsed_url.query}"
+
+    reader, writer = await asyncio.open_connection(
+        parsed_url.hostname, port, ssl=secure or None
+    )
+
+    try:
+        writer.write(
+            f"{method} {target} HTTP/1.0\r\n"
+            f"Host: {parsed_url.netloc}\r\n"
+            "Connection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+    except BaseException:
+        writer.close()
+        raise
+
+    return reader, writer
+
+
+def _parse_status(status_line: bytes) -> int:
+    try:
+        return int(status_line.split()[1])
+    except (IndexError, ValueError):
+        raise ConnectionError(f"Некорректный ответ HTTP: {status_line!r}")
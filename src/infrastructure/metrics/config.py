@@ -0,0 +1,9 @@
+from src.core.config import BaseSettings
+
+
+class MetricsSettings(BaseSettings):
+    # Как часто воркер сбрасывает приросты метрик в общий хеш Redis (сек)
+    METRICS_FLUSH_INTERVAL: float = 5.0
+    # Срок жизни общего хеша метрик (сек), 0 - без срока. Каждый сброс его
+    # продлевает: хеш удаляется, только когда воркеры долго не пишут
+    METRICS_TTL: int = 86400
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+from redis import asyncio as aioredis
+
+from src.core.metrics import MetricsRegistry
+from src.infrastructure.cache.keys import RedisKeyspace
+
+logger = logging.getLogger(__name__)
+
+
+class RedisMetricsExporter:
+    """
+    Сводит метрики воркеров в один хеш Redis.
+
+    Каждый воркер периодически прибавляет к полям хеша (HINCRBYFLOAT одним
+    пайплайном) то, что накопилось с прошлого сброса, поэтому сумма по
+    воркерам верна для счётчиков и корзин гистограмм. Если сброс не удался,
+    приросты не теряются и уйдут со следующим. Каждый сброс продлевает срок
+    жизни хеша (ttl секунд, 0 - без срока): хеш от остановленного кластера
+    или старой схемы ключей удаляется сам, а сумма начинается заново
+    (для Prometheus - обычный сброс счётчиков)
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        client: aioredis.Redis | aioredis.RedisCluster,
+        interval: float,
+        keyspace: RedisKeyspace,
+        ttl: int = 0,
+    ) -> None:
+        self._registry = registry
+        self._client = client
+        self._interval = interval
+        self._ttl = ttl
+        self._key = keyspace.metrics()
+        self._flushed: dict[str, float] = {}
+        # Сброс из обработчика /metrics и фоновый не должны посчитать
+        # один прирост дважды
+        self._lock = asyncio.Lock()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        samples = self._registry.samples()
+        deltas = {
+            field: value - self._flushed.get(field, 0)
+            for field, value in samples.items()
+            if value != self._flushed.get(field, 0)
+        }
+
+        if not deltas:
+            return
+
+        async with self._client.pipeline(transaction=False) as pipeline:
+            for field, delta in deltas.items():
+                pipeline.hincrbyfloat(self._key, field, delta)
+
+            if self._ttl:
+                pipeline.expire(self._key, self._ttl)
+
+            await pipeline.execute()
+
+        self._flushed.update(samples)
+
+    async def render(self) -> str:
+        # Сначала отдаём свои приросты, затем читаем сумму по всем воркерам
+        await self.flush()
+        aggregated = await self._client.hgetall(self._key)
+
+        return self._registry.render(
+            {field: float(value) for field, value in aggregated.items()}
+        )
+
+    def render_local(self) -> str:
+        return self._registry.render()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+
+            try:
+                await self.flush()
+            except aioredis.RedisError as ex:
+                logger.warning("metrics flush failed: %s", ex)
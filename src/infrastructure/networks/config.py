@@ -0,0 +1,17 @@
+from src.core.config import BaseSettings
+
+
+class NetworkSettings(BaseSettings):
+    # Файл таблицы префиксов сетей клиентов (CSV: префикс, регион, ASN),
+    # пусто - решения не зависят от сети клиента
+    NETWORK_PREFIX_TABLE_PATH: str = ""
+    # Как часто (сек) воркер проверяет, не изменился ли файл
+    NETWORK_PREFIX_TABLE_RELOAD_INTERVAL: float = 10.0
+    # Хост CDN для клиентов региона (JSON-объект регион -> хост)
+    NETWORK_REGION_CDN_HOSTS: dict[str, str] = {}
+    # Регионы и автономные системы рядом с origin: их клиенты идут на origin
+    NETWORK_ORIGIN_REGIONS: list[str] = []
+    NETWORK_ORIGIN_ASNS: list[int] = []
+    # Заголовок с адресом клиента от прокси перед балансировщиком
+    # (X-Forwarded-For - первый адрес), пусто - адрес соединения
+    NETWORK_CLIENT_ADDRESS_HEADER: str = ""
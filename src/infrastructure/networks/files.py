@@ -0,0 +1,95 @@
+import asyncio
+import csv
+import logging
+import os
+
+from src.core.metrics import NETWORK_TABLE_RELOADS
+from src.core.prefixes import PrefixTable
+from src.domain.schemas import ClientNetwork
+
+logger = logging.getLogger(__name__)
+
+TABLE_LOADED = NETWORK_TABLE_RELOADS.labels("loaded")
+TABLE_FAILED = NETWORK_TABLE_RELOADS.labels("failed")
+
+# Время изменения файла до первой попытки загрузки
+_NOT_LOADED = -1
+
+
+def read_prefix_table(path: str) -> PrefixTable[ClientNetwork]:
+    """
+    Таблица префиксов из CSV: строка - префикс (IPv4 или IPv6), регион
+    и необязательный номер автономной системы. Пустые строки и строки,
+    начинающиеся с #, пропускаются
+    """
+    prefixes = []
+
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+
+        for row in reader:
+            if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                continue
+
+            if len(row) < 2:
+                raise ValueError(
+                    "Строка %s: ожидается префикс и регион" % reader.line_num
+                )
+
+            asn = row[2].strip() if len(row) > 2 else ""
+            network = ClientNetwork(
+                region=row[1].strip(), asn=int(asn) if asn else None
+            )
+            prefixes.append((row[0].strip(), network))
+
+    return PrefixTable(prefixes)
+
+
+class PrefixTableFile:
+    """
+    Таблица префиксов воркера из файла. Раз в reload_interval секунд run()
+    сверяет время изменения файла и, если он изменился, строит новую таблицу
+    в потоке и подменяет ей прежнюю - без перезапуска воркеров. Ошибка
+    в файле (или его отсутствие) не сбрасывает загруженную таблицу, файл
+    читается снова, когда изменится
+    """
+
+    def __init__(self, path: str, reload_interval: float) -> None:
+        self._path = path
+        self._reload_interval = reload_interval
+        self._mtime: int | None = _NOT_LOADED
+        self._table: PrefixTable[ClientNetwork] = PrefixTable(())
+
+    @property
+    def table(self) -> PrefixTable[ClientNetwork]:
+        return self._table
+
+    async def refresh(self) -> bool:
+        try:
+            mtime = os.stat(self._path).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        # С прошлой попытки файл не менялся
+        if mtime == self._mtime:
+            return False
+
+        self._mtime = mtime
+
+        try:
+            table = await asyncio.to_thread(read_prefix_table, self._path)
+
+        except (OSError, ValueError) as ex:
+            TABLE_FAILED.inc()
+            logger.warning("prefix table %s is not loaded: %r", self._path, ex)
+            return False
+
+        self._table = table
+        TABLE_LOADED.inc()
+        logger.info("prefix table %s loaded: %s ranges", self._path, len(table))
+        return True
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self._reload_interval)
+            await self.refresh()
@@ -1,15 +1,45 @@
-from contextlib import asynccontextmanager
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from redis import asyncio as aioredis
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
-from src.infrastructure.database.models.base import Base
-from src.infrastructure.database.session import get_async_session, get_async_engine
-from .infrastructure.database.bootstrap import bootstrap_database
+from src import IMPORT_STARTED_AT
+from src.application.config import BalancerSettings
+from src.core.metrics import WORKER_STARTUP_SECONDS
+from src.infrastructure.cache.config import (
+    SnapshotSettings,
+    SettingsCacheSettings,
+    CounterSettings,
+)
+from src.infrastructure.cache.enums import CounterBackendEnum
+from src.infrastructure.decision_log.config import DecisionLogSettings
+from src.infrastructure.health.config import HealthCheckSettings
+from src.infrastructure.networks.config import NetworkSettings
+from src.infrastructure.database.session import get_async_session
 from .presentation.rest.api import root_router
-from .presentation.rest.dependencies import get_redis_client
+from .presentation.rest.dependencies import (
+    get_redis_client,
+    get_settings_snapshot_store,
+    get_health_checker,
+    get_metrics_exporter,
+    get_settings_cache_warmer,
+    get_shared_counters,
+    get_url_rewriter,
+    build_worker_balancer_service,
+    get_worker_balancer_state,
+    get_decision_log,
+    get_prefix_table_file,
+    get_strategy_builder,
+)
+from .presentation.rest.fast_path import FastRedirectMiddleware, WorkerBalancerService
+from .presentation.rest.middleware import RequestTimingMiddleware
+
+logger = logging.getLogger(__name__)
 
 
 async def _check_db_connection():
@@ -31,18 +61,95 @@ async def _check_redis_connection():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Проверяем базовые подключения
-    await _check_db_connection()
-    await _check_redis_connection()
+    imported_at = time.perf_counter()
 
-    # Создаем таблицы в БД и наполняем первоначальными данными
-    async with get_async_engine().begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Несовместимые настройки стратегии - ошибка при старте, а не на запросе
+    get_strategy_builder()
 
-    await bootstrap_database()
+    # Проверяем базовые подключения. Схему БД воркер не создаёт: миграции
+    # и тестовые данные - разовые команды (python -m src.cli migrate / seed)
+    await asyncio.gather(_check_db_connection(), _check_redis_connection())
+
+    checked_at = time.perf_counter()
+    background_tasks: list[asyncio.Task] = []
+
+    # Загружаем снимок настроек и подписываемся на их изменения
+    if SnapshotSettings().SETTINGS_SNAPSHOT_ENABLED:
+        snapshot_store = get_settings_snapshot_store()
+        await snapshot_store.refresh()
+        background_tasks.append(asyncio.create_task(snapshot_store.run()))
+
+    # Прогреваем кеш настроек в Redis и периодически обновляем его
+    cache_settings = SettingsCacheSettings()
+
+    if cache_settings.SETTINGS_CACHE_WARMUP_ENABLED:
+        warmer = get_settings_cache_warmer()
+        await warmer.safe_warm()
+
+        if cache_settings.SETTINGS_CACHE_WARMUP_INTERVAL:
+            background_tasks.append(asyncio.create_task(warmer.run()))
+
+    # Проверяем доступность CDN и origin серверов (цели берутся из снимка)
+    if HealthCheckSettings().HEALTH_CHECK_ENABLED:
+        background_tasks.append(asyncio.create_task(get_health_checker().run()))
+
+    # Копируем счётчики из разделяемой памяти в Redis
+    counter_settings = CounterSettings()
+    shared_counters_enabled = (
+        counter_settings.COUNTER_BACKEND is CounterBackendEnum.SHARED_MEMORY
+        and counter_settings.COUNTER_SNAPSHOT_INTERVAL > 0
+    )
+
+    if shared_counters_enabled:
+        background_tasks.append(asyncio.create_task(get_shared_counters().run()))
+
+    # Загружаем таблицу сетей клиентов и перечитываем её при изменении файла
+    if NetworkSettings().NETWORK_PREFIX_TABLE_PATH:
+        prefix_table_file = get_prefix_table_file()
+        await prefix_table_file.refresh()
+        background_tasks.append(asyncio.create_task(prefix_table_file.run()))
+
+    # Пишем журнал решений пачками
+    decision_log_enabled = DecisionLogSettings().DECISION_LOG_ENABLED
+
+    if decision_log_enabled:
+        background_tasks.append(asyncio.create_task(get_decision_log().run()))
+
+    # Сбрасываем метрики воркера в общий хеш Redis
+    background_tasks.append(asyncio.create_task(get_metrics_exporter().run()))
+
+    ready_at = time.perf_counter()
+    WORKER_STARTUP_SECONDS.labels("imports").observe(imported_at - IMPORT_STARTED_AT)
+    WORKER_STARTUP_SECONDS.labels("checks").observe(checked_at - imported_at)
+    WORKER_STARTUP_SECONDS.labels("ready").observe(ready_at - IMPORT_STARTED_AT)
+    logger.info(
+        "worker ready in %.3f s (imports %.3f s, connection checks %.3f s)",
+        ready_at - IMPORT_STARTED_AT,
+        imported_at - IMPORT_STARTED_AT,
+        checked_at - imported_at,
+    )
 
     yield
 
+    for task in background_tasks:
+        task.cancel()
+
+        with suppress(asyncio.CancelledError):
+            await task
+
+    # Последняя копия счётчиков перед остановкой воркера
+    if shared_counters_enabled:
+        with suppress(aioredis.RedisError):
+            await get_shared_counters().snapshot()
+
+    # Дописываем накопленные решения
+    if decision_log_enabled:
+        await get_decision_log().flush()
+
+    # Отдаём последние приросты метрик
+    with suppress(aioredis.RedisError):
+        await get_metrics_exporter().flush()
+
     # Закрываем соединение с redis
     await get_redis_client().close()
 
@@ -56,6 +163,19 @@ def create_application() -> FastAPI:
     )
 
     application.include_router(root_router)
+
+    if BalancerSettings().REDIRECT_FAST_PATH_ENABLED:
+        application.add_middleware(
+            FastRedirectMiddleware,
+            rewriter=get_url_rewriter(),
+            service=WorkerBalancerService(
+                build=build_worker_balancer_service, state=get_worker_balancer_state
+            ),
+            client_address_header=NetworkSettings().NETWORK_CLIENT_ADDRESS_HEADER,
+        )
+
+    # Последний добавленный - внешний: замеряет и быстрый путь
+    application.add_middleware(RequestTimingMiddleware)
     return application
 
 
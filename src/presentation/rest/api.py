@@ -1,41 +1,195 @@
 import logging
+import time
+from contextlib import AsyncExitStack
+from functools import partial
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, Query, HTTPException, status
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, status
+from fastapi.responses import (
+    RedirectResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from pydantic import TypeAdapter
+from redis import asyncio as aioredis
 
+from src.application.config import BalancerSettings, ManifestSettings
+from src.application.decision_log import DecisionLog
+from src.application.networks import NetworkRouter
+from src.application.manifests import (
+    MEDIA_TYPES,
+    ManifestCache,
+    ManifestRewriter,
+    manifest_format,
+    origin_manifest_url,
+)
+from src.application.rewrite import UrlRewriter
 from src.application.services import BalancerService
-from src.domain.schemas import CdnServer, OriginServer
+from src.core.metrics import STAGE_SECONDS, DECISIONS, CACHE_REQUESTS
+from src.domain.enums import BulkRowStatusEnum
+from src.domain.schemas import (
+    CdnServer,
+    OriginServer,
+    VideoRequest,
+    CdnHost,
+    BulkResult,
+    BulkRowResult,
+    ResolvedVideoUrl,
+)
+from src.infrastructure.cache.codecs import CacheCodec
+from src.infrastructure.cache.guard import RedisGuard
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.cache.read_through import ReadThroughCache
+from src.infrastructure.cache.snapshot import (
+    SettingsChangeNotifier,
+    SettingsSnapshotStore,
+)
+from src.infrastructure.database.session import LazyAsyncSession
+from src.infrastructure.health.checker import HealthChecker
+from src.infrastructure.health.config import HealthCheckSettings
+from src.infrastructure.http.client import stream_get
+from src.infrastructure.metrics.exporter import RedisMetricsExporter
+from src.infrastructure.database.repositories.cdn_host import (
+    SqlAlchemyCdnHostRepository,
+)
+from src.infrastructure.database.repositories.origin import (
+    SqlAlchemyOriginServerRepository,
+)
+from .bulk import InvalidRow, read_json_rows, validate_row
 from .dependencies import (
     get_balancer_service,
+    get_client_address,
+    get_decision_log,
+    get_decision_log_repository,
+    get_cdn_host_persistent_repo,
     get_cached_origin_repo,
     get_cached_cdn_repo,
     get_origin_persistent_repo,
+    get_settings_change_notifier,
+    get_video_request,
+    get_health_checker,
+    get_health_check_settings,
+    get_redis_guard,
+    get_metrics_exporter,
+    get_settings_cache,
+    get_redis_keyspace,
+    get_origin_settings_codec,
+    get_batch_balancer_service,
+    get_balancer_settings,
+    get_url_rewriter,
+    get_db_session,
+    get_manifest_settings,
+    get_manifest_cache,
+    get_network_router,
+    get_settings_snapshot_store,
 )
-from ...domain.repositories import BaseCrudRepository
+from .middleware import STARTED_AT_SCOPE_KEY
+from ...domain.repositories import BaseCrudRepository, DecisionLogRepository
 
 logger = logging.getLogger(__name__)
 
+DEPENDENCIES_SECONDS = STAGE_SECONDS.labels("dependencies")
+DECISION_SECONDS = STAGE_SECONDS.labels("decision")
+DECISION_ERRORS = DECISIONS.labels("ERROR")
+MANIFEST_FETCH_SECONDS = STAGE_SECONDS.labels("manifest_fetch")
+MANIFEST_CACHE_HITS = CACHE_REQUESTS.labels("manifest", "hit")
+MANIFEST_CACHE_MISSES = CACHE_REQUESTS.labels("manifest", "miss")
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Окно сводки по журналу решений по умолчанию
+DECISION_ROLLUP_DEFAULT_WINDOW = timedelta(hours=1)
+
 # Корневой роутер для основного функционала
 root_router = APIRouter()
 
 
 @root_router.get("/")
 async def balance_request(
-    video_url: str = Query(description="URL видео-файла на origin сервере"),
+    request: Request,
+    video_request: VideoRequest = Depends(get_video_request),
     balancer_service: BalancerService = Depends(get_balancer_service),
+    client_address: str | None = Depends(get_client_address),
 ):
+    # От начала запроса до обработчика - разбор запроса и граф зависимостей
+    started_at = request.scope.get(STARTED_AT_SCOPE_KEY)
+
+    if started_at is not None:
+        DEPENDENCIES_SECONDS.observe(time.perf_counter() - started_at)
+
     try:
-        redirect_address = await balancer_service.get_redirect_address(video_url)
+        with DECISION_SECONDS.time():
+            redirect_address = await balancer_service.get_redirect_address(
+                video_request, client_address
+            )
+
+        DECISIONS.labels(redirect_address.type.name).inc()
+
         return RedirectResponse(
             url=redirect_address.url, status_code=status.HTTP_307_TEMPORARY_REDIRECT
         )
 
     # Некорректное значение
     except ValueError as e:
+        DECISION_ERRORS.inc()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Неизвестная ошибка
+    except Exception as e:
+        DECISION_ERRORS.inc()
+        logger.exception(e)
+
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error: %s" % str(e),
+        )
+
+
+@root_router.post("/resolve")
+async def resolve_batch(
+    video_urls: list[str] = Body(description="URL видео-файлов на origin серверах"),
+    rewriter: UrlRewriter = Depends(get_url_rewriter),
+    balancer_service: BalancerService = Depends(get_batch_balancer_service),
+    settings: BalancerSettings = Depends(get_balancer_settings),
+    client_address: str | None = Depends(get_client_address),
+) -> list[ResolvedVideoUrl]:
+    """
+    Адреса перенаправления для пакета URL (например, всех сегментов плейлиста)
+    в порядке запроса. Некорректный URL получает ошибку, остальные разрешаются
+    """
+    if len(video_urls) > settings.BATCH_RESOLVE_MAX_URLS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Too many URLs, max %s" % settings.BATCH_RESOLVE_MAX_URLS,
+        )
+
+    results = [ResolvedVideoUrl(video_url=video_url) for video_url in video_urls]
+    requests: list[VideoRequest] = []
+    resolved: list[ResolvedVideoUrl] = []
+
+    for result in results:
+        try:
+            requests.append(rewriter.parse(result.video_url))
+            resolved.append(result)
+        except ValueError as e:
+            result.error = str(e)
+
+    try:
+        with DECISION_SECONDS.time():
+            targets = await balancer_service.get_redirect_addresses(
+                requests, client_address
+            )
+
+    # Некорректное значение
+    except ValueError as e:
+        DECISION_ERRORS.inc(len(requests))
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     # Неизвестная ошибка
     except Exception as e:
+        DECISION_ERRORS.inc(len(requests))
         logger.exception(e)
 
         raise HTTPException(
@@ -43,6 +197,157 @@ async def balance_request(
             detail="Internal server error: %s" % str(e),
         )
 
+    for result, target in zip(resolved, targets):
+        result.type = target.type.name
+        result.url = target.url
+        DECISIONS.labels(result.type).inc()
+
+    return results
+
+
+@root_router.get("/manifest")
+async def rewrite_manifest(
+    video_request: VideoRequest = Depends(get_video_request),
+    rewriter: UrlRewriter = Depends(get_url_rewriter),
+    balancer_service: BalancerService = Depends(get_batch_balancer_service),
+    settings: ManifestSettings = Depends(get_manifest_settings),
+    cache: ManifestCache = Depends(get_manifest_cache),
+    session: LazyAsyncSession = Depends(get_db_session),
+    client_address: str | None = Depends(get_client_address),
+    network_router: NetworkRouter | None = Depends(get_network_router),
+    store: SettingsSnapshotStore = Depends(get_settings_snapshot_store),
+) -> Response:
+    """
+    Манифест HLS (.m3u8) или DASH (.mpd) с origin сервера, в котором адреса
+    сегментов уже переписаны на CDN или origin. Отдаётся потоком
+    """
+    if not settings.MANIFEST_ORIGIN_HOST_TEMPLATE:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Manifest rewriting is disabled",
+        )
+
+    format_ = manifest_format(video_request.path)
+
+    if format_ is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected an .m3u8 or .mpd manifest URL",
+        )
+
+    # Манифест читаем только с известного origin сервера - не с адреса клиента
+    known_origins = store.known_origins
+
+    if known_origins is not None and video_request.server_name not in known_origins:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown origin server %s" % video_request.server_name,
+        )
+
+    try:
+        manifest_url = origin_manifest_url(
+            video_request,
+            settings.MANIFEST_ORIGIN_HOST_TEMPLATE,
+            settings.MANIFEST_ORIGIN_SCHEME,
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    media_type = MEDIA_TYPES[format_]
+    cache_key = manifest_url
+
+    # Адреса в манифесте зависят от сети клиента - кешируем по ней отдельно
+    if network_router is not None:
+        route_key = network_router.route_key(network_router.network(client_address))
+
+        if route_key is not None:
+            cache_key = "%s\n%s" % (cache_key, route_key)
+
+    cached = cache.get(cache_key)
+
+    if cached is not None:
+        MANIFEST_CACHE_HITS.inc()
+        return Response(cached, media_type=media_type)
+
+    MANIFEST_CACHE_MISSES.inc()
+
+    # Соединение с origin живёт до конца потокового ответа
+    upstream_stack = AsyncExitStack()
+
+    try:
+        with MANIFEST_FETCH_SECONDS.time():
+            upstream = await upstream_stack.enter_async_context(
+                stream_get(manifest_url, settings.MANIFEST_FETCH_TIMEOUT)
+            )
+
+    except (OSError, TimeoutError) as e:
+        await upstream_stack.aclose()
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Origin manifest is unavailable: %s" % str(e),
+        )
+
+    if upstream.status != status.HTTP_200_OK:
+        await upstream_stack.aclose()
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Origin responded with %s" % upstream.status,
+        )
+
+    manifest_rewriter = ManifestRewriter(
+        url_rewriter=rewriter,
+        resolve=partial(
+            balancer_service.get_redirect_addresses, client_address=client_address
+        ),
+        batch_lines=settings.MANIFEST_REWRITE_BATCH_LINES,
+    )
+
+    async def stream():
+        # Копию тела держим, только пока манифест помещается в кеш
+        body: list[bytes] | None = []
+        size = 0
+
+        try:
+            async for chunk in manifest_rewriter.rewrite(
+                manifest_url, format_, upstream.lines()
+            ):
+                if body is not None:
+                    size += len(chunk)
+
+                    if size <= cache.max_bytes:
+                        body.append(chunk)
+                    else:
+                        body = None
+
+                yield chunk
+
+            if body is not None:
+                cache.put(cache_key, b"".join(body))
+
+        finally:
+            await upstream_stack.aclose()
+            # Зависимости закрываются до отправки ответа, а сессию БД (промах
+            # кеша настроек) могли открыть уже во время потока
+            await session.aclose()
+
+    return StreamingResponse(stream(), media_type=media_type)
+
+
+@root_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(
+    exporter: RedisMetricsExporter = Depends(get_metrics_exporter),
+) -> PlainTextResponse:
+    try:
+        content = await exporter.render()
+
+    # Без Redis сумму по воркерам не собрать - отдаём только свои значения
+    except aioredis.RedisError as ex:
+        logger.warning("metrics aggregation failed: %s", ex)
+        content = exporter.render_local()
+
+    return PlainTextResponse(content, media_type=METRICS_CONTENT_TYPE)
+
 
 # Роутер с базовым CRUD для сущности CDN (в единственном числе)
 cdn_router = APIRouter(prefix="/cdn")
@@ -67,6 +372,7 @@ async def get_cdn_server(
 async def create_cdn_server(
     data: CdnServer,
     cdn_repo: BaseCrudRepository[CdnServer] = Depends(get_cached_cdn_repo),
+    notifier: SettingsChangeNotifier = Depends(get_settings_change_notifier),
 ) -> int | None:
     if await cdn_repo.read():
         raise HTTPException(
@@ -74,15 +380,90 @@ async def create_cdn_server(
             detail="Cdn server already exists",
         )
 
-    return await cdn_repo.create(data)
+    id_ = await cdn_repo.create(data)
+    await notifier.notify()
+
+    return id_
 
 
 @cdn_router.put("/")
 async def update_cdn_server(
     data: CdnServer,
     cdn_repo: BaseCrudRepository[CdnServer] = Depends(get_cached_cdn_repo),
+    notifier: SettingsChangeNotifier = Depends(get_settings_change_notifier),
 ) -> None:
     await cdn_repo.update(id_=None, data=data)
+    await notifier.notify()
+
+
+# Роутер с CRUD для набора хостов CDN (выбираются по весам)
+cdn_hosts_router = APIRouter(prefix="/hosts")
+
+
+@cdn_hosts_router.get("/")
+async def get_cdn_hosts(
+    host_repo: SqlAlchemyCdnHostRepository = Depends(get_cdn_host_persistent_repo),
+) -> list[CdnHost]:
+    return await host_repo.read_all()
+
+
+@cdn_hosts_router.post("/")
+async def create_cdn_host(
+    data: CdnHost,
+    host_repo: SqlAlchemyCdnHostRepository = Depends(get_cdn_host_persistent_repo),
+    notifier: SettingsChangeNotifier = Depends(get_settings_change_notifier),
+) -> int:
+    if await host_repo.read(host_name=data.host_name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cdn host already exists",
+        )
+
+    id_ = await host_repo.create(data)
+    await notifier.notify()
+
+    return id_
+
+
+@cdn_hosts_router.put("/")
+async def update_cdn_host(
+    id_: int,
+    data: CdnHost,
+    host_repo: SqlAlchemyCdnHostRepository = Depends(get_cdn_host_persistent_repo),
+    notifier: SettingsChangeNotifier = Depends(get_settings_change_notifier),
+) -> None:
+    same_name_host = await host_repo.read(host_name=data.host_name)
+
+    if same_name_host is not None and same_name_host.id != id_:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cdn host with same name already exists",
+        )
+
+    if await host_repo.read(id=id_) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cdn host not found",
+        )
+
+    await host_repo.update(id_=id_, data=data)
+    await notifier.notify()
+
+
+@cdn_hosts_router.delete("/")
+async def delete_cdn_host(
+    id_: int,
+    host_repo: SqlAlchemyCdnHostRepository = Depends(get_cdn_host_persistent_repo),
+    notifier: SettingsChangeNotifier = Depends(get_settings_change_notifier),
+) -> None:
+    if await host_repo.read(id=id_) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cdn host not found",
+        )
+
+    await host_repo.delete(id_)
+    await notifier.notify()
 
 
 # Роутер с базовым CRUD для сущностей сервера
@@ -93,6 +474,9 @@ origin_router = APIRouter(prefix="/origin")
 async def create_origin_server(
     data: OriginServer,
     origin_repo: BaseCrudRepository[OriginServer] = Depends(get_origin_persistent_repo),
+    notifier: SettingsChangeNotifier = Depends(get_settings_change_notifier),
+    cache: ReadThroughCache = Depends(get_settings_cache),
+    keyspace: RedisKeyspace = Depends(get_redis_keyspace),
 ) -> int:
     if await origin_repo.read(name=data.name):
         raise HTTPException(
@@ -100,7 +484,13 @@ async def create_origin_server(
             detail="Origin server already exists",
         )
 
-    return await origin_repo.create(data)
+    id_ = await origin_repo.create(data)
+
+    # Сбрасываем отметку "сервера нет" в кеше
+    await cache.invalidate(keyspace.origin_settings(data.name))
+    await notifier.notify()
+
+    return id_
 
 
 @origin_router.put("/")
@@ -108,6 +498,9 @@ async def update_origin_server(
     id_: int,
     data: OriginServer,
     origin_repo: BaseCrudRepository[OriginServer] = Depends(get_origin_persistent_repo),
+    notifier: SettingsChangeNotifier = Depends(get_settings_change_notifier),
+    cache: ReadThroughCache = Depends(get_settings_cache),
+    keyspace: RedisKeyspace = Depends(get_redis_keyspace),
 ) -> None:
     if await origin_repo.read(name=data.name):
         raise HTTPException(
@@ -115,7 +508,9 @@ async def update_origin_server(
             detail="Origin server with same name already exists",
         )
 
-    if await origin_repo.read(id=id_) is None:
+    current = await origin_repo.read(id=id_)
+
+    if current is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Origin server not found",
@@ -123,7 +518,186 @@ async def update_origin_server(
 
     await origin_repo.update(id_=id_, data=data)
 
+    # Старое и новое имя перечитаются из базы при следующем запросе
+    await cache.invalidate(keyspace.origin_settings(current.name))
+    await cache.invalidate(keyspace.origin_settings(data.name))
+    await notifier.notify()
+
+
+ORIGIN_ADAPTER = TypeAdapter(OriginServer)
+
+
+async def _apply_origins_bulk(
+    request: Request,
+    origin_repo: SqlAlchemyOriginServerRepository,
+    notifier: SettingsChangeNotifier,
+    cache: ReadThroughCache,
+    keyspace: RedisKeyspace,
+    codec: CacheCodec,
+    update_existing: bool,
+) -> BulkResult:
+    result = BulkResult()
+    valid: list[tuple[int, OriginServer]] = []
+    seen_names: set[str] = set()
+
+    async for index, row in read_json_rows(request):
+        try:
+            origin = validate_row(ORIGIN_ADAPTER, row)
+
+            if origin.name in seen_names:
+                raise InvalidRow("Duplicate name in request")
+
+        except InvalidRow as ex:
+            name = row.get("name") if isinstance(row, dict) else None
+            result.add(
+                BulkRowResult(
+                    index=index,
+                    status=BulkRowStatusEnum.INVALID,
+                    name=name if isinstance(name, str) else None,
+                    error=str(ex),
+                )
+            )
+            continue
+
+        seen_names.add(origin.name)
+        valid.append((index, origin))
+
+    written = await origin_repo.upsert_many(
+        [origin for _, origin in valid], update_existing=update_existing
+    )
+    skipped_status = (
+        BulkRowStatusEnum.UNCHANGED if update_existing else BulkRowStatusEnum.EXISTS
+    )
+
+    for index, origin in valid:
+        if origin.name not in written:
+            result.add(
+                BulkRowResult(index=index, status=skipped_status, name=origin.name)
+            )
+            continue
+
+        id_, inserted = written[origin.name]
+        result.add(
+            BulkRowResult(
+                index=index,
+                status=(
+                    BulkRowStatusEnum.CREATED if inserted else BulkRowStatusEnum.UPDATED
+                ),
+                name=origin.name,
+                id=id_,
+            )
+        )
+
+    result.rows.sort(key=lambda row: row.index)
+
+    if not written:
+        return result
+
+    # Новые значения (и сброс отметок "сервера нет") - одним пайплайном
+    try:
+        await cache.write_many(
+            (keyspace.origin_settings(origin.name), asdict(origin), codec)
+            for _, origin in valid
+            if origin.name in written
+        )
+
+    # Записи с TTL обновятся сами, отметки "нет в БД" истекут
+    except aioredis.RedisError as ex:
+        logger.warning("bulk cache update failed: %s", ex)
+
+    await notifier.notify()
+
+    return result
+
+
+@origin_router.post("/bulk")
+async def create_origin_servers(
+    request: Request,
+    origin_repo: SqlAlchemyOriginServerRepository = Depends(get_origin_persistent_repo),
+    notifier: SettingsChangeNotifier = Depends(get_settings_change_notifier),
+    cache: ReadThroughCache = Depends(get_settings_cache),
+    keyspace: RedisKeyspace = Depends(get_redis_keyspace),
+    codec: CacheCodec = Depends(get_origin_settings_codec),
+) -> BulkResult:
+    """
+    Пакетное создание серверов: JSON-массив или NDJSON (application/x-ndjson).
+    Существующие сервера не меняются (статус EXISTS)
+    """
+    return await _apply_origins_bulk(
+        request, origin_repo, notifier, cache, keyspace, codec, update_existing=False
+    )
+
+
+@origin_router.put("/bulk")
+async def upsert_origin_servers(
+    request: Request,
+    origin_repo: SqlAlchemyOriginServerRepository = Depends(get_origin_persistent_repo),
+    notifier: SettingsChangeNotifier = Depends(get_settings_change_notifier),
+    cache: ReadThroughCache = Depends(get_settings_cache),
+    keyspace: RedisKeyspace = Depends(get_redis_keyspace),
+    codec: CacheCodec = Depends(get_origin_settings_codec),
+) -> BulkResult:
+    """
+    Пакетное создание и обновление серверов по имени: JSON-массив или NDJSON
+    """
+    return await _apply_origins_bulk(
+        request, origin_repo, notifier, cache, keyspace, codec, update_existing=True
+    )
+
+
+# Роутер с состоянием проверок доступности целей
+health_router = APIRouter(prefix="/health")
+
+
+@health_router.get("/targets")
+async def get_targets_health(
+    settings: HealthCheckSettings = Depends(get_health_check_settings),
+    checker: HealthChecker = Depends(get_health_checker),
+) -> list[dict]:
+    if not settings.HEALTH_CHECK_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Health checks are disabled",
+        )
+
+    return checker.stats()
+
+
+@health_router.get("/dependencies")
+async def get_dependencies_health(guard: RedisGuard = Depends(get_redis_guard)) -> dict:
+    # Состояние предохранителя этого воркера: degraded - Redis пропускается
+    return {"redis": guard.stats()}
+
+
+# Роутер со сводками по журналу решений
+decisions_router = APIRouter(prefix="/decisions")
+
+
+@decisions_router.get("/rollup")
+async def get_decisions_rollup(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    server_name: str | None = None,
+    decision_log: DecisionLog | None = Depends(get_decision_log),
+    repository: DecisionLogRepository = Depends(get_decision_log_repository),
+) -> list[dict]:
+    if decision_log is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Decision log is disabled",
+        )
+
+    # Решения по серверам за каждую минуту окна (по умолчанию - последний час).
+    # Решения, ещё не записанные воркерами, в сводку не попадают
+    until = until or datetime.now(timezone.utc)
+    since = since or until - DECISION_ROLLUP_DEFAULT_WINDOW
+
+    return [asdict(row) for row in await repository.rollup(since, until, server_name)]
+
 
 # Добавляем дочерние обработчики в корневой
+cdn_router.include_router(cdn_hosts_router)
 root_router.include_router(cdn_router)
 root_router.include_router(origin_router)
+root_router.include_router(health_router)
+root_router.include_router(decisions_router)
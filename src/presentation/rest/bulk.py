@@ -0,0 +1,78 @@
+import json
+from typing import Any, AsyncIterator
+
+from fastapi import HTTPException, Request, status
+from pydantic import TypeAdapter, ValidationError
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl")
+
+
+class InvalidRow(Exception):
+    pass
+
+
+async def read_json_rows(request: Request) -> AsyncIterator[tuple[int, Any]]:
+    """
+    Строки пакетной загрузки: JSON-массив или NDJSON (объект на строку,
+    читается потоком). Нечитаемая строка NDJSON отдаётся как InvalidRow
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith(NDJSON_CONTENT_TYPES):
+        index = 0
+        buffer = b""
+
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+
+            for line in lines:
+                if line.strip():
+                    yield index, _parse_line(line)
+                    index += 1
+
+        if buffer.strip():
+            yield index, _parse_line(buffer)
+
+        return
+
+    try:
+        rows = json.loads(await request.body())
+    except ValueError as ex:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON: %s" % ex
+        )
+
+    if not isinstance(rows, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a JSON array or NDJSON",
+        )
+
+    for index, row in enumerate(rows):
+        yield index, row
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as ex:
+        return InvalidRow("Invalid JSON: %s" % ex)
+
+
+def validate_row[Entity](adapter: TypeAdapter[Entity], row: Any) -> Entity:
+    """
+    Приводит строку к сущности, ошибки - одним сообщением InvalidRow
+    """
+    if isinstance(row, InvalidRow):
+        raise row
+
+    try:
+        return adapter.validate_python(row)
+    except ValidationError as ex:
+        raise InvalidRow(
+            "; ".join(
+                "%s: %s" % (".".join(map(str, error["loc"])) or "row", error["msg"])
+                for error in ex.errors()
+            )
+        )
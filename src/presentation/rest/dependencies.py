@@ -1,47 +1,262 @@
+import logging
 from functools import lru_cache
 
-from fastapi import Depends, Query
+from fastapi import Depends, HTTPException, Query, Request, status
 from redis import asyncio as aioredis
+from redis.commands.core import AsyncScript
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.application.builders import STRATEGY_BUILDERS, StrategyBuilder
+from src.application.config import (
+    BalancerSettings,
+    ManifestSettings,
+    UrlRewriteSettings,
+)
+from src.application.decision_log import DecisionLog
+from src.application.enums import BalancingStrategyEnum
+from src.application.manifests import ManifestCache
+from src.application.networks import NetworkRouter
+from src.application.rewrite import RewriteRule, UrlRewriter
 from src.application.services import BalancerService
-from src.application.strategies import BalancingStrategy, NthRequestStrategy
-from src.core.utils import extract_server_name_from_url
-from src.domain.repositories import (
-    CdnRequestCounterRepository,
-    BaseCrudRepository,
+from src.application.strategies import BalancingStrategy, CounterRepositoryFactory
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.metrics import REGISTRY
+from src.core.prefixes import PrefixTable
+from src.core.rates import CounterRateEstimator
+from src.core.singleflight import SingleFlight
+from src.domain.health import TargetHealthRegistry
+from src.domain.repositories import BaseCrudRepository, DecisionLogRepository
+from src.domain.schemas import CdnServer, OriginServer, VideoRequest
+from src.infrastructure.cache.codecs import CacheCodec, build_codec, schema_tag
+from src.infrastructure.cache.config import (
+    CounterSettings,
+    RedisSettings,
+    SettingsCacheSettings,
+    SnapshotSettings,
+)
+from src.infrastructure.cache.enums import CacheCodecEnum
+from src.infrastructure.cache.factories import (
+    create_counter_repo_factory,
+    create_redis_client,
+    create_redis_pubsub_client,
 )
-from src.domain.schemas import CdnServer, OriginServer
-from src.infrastructure.cache.config import RedisSettings
+from src.infrastructure.cache.guard import LocalCounters, RedisGuard
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.cache.leasing import CounterBlockLeaser
+from src.infrastructure.cache.read_through import LastKnownValues, ReadThroughCache
 from src.infrastructure.cache.repository import (
-    RedisCdnRequestCounterRepository,
     CachedCdnServerRepository,
     CachedOriginServerRepository,
+    ShardCursors,
+)
+from src.infrastructure.cache.scripts import NTH_REQUEST_DECISION_SCRIPT
+from src.infrastructure.cache.shared_counters import SharedCounterRegion, SharedCounters
+from src.infrastructure.cache.snapshot import (
+    SettingsChangeNotifier,
+    SettingsSnapshotStore,
+)
+from src.infrastructure.cache.strategy_parts import (
+    SnapshotStrategyParts,
+    StrategyResources,
 )
+from src.infrastructure.cache.warmer import SettingsCacheWarmer
+from src.infrastructure.database.loaders import load_balancing_settings
+from src.infrastructure.database.repositories.base import SessionPerCallRepository
 from src.infrastructure.database.repositories.cdn import SqlAlchemyCdnServerRepository
+from src.infrastructure.database.repositories.cdn_host import (
+    SqlAlchemyCdnHostRepository,
+)
 from src.infrastructure.database.repositories.origin import (
     SqlAlchemyOriginServerRepository,
 )
-from src.infrastructure.database.session import get_async_session
+from src.infrastructure.database.session import get_lazy_async_session
+from src.infrastructure.decision_log.config import DecisionLogSettings
+from src.infrastructure.decision_log.factories import create_decision_log_repository
+from src.infrastructure.health.checker import HealthChecker
+from src.infrastructure.health.config import HealthCheckSettings
+from src.infrastructure.metrics.config import MetricsSettings
+from src.infrastructure.metrics.exporter import RedisMetricsExporter
+from src.infrastructure.networks.config import NetworkSettings
+from src.infrastructure.networks.files import PrefixTableFile
+
+from .middleware import scope_client_address
+
+logger = logging.getLogger(__name__)
 
 
 # Базовые зависимости - клиент Redis и сессия алхимии
 @lru_cache
-def get_redis_client() -> aioredis.Redis:
-    pool = aioredis.ConnectionPool.from_url(
-        url=RedisSettings().url, max_connections=100, decode_responses=True
+def get_redis_settings() -> RedisSettings:
+    return RedisSettings()
+
+
+@lru_cache
+def get_redis_keyspace() -> RedisKeyspace:
+    codec = get_settings_codec_kind()
+
+    return RedisKeyspace(
+        cluster=get_redis_settings().REDIS_CLUSTER,
+        cdn_schema=schema_tag(CdnServer, codec),
+        origin_schema=schema_tag(OriginServer, codec),
     )
 
-    return aioredis.Redis(connection_pool=pool)
+
+@lru_cache
+def get_redis_client() -> aioredis.Redis | aioredis.RedisCluster:
+    return create_redis_client(get_redis_settings())
+
+
+@lru_cache
+def get_redis_pubsub_client() -> aioredis.Redis:
+    return create_redis_pubsub_client(get_redis_settings(), get_redis_client())
 
 
 async def get_db_session() -> AsyncSession:
-    async with get_async_session() as session:
+    # Сессия откроется только при реальном обращении к БД (промах кеша, CRUD)
+    async with get_lazy_async_session() as session:
         yield session
 
 
+# Снимок настроек в памяти воркера и оповещение об их изменении
+@lru_cache
+def get_settings_snapshot_store() -> SettingsSnapshotStore:
+    settings = SnapshotSettings()
+
+    return SettingsSnapshotStore(
+        loader=load_balancing_settings,
+        cache_client=get_redis_client(),
+        pubsub_client=get_redis_pubsub_client(),
+        channel=settings.SETTINGS_CHANGES_CHANNEL,
+        ttl=settings.SETTINGS_SNAPSHOT_TTL,
+        keyspace=get_redis_keyspace(),
+    )
+
+
+@lru_cache
+def get_settings_change_notifier() -> SettingsChangeNotifier:
+    return SettingsChangeNotifier(
+        cache_client=get_redis_client(),
+        pubsub_client=get_redis_pubsub_client(),
+        channel=SnapshotSettings().SETTINGS_CHANGES_CHANNEL,
+        keyspace=get_redis_keyspace(),
+    )
+
+
+# Метрики воркера и их сведение по воркерам через Redis
+@lru_cache
+def get_metrics_exporter() -> RedisMetricsExporter:
+    settings = MetricsSettings()
+
+    return RedisMetricsExporter(
+        registry=REGISTRY,
+        client=get_redis_client(),
+        interval=settings.METRICS_FLUSH_INTERVAL,
+        keyspace=get_redis_keyspace(),
+        ttl=settings.METRICS_TTL,
+    )
+
+
+# Чтение настроек через кеш: одна загрузка из БД на ключ в воркере
+@lru_cache
+def get_settings_cache_settings() -> SettingsCacheSettings:
+    return SettingsCacheSettings()
+
+
+@lru_cache
+def get_settings_codec_kind() -> CacheCodecEnum:
+    codec = get_settings_cache_settings().SETTINGS_CACHE_CODEC
+
+    # Скрипт решения читает настройки из JSON
+    if (
+        codec is not CacheCodecEnum.JSON
+        and get_balancer_settings().BALANCING_STRATEGY
+        is BalancingStrategyEnum.SCRIPTED_NTH_REQUEST
+    ):
+        logger.warning(
+            "SETTINGS_CACHE_CODEC=%s is not supported by %s, using JSON",
+            codec.value,
+            BalancingStrategyEnum.SCRIPTED_NTH_REQUEST.value,
+        )
+        return CacheCodecEnum.JSON
+
+    return codec
+
+
+@lru_cache
+def get_cdn_settings_codec() -> CacheCodec:
+    return build_codec(get_settings_codec_kind(), CdnServer)
+
+
+@lru_cache
+def get_origin_settings_codec() -> CacheCodec:
+    return build_codec(get_settings_codec_kind(), OriginServer)
+
+
+@lru_cache
+def get_settings_single_flight() -> SingleFlight:
+    return SingleFlight()
+
+
+@lru_cache
+def get_last_known_settings() -> LastKnownValues:
+    return LastKnownValues()
+
+
+# Предохранитель вызовов Redis на пути запроса, один на воркер
+@lru_cache
+def get_redis_guard() -> RedisGuard:
+    settings = get_redis_settings()
+
+    return RedisGuard(
+        CircuitBreaker(
+            failure_threshold=settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=settings.REDIS_BREAKER_RECOVERY_TIMEOUT,
+        )
+    )
+
+
+@lru_cache
+def get_local_counters() -> LocalCounters:
+    return LocalCounters()
+
+
+@lru_cache
+def get_shard_cursors() -> ShardCursors:
+    return ShardCursors()
+
+
+def get_settings_cache(
+    redis_client: aioredis.Redis = Depends(get_redis_client),
+    settings: SettingsCacheSettings = Depends(get_settings_cache_settings),
+    keyspace: RedisKeyspace = Depends(get_redis_keyspace),
+) -> ReadThroughCache:
+    return ReadThroughCache(
+        client=redis_client,
+        single_flight=get_settings_single_flight(),
+        settings=settings,
+        keyspace=keyspace,
+        guard=get_redis_guard(),
+        last_known=get_last_known_settings(),
+    )
+
+
+@lru_cache
+def get_settings_cache_warmer() -> SettingsCacheWarmer:
+    settings = get_settings_cache_settings()
+
+    return SettingsCacheWarmer(
+        loader=load_balancing_settings,
+        client=get_redis_client(),
+        cache=get_settings_cache(get_redis_client(), settings, get_redis_keyspace()),
+        keyspace=get_redis_keyspace(),
+        cdn_codec=get_cdn_settings_codec(),
+        origin_codec=get_origin_settings_codec(),
+        interval=settings.SETTINGS_CACHE_WARMUP_INTERVAL,
+    )
+
+
 # Зависимости слоя данных для сущности сервера CDN
-def get_cdn_persistent_repo(
+async def get_cdn_persistent_repo(
     session: AsyncSession = Depends(get_db_session),
 ) -> BaseCrudRepository:
     return SqlAlchemyCdnServerRepository(session)
@@ -49,63 +264,383 @@ def get_cdn_persistent_repo(
 
 def get_cached_cdn_repo(
     persistent_repo: BaseCrudRepository[CdnServer] = Depends(get_cdn_persistent_repo),
-    redis_client: aioredis.Redis = Depends(get_redis_client),
+    cache: ReadThroughCache = Depends(get_settings_cache),
+    keyspace: RedisKeyspace = Depends(get_redis_keyspace),
+    codec: CacheCodec = Depends(get_cdn_settings_codec),
 ) -> BaseCrudRepository[CdnServer]:
     return CachedCdnServerRepository(
-        persistent_repository=persistent_repo, cache_client=redis_client
+        persistent_repository=persistent_repo,
+        cache=cache,
+        keyspace=keyspace,
+        codec=codec,
     )
 
 
+# Зависимости слоя данных для набора хостов CDN
+async def get_cdn_host_persistent_repo(
+    session: AsyncSession = Depends(get_db_session),
+) -> SqlAlchemyCdnHostRepository:
+    return SqlAlchemyCdnHostRepository(session)
+
+
+# Активная проверка доступности CDN и origin серверов
+@lru_cache
+def get_health_check_settings() -> HealthCheckSettings:
+    return HealthCheckSettings()
+
+
+@lru_cache
+def get_health_checker() -> HealthChecker:
+    return HealthChecker(
+        store=get_settings_snapshot_store(), settings=get_health_check_settings()
+    )
+
+
+def get_target_health(
+    settings: HealthCheckSettings = Depends(get_health_check_settings),
+) -> TargetHealthRegistry | None:
+    return get_health_checker() if settings.HEALTH_CHECK_ENABLED else None
+
+
+# Разбор URL видео: один раз на запрос, дальше по графу зависимостей
+# и в стратегию передаётся готовый VideoRequest
+@lru_cache
+def get_url_rewriter() -> UrlRewriter:
+    settings = UrlRewriteSettings()
+
+    return UrlRewriter(
+        rules=[
+            RewriteRule.compile(rule.host_pattern, rule.cdn_url_template)
+            for rule in settings.URL_REWRITE_RULES
+        ],
+        cache_size=settings.URL_REWRITE_CACHE_SIZE,
+    )
+
+
+async def get_video_request(
+    video_url: str = Query(description="URL видео-файла на origin сервере"),
+) -> VideoRequest:
+    try:
+        return get_url_rewriter().parse(video_url)
+
+    # Некорректный URL - ошибка клиента. Перенаправлять на него же (ORIGIN)
+    # нельзя: адрес не прошёл ни одно правило, это не наш origin
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 # Зависимости слоя данных для сущностей серверов Origin
-def extract_server_name(
-    video_url: str = Query(...),
+async def extract_server_name(
+    video_request: VideoRequest = Depends(get_video_request),
 ) -> str:
     """
     Достаёт из URL значение сервера (если оно существует в заранее известном формате)
     """
-    return extract_server_name_from_url(video_url)
+    return video_request.server_name
 
 
-def get_origin_persistent_repo(
+async def get_origin_persistent_repo(
     session: AsyncSession = Depends(get_db_session),
 ) -> BaseCrudRepository:
     return SqlAlchemyOriginServerRepository(session)
 
 
-def get_cached_origin_repo(
+async def get_cached_origin_repo(
     persistent_repo: BaseCrudRepository[OriginServer] = Depends(
         get_origin_persistent_repo
     ),
-    redis_client: aioredis.Redis = Depends(get_redis_client),
+    cache: ReadThroughCache = Depends(get_settings_cache),
     server_name: str = Depends(extract_server_name),
+    keyspace: RedisKeyspace = Depends(get_redis_keyspace),
+    store: SettingsSnapshotStore = Depends(get_settings_snapshot_store),
+    codec: CacheCodec = Depends(get_origin_settings_codec),
 ) -> BaseCrudRepository[OriginServer]:
     return CachedOriginServerRepository(
         persistent_repository=persistent_repo,
-        cache_client=redis_client,
+        cache=cache,
         server_name=server_name,
+        keyspace=keyspace,
+        known_origins=store.known_origins,
+        codec=codec,
     )
 
 
 # Зависимость слоя данных для работы со счётчиком обращений
-def get_counter_repo(
-    redis: aioredis.Redis = Depends(get_redis_client),
-    server_name: str = Depends(extract_server_name),
-) -> CdnRequestCounterRepository:
-    return RedisCdnRequestCounterRepository(server_name=server_name, client=redis)
+@lru_cache
+def get_counter_settings() -> CounterSettings:
+    return CounterSettings()
+
+
+@lru_cache
+def get_counter_block_leaser() -> CounterBlockLeaser:
+    settings = get_counter_settings()
+
+    return CounterBlockLeaser(
+        client=get_redis_client(),
+        block_size=settings.COUNTER_BLOCK_SIZE,
+        min_block_size=settings.COUNTER_BLOCK_MIN_SIZE,
+        max_block_size=settings.COUNTER_BLOCK_MAX_SIZE,
+        lease_interval=settings.COUNTER_BLOCK_LEASE_INTERVAL,
+        adaptive=settings.COUNTER_BLOCK_ADAPTIVE,
+    )
+
+
+@lru_cache
+def get_shared_counters() -> SharedCounters:
+    settings = get_counter_settings()
+
+    return SharedCounters(
+        region=SharedCounterRegion(
+            path=settings.COUNTER_SHARED_MEMORY_PATH,
+            slots=settings.COUNTER_SHARED_MEMORY_SLOTS,
+        ),
+        client=get_redis_client(),
+        snapshot_interval=settings.COUNTER_SNAPSHOT_INTERVAL,
+    )
+
+
+@lru_cache
+def get_counter_repo_factory() -> CounterRepositoryFactory:
+    return create_counter_repo_factory(
+        settings=get_counter_settings(),
+        client=get_redis_client(),
+        keyspace=get_redis_keyspace(),
+        guard=get_redis_guard(),
+        local_counters=get_local_counters(),
+        shard_cursors=get_shard_cursors(),
+        shared_counters=get_shared_counters,
+        leaser=get_counter_block_leaser,
+    )
+
+
+# Серверный скрипт Redis для принятия решения
+@lru_cache
+def get_decision_script() -> AsyncScript:
+    return get_redis_client().register_script(NTH_REQUEST_DECISION_SCRIPT)
 
 
 # Зависимости слоя сервиса (стратегия балансировки и сервис балансировки)
-def get_balancing_strategy(
-    cdn_repo: BaseCrudRepository[CdnServer] = Depends(get_cached_cdn_repo),
-    origin_repo: BaseCrudRepository[OriginServer] = Depends(get_cached_origin_repo),
-    counter_repo: CdnRequestCounterRepository = Depends(get_counter_repo),
+@lru_cache
+def get_balancer_settings() -> BalancerSettings:
+    return BalancerSettings()
+
+
+@lru_cache
+def get_origin_rate_estimator() -> CounterRateEstimator:
+    # Точки счётчиков копятся между запросами - одна оценка на воркер
+    return CounterRateEstimator(window=get_balancer_settings().ADAPTIVE_RATIO_WINDOW)
+
+
+@lru_cache
+def get_strategy_resources() -> StrategyResources:
+    health_checker = (
+        get_health_checker()
+        if get_health_check_settings().HEALTH_CHECK_ENABLED
+        else None
+    )
+
+    return StrategyResources(
+        client=get_redis_client(),
+        keyspace=get_redis_keyspace(),
+        store=get_settings_snapshot_store(),
+        cache_settings=get_settings_cache_settings(),
+        single_flight=get_settings_single_flight(),
+        last_known=get_last_known_settings(),
+        guard=get_redis_guard(),
+        cdn_codec=get_cdn_settings_codec(),
+        origin_codec=get_origin_settings_codec(),
+        counter_repo_factory=get_counter_repo_factory(),
+        decision_script=get_decision_script(),
+        health_checker=health_checker,
+        rates=get_origin_rate_estimator(),
+    )
+
+
+@lru_cache
+def get_strategy_builder() -> StrategyBuilder:
+    # Стратегия задаётся настройками воркера - сборка выбирается один раз
+    strategy = get_balancer_settings().BALANCING_STRATEGY
+
+    # Скрипт работает с ключами одного слота: его счётчик не шардируется
+    # (см. RedisKeyspace.scripted_counter)
+    if (
+        strategy is BalancingStrategyEnum.SCRIPTED_NTH_REQUEST
+        and get_counter_settings().COUNTER_SHARDS > 1
+    ):
+        raise ValueError(
+            "Стратегия SCRIPTED_NTH_REQUEST несовместима с COUNTER_SHARDS > 1"
+        )
+
+    return STRATEGY_BUILDERS[strategy]
+
+
+# Граф FastAPI на запрос - только URL и сессия БД, остальное собирает
+# сборка выбранной стратегии (зависимости других стратегий не создаются)
+async def get_balancing_strategy(
+    video_request: VideoRequest = Depends(get_video_request),
+    session: AsyncSession = Depends(get_db_session),
+) -> BalancingStrategy:
+    parts = SnapshotStrategyParts(
+        resources=get_strategy_resources(),
+        cdn_persistent_repo=SqlAlchemyCdnServerRepository(session),
+        origin_persistent_repo=SqlAlchemyOriginServerRepository(session),
+        server_name=video_request.server_name,
+    )
+
+    return get_strategy_builder()(get_balancer_settings(), parts)
+
+
+async def get_batch_balancing_strategy(
+    session: AsyncSession = Depends(get_db_session),
 ) -> BalancingStrategy:
-    return NthRequestStrategy(
-        cdn_repo=cdn_repo, origin_repo=origin_repo, counter_repo=counter_repo
+    # В пакете встречаются разные сервера: репозитории и счётчики - по имени
+    parts = SnapshotStrategyParts(
+        resources=get_strategy_resources(),
+        cdn_persistent_repo=SqlAlchemyCdnServerRepository(session),
+        origin_persistent_repo=SqlAlchemyOriginServerRepository(session),
+    )
+
+    return get_strategy_builder()(get_balancer_settings(), parts)
+
+
+# Журнал решений о перенаправлении
+@lru_cache
+def get_decision_log_settings() -> DecisionLogSettings:
+    return DecisionLogSettings()
+
+
+@lru_cache
+def get_decision_log_repository() -> DecisionLogRepository:
+    return create_decision_log_repository(get_decision_log_settings())
+
+
+@lru_cache
+def get_decision_log() -> DecisionLog | None:
+    settings = get_decision_log_settings()
+
+    if not settings.DECISION_LOG_ENABLED:
+        return None
+
+    return DecisionLog(
+        repository=get_decision_log_repository(),
+        max_pending=settings.DECISION_LOG_MAX_PENDING,
+        batch_size=settings.DECISION_LOG_BATCH_SIZE,
+        flush_interval=settings.DECISION_LOG_FLUSH_INTERVAL,
     )
 
 
-def get_balancer_service(
+# Решения по сети клиента (таблица префиксов из файла)
+@lru_cache
+def get_network_settings() -> NetworkSettings:
+    return NetworkSettings()
+
+
+@lru_cache
+def get_prefix_table_file() -> PrefixTableFile:
+    settings = get_network_settings()
+
+    return PrefixTableFile(
+        path=settings.NETWORK_PREFIX_TABLE_PATH,
+        reload_interval=settings.NETWORK_PREFIX_TABLE_RELOAD_INTERVAL,
+    )
+
+
+def get_prefix_table() -> PrefixTable:
+    # Таблица подменяется при перечитывании файла - берём текущую
+    return get_prefix_table_file().table
+
+
+@lru_cache
+def get_network_router() -> NetworkRouter | None:
+    settings = get_network_settings()
+
+    if not settings.NETWORK_PREFIX_TABLE_PATH:
+        return None
+
+    return NetworkRouter(
+        table=get_prefix_table,
+        region_cdn_hosts=settings.NETWORK_REGION_CDN_HOSTS,
+        origin_regions=settings.NETWORK_ORIGIN_REGIONS,
+        origin_asns=settings.NETWORK_ORIGIN_ASNS,
+        health=get_target_health(get_health_check_settings()),
+    )
+
+
+async def get_client_address(request: Request) -> str | None:
+    return scope_client_address(
+        request.scope,
+        get_network_settings().NETWORK_CLIENT_ADDRESS_HEADER.lower().encode("latin-1"),
+    )
+
+
+def _build_balancer_service(strategy: BalancingStrategy) -> BalancerService:
+    return BalancerService(
+        strategy,
+        deadline=get_balancer_settings().REQUEST_DEADLINE,
+        decision_log=get_decision_log(),
+        network_router=get_network_router(),
+    )
+
+
+async def get_balancer_service(
     strategy: BalancingStrategy = Depends(get_balancing_strategy),
 ) -> BalancerService:
-    return BalancerService(strategy)
+    return _build_balancer_service(strategy)
+
+
+async def get_batch_balancer_service(
+    strategy: BalancingStrategy = Depends(get_batch_balancing_strategy),
+) -> BalancerService:
+    return _build_balancer_service(strategy)
+
+
+# Граф балансировки на воркер для быстрого пути GET / (без зависимостей на запрос)
+WORKER_REPOSITORY_CACHE_SIZE = 1024
+
+
+def get_worker_balancer_state() -> tuple:
+    """
+    То, что граф зависимостей читает на каждый запрос: снимок настроек
+    и выбор хоста CDN (после проверок доступности - свой). Граф на воркер
+    пересобирается, когда меняется что-то из этого
+    """
+    store = get_settings_snapshot_store()
+
+    return store.snapshot, get_strategy_resources().cdn_selector
+
+
+def build_worker_balancer_service() -> BalancerService:
+    """
+    Тот же сервис, что у GET /, но собранный один раз: репозитории БД
+    открывают сессию на вызов, а кеширующие репозитории и счётчики
+    серверов переиспользуются между запросами
+    """
+    parts = SnapshotStrategyParts(
+        resources=get_strategy_resources(),
+        cdn_persistent_repo=SessionPerCallRepository(SqlAlchemyCdnServerRepository),
+        origin_persistent_repo=SessionPerCallRepository(
+            SqlAlchemyOriginServerRepository
+        ),
+        repository_cache_size=WORKER_REPOSITORY_CACHE_SIZE,
+    )
+
+    return _build_balancer_service(
+        get_strategy_builder()(get_balancer_settings(), parts)
+    )
+
+
+# Переписывание манифестов HLS/DASH
+@lru_cache
+def get_manifest_settings() -> ManifestSettings:
+    return ManifestSettings()
+
+
+@lru_cache
+def get_manifest_cache() -> ManifestCache:
+    settings = get_manifest_settings()
+
+    return ManifestCache(
+        ttl=settings.MANIFEST_CACHE_TTL,
+        max_entries=settings.MANIFEST_CACHE_MAX_ENTRIES,
+        max_bytes=settings.MANIFEST_CACHE_MAX_BYTES,
+    )
@@ -0,0 +1,178 @@
+import json
+import logging
+import time
+from typing import Callable
+from urllib.parse import parse_qsl, quote
+
+from fastapi import status
+
+from src.application.rewrite import UrlRewriter
+from src.application.services import BalancerService
+from src.core.metrics import DECISIONS
+from src.domain.enums import ResourceTypeEnum
+
+from .api import DEPENDENCIES_SECONDS, DECISION_SECONDS, DECISION_ERRORS
+from .middleware import STARTED_AT_SCOPE_KEY, scope_client_address
+
+logger = logging.getLogger(__name__)
+
+DECISION_OUTCOMES = {
+    resource_type: DECISIONS.labels(resource_type.name)
+    for resource_type in ResourceTypeEnum
+}
+
+# Символы, которые RedirectResponse не экранирует в Location
+LOCATION_SAFE_CHARS = ":/%#?=@[]!$&'()*+,;"
+EMPTY_BODY = {"type": "http.response.body", "body": b""}
+
+
+class WorkerBalancerService:
+    """
+    Сервис балансировки на воркер: собирается функцией build один раз
+    и пересобирается, только когда меняется что-то из state() (сравнение
+    по ссылкам - обычно это одна проверка на запрос)
+    """
+
+    def __init__(
+        self, build: Callable[[], BalancerService], state: Callable[[], tuple]
+    ) -> None:
+        self._build = build
+        self._state = state
+        self._service: BalancerService | None = None
+        self._built_for: tuple = ()
+
+    def get(self) -> BalancerService:
+        state = self._state()
+
+        if self._service is None or any(
+            current is not built for current, built in zip(state, self._built_for)
+        ):
+            self._service = self._build()
+            self._built_for = state
+
+        return self._service
+
+
+class FastRedirectMiddleware:
+    """
+    Быстрый путь GET /: query разбирается напрямую, решение принимает
+    сервис на воркер, а 307 отправляется готовыми заголовками - без графа
+    зависимостей FastAPI и объектов ответа на каждый запрос. Коды и тела
+    ошибок (400/500) те же, что у balance_request. Запрос без video_url
+    и все остальные запросы обрабатывает приложение
+    """
+
+    def __init__(
+        self,
+        app,
+        rewriter: UrlRewriter,
+        service: WorkerBalancerService,
+        path: str = "/",
+        client_address_header: str = "",
+    ) -> None:
+        self.app = app
+        self.path = path
+        self._rewriter = rewriter
+        self._service = service
+        self._client_address_header = client_address_header.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"] != self.path
+            or scope["method"] != "GET"
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        video_url = _query_value(scope["query_string"], "video_url")
+
+        # Ошибку валидации отдаёт FastAPI
+        if video_url is None:
+            await self.app(scope, receive, send)
+            return
+
+        started_at = scope.get(STARTED_AT_SCOPE_KEY)
+
+        if started_at is not None:
+            DEPENDENCIES_SECONDS.observe(time.perf_counter() - started_at)
+
+        try:
+            video_request = self._rewriter.parse(video_url)
+
+        # Некорректный URL
+        except ValueError as e:
+            await _send_error(send, status.HTTP_400_BAD_REQUEST, str(e))
+            return
+
+        client_address = scope_client_address(scope, self._client_address_header)
+
+        try:
+            with DECISION_SECONDS.time():
+                target = await self._service.get().get_redirect_address(
+                    video_request, client_address
+                )
+
+            DECISION_OUTCOMES[target.type].inc()
+
+        # Некорректное значение
+        except ValueError as e:
+            DECISION_ERRORS.inc()
+            await _send_error(send, status.HTTP_400_BAD_REQUEST, str(e))
+            return
+
+        # Неизвестная ошибка
+        except Exception as e:
+            DECISION_ERRORS.inc()
+            logger.exception(e)
+
+            await _send_error(
+                send,
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+                "Internal server error: %s" % str(e),
+            )
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status.HTTP_307_TEMPORARY_REDIRECT,
+                "headers": [
+                    (b"content-length", b"0"),
+                    (
+                        b"location",
+                        quote(target.url, safe=LOCATION_SAFE_CHARS).encode("latin-1"),
+                    ),
+                ],
+            }
+        )
+        await send(EMPTY_BODY)
+
+
+def _query_value(query_string: bytes, name: str) -> str | None:
+    # Как в Starlette: при повторе параметра берётся последнее значение
+    value = None
+
+    for key, item in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True):
+        if key == name:
+            value = item
+
+    return value
+
+
+async def _send_error(send, status_code: int, detail: str) -> None:
+    body = json.dumps(
+        {"detail": detail}, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-length", str(len(body)).encode()),
+                (b"content-type", b"application/json"),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
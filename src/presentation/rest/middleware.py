@@ -0,0 +1,45 @@
+import time
+
+from src.core.metrics import STAGE_SECONDS
+
+REQUEST_SECONDS = STAGE_SECONDS.labels("request")
+
+# Ключ scope с моментом начала запроса (для замера разрешения зависимостей)
+STARTED_AT_SCOPE_KEY = "balancer.started_at"
+
+
+class RequestTimingMiddleware:
+    """
+    Замеряет полное время обработки GET / (чистый ASGI, без обёрток Starlette)
+    """
+
+    def __init__(self, app, path: str = "/") -> None:
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        scope[STARTED_AT_SCOPE_KEY] = started_at
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - started_at)
+
+
+def scope_client_address(scope, header: bytes = b"") -> str | None:
+    """
+    Адрес клиента: первый адрес из заголовка прокси header (имя в нижнем
+    регистре), а без заголовка - адрес соединения
+    """
+    if header:
+        for name, value in scope["headers"]:
+            if name == header:
+                return value.split(b",", 1)[0].strip().decode("latin-1") or None
+
+    client = scope.get("client")
+    return client[0] if client else None
@@ -0,0 +1,25 @@
+import pytest
+
+
+class FakeRedis:
+    """
+    Счётчики Redis в памяти: INCR/INCRBY/DELETE
+    """
+
+    def __init__(self) -> None:
+        self.values: dict[str, int] = {}
+
+    async def incr(self, key: str) -> int:
+        return await self.incrby(key, 1)
+
+    async def incrby(self, key: str, count: int) -> int:
+        self.values[key] = self.values.get(key, 0) + count
+        return self.values[key]
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+
+@pytest.fixture
+def redis() -> FakeRedis:
+    return FakeRedis()
@@ -0,0 +1,105 @@
+import math
+
+import pytest
+
+from src.application.strategies import AdaptiveRatioStrategy
+from src.core.rates import CounterRateEstimator
+from src.domain.schemas import OriginServer
+
+RATIO = 2
+WINDOW = 5.0
+UTILIZATION = 0.9
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _strategy(clock: Clock) -> AdaptiveRatioStrategy:
+    return AdaptiveRatioStrategy(
+        cdn_repo=None,
+        origin_repo=None,
+        counter_repo=None,
+        rates=CounterRateEstimator(window=WINDOW, clock=clock),
+        utilization=UTILIZATION,
+    )
+
+
+class Traffic:
+    """
+    Запросы к одному серверу с заданной частотой: время и счётчик растут вместе
+    """
+
+    def __init__(self, strategy: AdaptiveRatioStrategy, clock: Clock) -> None:
+        self._strategy = strategy
+        self._clock = clock
+        self._counter = 0
+
+    def run(self, rate: float, seconds: float, server: OriginServer) -> list[bool]:
+        decisions = []
+
+        for _ in range(int(rate * seconds)):
+            self._clock.now += 1 / rate
+            self._counter += 1
+            decisions.append(
+                self._strategy._to_origin(server.name, server, RATIO, self._counter)
+            )
+
+        return decisions
+
+
+def test_server_without_capacity_uses_plain_ratio():
+    clock = Clock()
+    decisions = Traffic(_strategy(clock), clock).run(
+        rate=1000, seconds=3, server=OriginServer(name="s1")
+    )
+
+    assert sum(decisions) == len(decisions) // RATIO
+
+
+def test_ratio_is_kept_below_capacity():
+    clock = Clock()
+    server = OriginServer(name="s1", capacity=1000)
+    decisions = Traffic(_strategy(clock), clock).run(
+        rate=100, seconds=10, server=server
+    )
+
+    # 50 запросов в секунду на origin - меньше допустимых 900
+    assert sum(decisions) == len(decisions) // RATIO
+
+
+def test_ratio_grows_with_rate_over_capacity():
+    clock = Clock()
+    server = OriginServer(name="s1", capacity=50)
+    traffic = Traffic(_strategy(clock), clock)
+
+    traffic.run(rate=1000, seconds=2, server=server)
+    decisions = traffic.run(rate=1000, seconds=5, server=server)
+
+    # N = ceil(1000 / (50 * 0.9)) = 23: на origin ~43.5 запроса в секунду
+    effective_ratio = math.ceil(1000 / (server.capacity * UTILIZATION))
+    assert effective_ratio == 23
+    assert sum(decisions) / 5 == pytest.approx(1000 / effective_ratio, abs=1)
+    assert sum(decisions) / 5 <= server.capacity * UTILIZATION
+
+
+def test_spike_is_seen_at_once_and_drop_after_window():
+    clock = Clock()
+    server = OriginServer(name="s1", capacity=50)
+    traffic = Traffic(_strategy(clock), clock)
+
+    traffic.run(rate=40, seconds=10, server=server)
+
+    # Всплеск: уже во вторую секунду origin получает не больше capacity
+    # (по обычному правилу - 500 запросов в секунду)
+    spike = traffic.run(rate=1000, seconds=2, server=server)
+    assert sum(spike[-1000:]) <= server.capacity
+
+    # Спад: пока всплеск в окне, коэффициент остаётся высоким
+    calm = traffic.run(rate=40, seconds=WINDOW + 2, server=server)
+    assert sum(calm[:40]) < 40 // RATIO
+    assert sum(calm[-40:]) == 40 // RATIO
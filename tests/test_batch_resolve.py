@@ -0,0 +1,117 @@
+import asyncio
+
+from src.application.config import BalancerSettings
+from src.application.rewrite import RewriteRule, UrlRewriter
+from src.application.services import BalancerService
+from src.application.strategies import NthRequestStrategy
+from src.domain.schemas import CdnServer, OriginServer
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.cache.repository import RedisCdnRequestCounterRepository
+from src.presentation.rest.api import resolve_batch
+
+KEYSPACE = RedisKeyspace()
+REWRITER = UrlRewriter(
+    rules=[RewriteRule.compile(r"^(s\d+)\.", "http://{cdn_host}/{server}{path}")],
+    cache_size=16,
+)
+ORIGINS = {
+    "s1": OriginServer(name="s1", redirecting_ratio=2),
+    "s2": OriginServer(name="s2", redirecting_ratio=3),
+}
+
+# Запросы разных серверов вперемешку и некорректный URL в середине
+VIDEO_URLS = [
+    "http://s1.origin.com/1.ts",
+    "http://s2.origin.com/1.ts",
+    "http://s1.origin.com/2.ts",
+    "http://origin.com/bad.ts",
+    "http://s2.origin.com/2.ts",
+    "http://s3.origin.com/1.ts",
+    "http://s2.origin.com/3.ts",
+    "http://s1.origin.com/3.ts",
+    "http://s1.origin.com/4.ts",
+]
+
+
+class CdnRepo:
+    async def read(self, **filters) -> CdnServer:
+        return CdnServer(host_name="cdn", default_redirecting_ratio=4)
+
+
+class OriginRepo:
+    async def read(self, name: str) -> OriginServer | None:
+        return ORIGINS.get(name)
+
+
+def _service(redis) -> BalancerService:
+    return BalancerService(
+        NthRequestStrategy(
+            cdn_repo=CdnRepo(),
+            origin_repo=OriginRepo(),
+            counter_repo=None,
+            counter_repo_factory=lambda server_name: RedisCdnRequestCounterRepository(
+                server_name=server_name, client=redis
+            ),
+        )
+    )
+
+
+def test_batch_is_resolved_in_request_order(redis):
+    results = asyncio.run(
+        resolve_batch(
+            video_urls=VIDEO_URLS,
+            rewriter=REWRITER,
+            balancer_service=_service(redis),
+            settings=BalancerSettings(),
+            client_address=None,
+        )
+    )
+
+    assert [result.video_url for result in results] == VIDEO_URLS
+    assert [(result.type, result.url) for result in results] == [
+        ("CDN", "http://cdn/s1/1.ts"),
+        ("CDN", "http://cdn/s2/1.ts"),
+        # Каждый второй запрос s1 и каждый третий s2 - на origin
+        ("ORIGIN", "http://s1.origin.com/2.ts"),
+        (None, None),
+        ("CDN", "http://cdn/s2/2.ts"),
+        # У неизвестного сервера - коэффициент CDN
+        ("CDN", "http://cdn/s3/1.ts"),
+        ("ORIGIN", "http://s2.origin.com/3.ts"),
+        ("CDN", "http://cdn/s1/3.ts"),
+        ("ORIGIN", "http://s1.origin.com/4.ts"),
+    ]
+    assert results[3].error is not None
+    assert redis.values == {
+        KEYSPACE.counter("s1"): 4,
+        KEYSPACE.counter("s2"): 3,
+        KEYSPACE.counter("s3"): 1,
+    }
+
+
+def test_batch_matches_one_by_one_decisions(redis):
+    async def one_by_one() -> list[tuple[str, str]]:
+        service = _service(redis)
+        targets = [
+            await service.get_redirect_address(REWRITER.parse(video_url))
+            for video_url in VIDEO_URLS
+            if video_url != "http://origin.com/bad.ts"
+        ]
+        await redis.delete(*list(redis.values))
+
+        return [(target.type.name, target.url) for target in targets]
+
+    expected = asyncio.run(one_by_one())
+    results = asyncio.run(
+        resolve_batch(
+            video_urls=VIDEO_URLS,
+            rewriter=REWRITER,
+            balancer_service=_service(redis),
+            settings=BalancerSettings(),
+            client_address=None,
+        )
+    )
+
+    assert [(result.type, result.url) for result in results if not result.error] == (
+        expected
+    )
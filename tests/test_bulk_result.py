@@ -0,0 +1,27 @@
+from src.domain.enums import BulkRowStatusEnum
+from src.domain.schemas import BulkResult, BulkRowResult
+
+
+def test_each_row_status_has_its_own_counter():
+    result = BulkResult()
+    statuses = [
+        BulkRowStatusEnum.CREATED,
+        BulkRowStatusEnum.EXISTS,
+        BulkRowStatusEnum.EXISTS,
+        BulkRowStatusEnum.UPDATED,
+        BulkRowStatusEnum.UNCHANGED,
+        BulkRowStatusEnum.INVALID,
+    ]
+
+    for index, status in enumerate(statuses):
+        result.add(BulkRowResult(index=index, status=status))
+
+    # Пропущенные существующие записи - не ошибка
+    assert (
+        result.created,
+        result.updated,
+        result.unchanged,
+        result.exists,
+        result.failed,
+    ) == (1, 1, 1, 2, 1)
+    assert [row.status for row in result.rows] == statuses
@@ -0,0 +1,79 @@
+from dataclasses import asdict, dataclass
+
+import pytest
+
+from src.domain.schemas import CdnServer, OriginServer
+from src.infrastructure.cache.codecs import (
+    CACHE_SCHEMA_VERSION,
+    MISSING_FIELD,
+    REFRESH_AT_FIELD,
+    build_codec,
+    schema_tag,
+)
+from src.infrastructure.cache.enums import CacheCodecEnum
+from src.infrastructure.cache.keys import RedisKeyspace
+
+ENTITIES = [
+    CdnServer(host_name="cdn.example.com", default_redirecting_ratio=10),
+    OriginServer(name="s1"),
+    OriginServer(name="s2", redirecting_ratio=3, capacity=40_000),
+]
+
+
+@pytest.mark.parametrize("codec_kind", list(CacheCodecEnum))
+@pytest.mark.parametrize("entity", ENTITIES)
+def test_entity_round_trip(codec_kind, entity):
+    codec = build_codec(codec_kind, type(entity))
+    record = {**asdict(entity), REFRESH_AT_FIELD: 1_700_000_000.25}
+
+    decoded = codec.decode(codec.encode(record))
+
+    assert decoded.pop(REFRESH_AT_FIELD) == 1_700_000_000.25
+    assert type(entity)(**decoded) == entity
+
+
+@pytest.mark.parametrize("codec_kind", list(CacheCodecEnum))
+def test_missing_marker_round_trip(codec_kind):
+    codec = build_codec(codec_kind, OriginServer)
+
+    assert codec.decode(codec.encode({MISSING_FIELD: True})) == {MISSING_FIELD: True}
+
+
+@dataclass(slots=True)
+class OriginServerWithRegion:
+    # Та же сущность после добавления поля
+    name: str
+    redirecting_ratio: int | None = None
+    capacity: int | None = None
+    region: str | None = None
+
+
+def test_schema_tag_changes_with_fields_and_codec():
+    tag = schema_tag(OriginServer, CacheCodecEnum.JSON)
+
+    assert tag.startswith("v%d.json." % CACHE_SCHEMA_VERSION)
+    assert tag == schema_tag(OriginServer, CacheCodecEnum.JSON)
+    assert tag != schema_tag(OriginServerWithRegion, CacheCodecEnum.JSON)
+    assert tag != schema_tag(OriginServer, CacheCodecEnum.TUPLE_JSON)
+
+
+@pytest.mark.parametrize("cluster", [False, True])
+def test_settings_keys_change_with_schema(cluster):
+    before = RedisKeyspace(
+        cluster=cluster,
+        cdn_schema=schema_tag(CdnServer, CacheCodecEnum.JSON),
+        origin_schema=schema_tag(OriginServer, CacheCodecEnum.JSON),
+    )
+    after = RedisKeyspace(
+        cluster=cluster,
+        cdn_schema=schema_tag(CdnServer, CacheCodecEnum.REDIS_HASH),
+        origin_schema=schema_tag(OriginServerWithRegion, CacheCodecEnum.JSON),
+    )
+
+    # Записи старого формата не читаются после деплоя, а истекают сами
+    assert before.cdn_settings() != after.cdn_settings()
+    assert before.origin_settings("s1") != after.origin_settings("s1")
+    assert before.origin_settings("s1").endswith("server: s1")
+
+    # Счётчики от схемы настроек не зависят
+    assert before.counter("s1") == after.counter("s1")
@@ -0,0 +1,76 @@
+import asyncio
+import random
+
+import pytest
+
+from src.infrastructure.cache.leasing import CounterBlockLeaser
+from src.infrastructure.cache.repository import BlockLeasedCdnRequestCounterRepository
+
+WORKERS = 4
+RATIO = 20
+REQUESTS = 20_000
+WINDOW = 1000
+
+
+def _leaser(redis, block_size: int) -> CounterBlockLeaser:
+    return CounterBlockLeaser(
+        client=redis,
+        block_size=block_size,
+        min_block_size=block_size,
+        max_block_size=block_size,
+        lease_interval=1.0,
+        adaptive=False,
+    )
+
+
+def _counter(leaser: CounterBlockLeaser) -> BlockLeasedCdnRequestCounterRepository:
+    return BlockLeasedCdnRequestCounterRepository(server_name="s1", leaser=leaser)
+
+
+async def _decisions(counters, requests: int, rng: random.Random) -> list[bool]:
+    # Запросы случайно раскиданы по воркерам, True - запрос ушёл на origin
+    return [not await rng.choice(counters).increment() % RATIO for _ in range(requests)]
+
+
+@pytest.mark.parametrize("block_size", [1, 10, 100, 1000])
+def test_origin_share_stays_within_bound(redis, block_size):
+    """
+    Каждый воркер держит не больше одного начатого блока, поэтому среди
+    первых N запросов не выданы только остатки этих блоков. Число решений
+    на origin отличается от N / RATIO не больше чем на WORKERS + 1 при любом
+    размере блока (в окне - не больше чем на удвоенную величину)
+    """
+    counters = [_counter(_leaser(redis, block_size)) for _ in range(WORKERS)]
+    decisions = asyncio.run(_decisions(counters, REQUESTS, random.Random(42)))
+
+    bound = WORKERS + 1
+    origins = 0
+
+    for requests, decision in enumerate(decisions, start=1):
+        origins += decision
+        assert abs(origins - requests / RATIO) <= bound
+
+    for start in range(0, REQUESTS - WINDOW + 1, WINDOW // 10):
+        in_window = sum(decisions[start : start + WINDOW])
+        assert abs(in_window - WINDOW / RATIO) <= 2 * bound
+
+
+def test_abandoned_lease_loses_the_rest_of_its_block(redis):
+    async def run() -> tuple[list[int], list[int]]:
+        # Воркер взял блок, выдал 10 значений и перезапустился
+        abandoned = _counter(_leaser(redis, 100))
+        issued = [await abandoned.increment() for _ in range(10)]
+
+        restarted = _counter(_leaser(redis, 100))
+        return issued, [await restarted.increment() for _ in range(190)]
+
+    issued, reissued = asyncio.run(run())
+
+    # Остаток блока 11..100 не выдаётся никому, значения не повторяются
+    assert issued == list(range(1, 11))
+    assert reissued == list(range(101, 291))
+
+    # В остатке было 5 решений на origin, из 200 запросов на origin ушло 9
+    # вместо 10: смещение - не больше одного блока на перезапуск
+    values = issued + reissued
+    assert sum(not value % RATIO for value in values) == 200 // RATIO - 1
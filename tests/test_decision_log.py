@@ -0,0 +1,205 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from src.application.decision_log import DecisionLog
+from src.domain.enums import ResourceTypeEnum
+from src.domain.schemas import (
+    DecisionLogRecord,
+    DecisionRollup,
+    TargetResource,
+    VideoRequest,
+)
+from src.infrastructure.decision_log.files import RotatingFileDecisionLogRepository
+
+# Окно сводки - со следующей минуты: файлы журнала начаты раньше решений
+START = datetime.now(timezone.utc).replace(second=0, microsecond=0) + timedelta(
+    minutes=1
+)
+ORIGIN = TargetResource(type=ResourceTypeEnum.ORIGIN, url="http://s1/a")
+CDN = TargetResource(type=ResourceTypeEnum.CDN, url="http://cdn/s1/a")
+
+
+def _request(server_name: str) -> VideoRequest:
+    return VideoRequest(
+        url="http://%s/a" % server_name,
+        host=server_name,
+        server_name=server_name,
+        path="/a",
+        cdn_url_prefix="http://",
+        cdn_url_suffix="/a",
+    )
+
+
+class MemoryRepository:
+    """
+    Журнал в памяти: пачки по порядку, первые failures записей падают
+    """
+
+    def __init__(self, failures: int = 0) -> None:
+        self.batches: list[list[DecisionLogRecord]] = []
+        self._failures = failures
+
+    async def write_many(self, records) -> None:
+        if self._failures:
+            self._failures -= 1
+            raise OSError("disk full")
+
+        self.batches.append(list(records))
+
+
+def _log(repository, max_pending: int = 100, batch_size: int = 3) -> DecisionLog:
+    return DecisionLog(
+        repository=repository,
+        max_pending=max_pending,
+        batch_size=batch_size,
+        flush_interval=60,
+    )
+
+
+def test_flush_writes_pending_decisions_in_batches():
+    repository = MemoryRepository()
+    log = _log(repository)
+    log.record_many(
+        [_request("s%d" % index) for index in range(7)], [ORIGIN, CDN] * 3 + [CDN]
+    )
+
+    asyncio.run(log.flush())
+
+    assert [len(batch) for batch in repository.batches] == [3, 3, 1]
+    assert [
+        (record.server_name, record.type)
+        for batch in repository.batches
+        for record in batch
+    ] == [
+        ("s%d" % index, target.type)
+        for index, target in enumerate([ORIGIN, CDN] * 3 + [CDN])
+    ]
+
+    # Очередь пуста - повторный сброс ничего не пишет
+    asyncio.run(log.flush())
+    assert len(repository.batches) == 3
+
+
+def test_full_queue_drops_new_decisions():
+    repository = MemoryRepository()
+    log = _log(repository, max_pending=2, batch_size=10)
+
+    for server_name in ("s1", "s2", "s3"):
+        log.record(_request(server_name), CDN)
+
+    asyncio.run(log.flush())
+
+    assert [record.server_name for record in repository.batches[0]] == ["s1", "s2"]
+
+
+def test_failed_batch_is_not_retried():
+    repository = MemoryRepository(failures=1)
+    log = _log(repository)
+    log.record_many([_request("s%d" % index) for index in range(4)], [CDN] * 4)
+
+    asyncio.run(log.flush())
+    asyncio.run(log.flush())
+
+    assert [
+        [record.server_name for record in batch] for batch in repository.batches
+    ] == [["s3"]]
+
+
+def test_full_batch_wakes_background_flush():
+    async def run() -> list[list[DecisionLogRecord]]:
+        repository = MemoryRepository()
+        log = _log(repository)
+        task = asyncio.create_task(log.run())
+
+        log.record_many([_request("s1")] * 3, [CDN] * 3)
+
+        for _ in range(100):
+            if repository.batches:
+                break
+            await asyncio.sleep(0.01)
+
+        task.cancel()
+        return repository.batches
+
+    # Пачка набралась - запись не ждёт flush_interval
+    assert [len(batch) for batch in asyncio.run(run())] == [3]
+
+
+def _records(server_name: str, minute: int, origin: int, cdn: int) -> list:
+    created_at = START + timedelta(minutes=minute, seconds=30)
+
+    return [
+        DecisionLogRecord(created_at=created_at, server_name=server_name, type=type_)
+        for type_ in [ResourceTypeEnum.ORIGIN] * origin + [ResourceTypeEnum.CDN] * cdn
+    ]
+
+
+def test_rollup_counts_decisions_per_server_and_minute(tmp_path):
+    repository = RotatingFileDecisionLogRepository(
+        directory=str(tmp_path), max_bytes=1 << 20, max_files=10
+    )
+
+    async def run() -> tuple[list, list]:
+        await repository.write_many(_records("s1", 0, origin=1, cdn=4))
+        await repository.write_many(_records("s2", 0, origin=2, cdn=0))
+        await repository.write_many(_records("s1", 1, origin=0, cdn=3))
+        # Вне окна
+        await repository.write_many(_records("s1", 5, origin=9, cdn=9))
+
+        until = START + timedelta(minutes=2)
+        return (
+            await repository.rollup(START, until),
+            await repository.rollup(START, until, server_name="s2"),
+        )
+
+    every_server, one_server = asyncio.run(run())
+
+    assert every_server == [
+        DecisionRollup(minute=START, server_name="s1", origin=1, cdn=4),
+        DecisionRollup(minute=START, server_name="s2", origin=2, cdn=0),
+        DecisionRollup(
+            minute=START + timedelta(minutes=1), server_name="s1", origin=0, cdn=3
+        ),
+    ]
+    assert one_server == [
+        DecisionRollup(minute=START, server_name="s2", origin=2, cdn=0)
+    ]
+
+
+def test_rollup_skips_unfinished_lines(tmp_path):
+    repository = RotatingFileDecisionLogRepository(
+        directory=str(tmp_path), max_bytes=1 << 20, max_files=10
+    )
+    asyncio.run(repository.write_many(_records("s1", 0, origin=1, cdn=1)))
+
+    # Воркер ещё дописывает строку
+    (path,) = tmp_path.glob("decisions-*.csv")
+    with path.open("a") as file:
+        file.write("%d,s1" % (START.timestamp() * 1000))
+
+    rollup = asyncio.run(repository.rollup(START, START + timedelta(minutes=1)))
+
+    assert rollup == [DecisionRollup(minute=START, server_name="s1", origin=1, cdn=1)]
+
+
+def test_files_rotate_and_old_files_are_removed(tmp_path):
+    repository = RotatingFileDecisionLogRepository(
+        directory=str(tmp_path), max_bytes=1, max_files=2
+    )
+
+    async def run() -> list:
+        for minute in range(4):
+            await repository.write_many(_records("s1", minute, origin=0, cdn=1))
+            # Имя файла - время создания в миллисекундах
+            await asyncio.sleep(0.002)
+
+        return await repository.rollup(START, START + timedelta(minutes=4))
+
+    rollup = asyncio.run(run())
+
+    # Каждая пачка - в новый файл, остаются два последних
+    assert len(list(tmp_path.glob("decisions-*.csv"))) == 2
+    assert [row.minute for row in rollup] == [
+        START + timedelta(minutes=2),
+        START + timedelta(minutes=3),
+    ]
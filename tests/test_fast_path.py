@@ -0,0 +1,129 @@
+import asyncio
+from urllib.parse import urlencode
+
+import pytest
+from fastapi import FastAPI
+
+from src.domain.enums import ResourceTypeEnum
+from src.domain.schemas import TargetResource, VideoRequest
+from src.presentation.rest.api import root_router
+from src.presentation.rest.dependencies import get_balancer_service, get_url_rewriter
+from src.presentation.rest.fast_path import (
+    FastRedirectMiddleware,
+    WorkerBalancerService,
+)
+
+COMPARED_HEADERS = ("content-length", "content-type", "location")
+
+
+class StubBalancerService:
+    """
+    Решение по пути видео: /origin/ - на origin, /error/ и /crash/ - ошибки
+    """
+
+    async def get_redirect_address(
+        self, request: VideoRequest, client_address: str | None = None
+    ) -> TargetResource:
+        if request.path.startswith("/error/"):
+            raise ValueError("Отсутствует установленный CDN")
+
+        if request.path.startswith("/crash/"):
+            raise RuntimeError("boom")
+
+        if request.path.startswith("/origin/"):
+            return TargetResource(type=ResourceTypeEnum.ORIGIN, url=request.url)
+
+        return TargetResource(
+            type=ResourceTypeEnum.CDN, url=request.cdn_url("cdn.example.com")
+        )
+
+
+def _applications() -> tuple[FastAPI, FastRedirectMiddleware, list]:
+    app = FastAPI()
+    app.include_router(root_router)
+    app.dependency_overrides[get_balancer_service] = StubBalancerService
+
+    # Запросы, которые быстрый путь передал приложению
+    passed: list = []
+
+    async def passthrough(scope, receive, send) -> None:
+        passed.append(scope["query_string"])
+        await app(scope, receive, send)
+
+    fast_path = FastRedirectMiddleware(
+        passthrough,
+        rewriter=get_url_rewriter(),
+        service=WorkerBalancerService(build=StubBalancerService, state=lambda: ()),
+    )
+
+    return app, fast_path, passed
+
+
+async def _request(app, query_string: bytes) -> tuple[int, dict[str, str], bytes]:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "raw_path": b"/",
+        "query_string": query_string,
+        "root_path": "",
+        "headers": [(b"host", b"balancer")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("balancer", 80),
+    }
+    response: dict = {"body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {
+                key.decode(): value.decode()
+                for key, value in message["headers"]
+                if key.decode() in COMPARED_HEADERS
+            }
+        else:
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+
+    return response["status"], response["headers"], response["body"]
+
+
+@pytest.mark.parametrize(
+    "query_string",
+    [
+        urlencode({"video_url": "http://s1.origin.com/video/1.mp4"}).encode(),
+        urlencode({"video_url": "http://s1.origin.com/origin/1.mp4"}).encode(),
+        # Символы, которые экранируются в Location
+        urlencode({"video_url": "http://s1.origin.com/видео/a b|c.mp4"}).encode(),
+        urlencode({"video_url": "http://s1.origin.com/v.mp4?t=1&x=%7C"}).encode(),
+        # Повтор параметра - берётся последнее значение
+        b"video_url=http://s1.origin.com/a.mp4&video_url=http://s2.origin.com/b.mp4",
+        # Ошибки: некорректный URL, ValueError и любое другое исключение
+        urlencode({"video_url": "http://origin.com/video/1.mp4"}).encode(),
+        urlencode({"video_url": "not a url"}).encode(),
+        urlencode({"video_url": "http://s1.origin.com/error/1.mp4"}).encode(),
+        urlencode({"video_url": "http://s1.origin.com/crash/1.mp4"}).encode(),
+        # Без video_url ответ (422) отдаёт приложение
+        b"",
+        b"other=1",
+    ],
+)
+def test_fast_path_matches_route(query_string):
+    app, fast_path, passed = _applications()
+
+    async def run():
+        return await _request(app, query_string), await _request(
+            fast_path, query_string
+        )
+
+    expected, actual = asyncio.run(run())
+
+    assert actual == expected
+    assert bool(passed) == (b"video_url=" not in query_string)
@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.core.circuit_breaker import CircuitStateEnum
+from src.domain.schemas import OriginServer
+from src.infrastructure.cache.snapshot import SettingsSnapshot
+from src.infrastructure.health.checker import HealthChecker
+from src.infrastructure.health.config import HealthCheckSettings
+from src.infrastructure.health.enums import HealthTargetKindEnum
+
+RECOVERY_TIMEOUT = 0.2
+
+
+class StubOrigin:
+    """
+    HTTP сервер origin: на любой запрос отвечает кодом status
+    """
+
+    def __init__(self) -> None:
+        self.status = 200
+        self.requests = 0
+        self.port: int | None = None
+        self._server: asyncio.Server | None = None
+
+    async def __aenter__(self) -> "StubOrigin":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        while await reader.readline() not in (b"\r\n", b"\n", b""):
+            pass
+
+        self.requests += 1
+        writer.write(b"HTTP/1.0 %d Stub\r\n\r\n" % self.status)
+        await writer.drain()
+        writer.close()
+
+
+def _checker(template: str) -> HealthChecker:
+    snapshot = SettingsSnapshot(
+        version=1, cdn=None, origins={"s1": OriginServer(name="s1")}
+    )
+
+    return HealthChecker(
+        store=SimpleNamespace(snapshot=snapshot),
+        settings=HealthCheckSettings(
+            HEALTH_CHECK_ENABLED=True,
+            HEALTH_CHECK_TIMEOUT=1.0,
+            HEALTH_CHECK_ORIGIN_HOST_TEMPLATE=template,
+            HEALTH_CHECK_FAILURE_THRESHOLD=2,
+            HEALTH_CHECK_RECOVERY_TIMEOUT=RECOVERY_TIMEOUT,
+        ),
+    )
+
+
+def _origin_circuit(checker: HealthChecker) -> CircuitStateEnum:
+    (stats,) = [
+        stats
+        for stats in checker.stats()
+        if stats["kind"] is HealthTargetKindEnum.ORIGIN
+    ]
+    return stats["circuit"]
+
+
+def test_origin_goes_down_and_recovers_through_half_open():
+    async def run() -> None:
+        async with StubOrigin() as origin:
+            checker = _checker("127.0.0.1:%d" % origin.port)
+
+            await checker.check_once()
+            assert checker.is_origin_available("s1")
+            assert _origin_circuit(checker) is CircuitStateEnum.CLOSED
+
+            # Две неудачи подряд - origin исключается
+            origin.status = 503
+            await checker.check_once()
+            assert checker.is_origin_available("s1")
+
+            await checker.check_once()
+            assert not checker.is_origin_available("s1")
+            assert _origin_circuit(checker) is CircuitStateEnum.OPEN
+
+            # Через recovery_timeout - пробная проверка
+            await asyncio.sleep(RECOVERY_TIMEOUT)
+            assert _origin_circuit(checker) is CircuitStateEnum.HALF_OPEN
+
+            origin.status = 200
+            await checker.check_once()
+            assert checker.is_origin_available("s1")
+            assert _origin_circuit(checker) is CircuitStateEnum.CLOSED
+
+            assert origin.requests == 4
+
+    asyncio.run(run())
+
+
+def test_origins_are_not_checked_without_host_template():
+    checker = _checker("")
+
+    asyncio.run(checker.check_once())
+
+    # Имя сервера - не адрес: без шаблона origin не проверяется и доступен
+    assert checker.stats() == []
+    assert checker.is_origin_available("s1")
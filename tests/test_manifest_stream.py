@@ -0,0 +1,198 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.application.config import ManifestSettings
+from src.application.manifests import ManifestCache
+from src.application.rewrite import RewriteRule, UrlRewriter
+from src.domain.enums import ResourceTypeEnum
+from src.domain.schemas import TargetResource
+from src.presentation.rest.api import rewrite_manifest
+
+SEGMENTS = 20
+MANIFEST = b"#EXTM3U\n#EXT-X-TARGETDURATION:4\n" + b"".join(
+    b"#EXTINF:4.0,\nsegment%d.ts\n" % index for index in range(SEGMENTS)
+)
+
+
+class StubUpstream:
+    """
+    HTTP сервер origin: отдаёт манифест и закрывает соединение
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.port: int | None = None
+        self._server: asyncio.Server | None = None
+
+    async def __aenter__(self) -> "StubUpstream":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        while await reader.readline() not in (b"\r\n", b"\n", b""):
+            pass
+
+        self.requests += 1
+        writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: audio/mpegurl\r\n\r\n")
+        writer.write(MANIFEST)
+        await writer.drain()
+        writer.close()
+
+
+class StubBalancerService:
+    async def get_redirect_addresses(self, requests, client_address=None):
+        return [
+            TargetResource(type=ResourceTypeEnum.CDN, url=request.cdn_url("cdn"))
+            for request in requests
+        ]
+
+
+class StubSession:
+    async def aclose(self) -> None:
+        pass
+
+
+LOCAL_REWRITER = UrlRewriter(
+    rules=[RewriteRule.compile(r"^(127\.0\.0\.1)$", "http://{cdn_host}{path}")],
+    cache_size=16,
+)
+ORIGIN_REWRITER = UrlRewriter(
+    rules=[RewriteRule.compile(r"^(s\d+)\.", "http://{cdn_host}/{server}{path}")],
+    cache_size=16,
+)
+
+
+async def _get_manifest(
+    url: str,
+    cache: ManifestCache,
+    origin_host_template: str,
+    rewriter: UrlRewriter = LOCAL_REWRITER,
+    known_origins: set[str] | None = None,
+) -> bytes:
+    response = await rewrite_manifest(
+        video_request=rewriter.parse(url),
+        rewriter=rewriter,
+        balancer_service=StubBalancerService(),
+        settings=ManifestSettings(
+            MANIFEST_ORIGIN_HOST_TEMPLATE=origin_host_template,
+            # Пачки по 4 строки: манифест приходит несколькими кусками
+            MANIFEST_REWRITE_BATCH_LINES=4,
+        ),
+        cache=cache,
+        session=StubSession(),
+        client_address=None,
+        network_router=None,
+        store=SimpleNamespace(known_origins=known_origins),
+    )
+
+    # Из кеша манифест отдаётся целиком, иначе - потоком
+    if not isinstance(response, StreamingResponse):
+        return response.body
+
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+def _expected_manifest() -> bytes:
+    return MANIFEST.replace(b"segment", b"http://cdn/segment")
+
+
+def test_streamed_manifest_is_cached_when_it_fits():
+    async def run() -> None:
+        async with StubUpstream() as upstream:
+            url = "http://127.0.0.1:%d/live.m3u8" % upstream.port
+            cache = ManifestCache(ttl=60, max_entries=10, max_bytes=len(MANIFEST) * 2)
+
+            assert (
+                await _get_manifest(url, cache, "127.0.0.1:%d" % upstream.port)
+                == _expected_manifest()
+            )
+            assert (
+                await _get_manifest(url, cache, "127.0.0.1:%d" % upstream.port)
+                == _expected_manifest()
+            )
+            assert upstream.requests == 1
+
+    asyncio.run(run())
+
+
+def test_streamed_manifest_over_cache_limit_is_not_cached():
+    async def run() -> None:
+        async with StubUpstream() as upstream:
+            url = "http://127.0.0.1:%d/live.m3u8" % upstream.port
+            # Предел пройден посреди потока: клиент получает манифест целиком,
+            # но копия тела не кешируется
+            cache = ManifestCache(ttl=60, max_entries=10, max_bytes=len(MANIFEST))
+
+            assert (
+                await _get_manifest(url, cache, "127.0.0.1:%d" % upstream.port)
+                == _expected_manifest()
+            )
+            assert (
+                await _get_manifest(url, cache, "127.0.0.1:%d" % upstream.port)
+                == _expected_manifest()
+            )
+            assert upstream.requests == 2
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        # Чужой хост и порт, подходящие под правило переписывания
+        "http://s1.attacker.internal:6379/live.m3u8",
+        "http://s1.origin.test:6379/live.m3u8",
+        "http://user@s1.origin.test/live.m3u8",
+        "http://s1.attacker.internal/live.m3u8",
+    ],
+)
+def test_manifest_from_foreign_host_is_rejected(url):
+    cache = ManifestCache(ttl=60, max_entries=10, max_bytes=1024)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(
+            _get_manifest(url, cache, "{name}.origin.test", rewriter=ORIGIN_REWRITER)
+        )
+
+    assert error.value.status_code == 400
+
+
+def test_manifest_from_unknown_origin_is_rejected():
+    cache = ManifestCache(ttl=60, max_entries=10, max_bytes=1024)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(
+            _get_manifest(
+                "http://s2.origin.test/live.m3u8",
+                cache,
+                "{name}.origin.test",
+                rewriter=ORIGIN_REWRITER,
+                known_origins={"s1"},
+            )
+        )
+
+    assert error.value.status_code == 400
+
+
+def test_manifest_rewriting_is_disabled_without_origin_host_template():
+    cache = ManifestCache(ttl=60, max_entries=10, max_bytes=1024)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(
+            _get_manifest(
+                "http://s1.origin.test/live.m3u8", cache, "", rewriter=ORIGIN_REWRITER
+            )
+        )
+
+    assert error.value.status_code == 404
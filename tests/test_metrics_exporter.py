@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from src.core.metrics import Metric, MetricsRegistry
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.metrics.exporter import RedisMetricsExporter
+
+
+class MetricsRedis:
+    """
+    Хеш метрик в памяти: HINCRBYFLOAT/EXPIRE пайплайном и HGETALL
+    """
+
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict[str, float]] = {}
+        self.ttls: dict[str, int] = {}
+
+    def pipeline(self, transaction: bool) -> "MetricsRedis":
+        return self
+
+    async def __aenter__(self) -> "MetricsRedis":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    def hincrbyfloat(self, key: str, field: str, amount: float) -> None:
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = fields.get(field, 0) + amount
+
+    def expire(self, key: str, seconds: int) -> None:
+        self.ttls[key] = seconds
+
+    async def execute(self) -> None:
+        pass
+
+    async def hgetall(self, key: str) -> dict[str, float]:
+        return dict(self.hashes.get(key, {}))
+
+
+def _exporter(redis: MetricsRedis, ttl: int) -> RedisMetricsExporter:
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Запросы", ("result",)).labels("ok").inc()
+
+    return RedisMetricsExporter(
+        registry=registry,
+        client=redis,
+        interval=1.0,
+        keyspace=RedisKeyspace(),
+        ttl=ttl,
+    )
+
+
+def test_flush_extends_metrics_hash_ttl():
+    redis = MetricsRedis()
+    asyncio.run(_exporter(redis, ttl=60).flush())
+
+    assert redis.ttls == {RedisKeyspace().metrics(): 60}
+    assert sum(redis.hashes[RedisKeyspace().metrics()].values()) == 1
+
+
+def test_metrics_hash_without_ttl():
+    redis = MetricsRedis()
+    asyncio.run(_exporter(redis, ttl=0).flush())
+
+    assert redis.ttls == {}
+
+
+def test_metric_family_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("requests_total", "Запросы")
@@ -0,0 +1,137 @@
+import asyncio
+
+from src.core.singleflight import SingleFlight
+from src.domain.schemas import OriginServer
+from src.infrastructure.cache.codecs import MISSING_FIELD, JsonCodec
+from src.infrastructure.cache.config import SettingsCacheSettings
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.cache.read_through import ReadThroughCache
+from src.infrastructure.cache.repository import CachedOriginServerRepository
+
+KEYSPACE = RedisKeyspace()
+
+
+class StringRedis:
+    """
+    Строковые ключи Redis в памяти: GET/SET/DELETE, срок жизни запоминается
+    """
+
+    def __init__(self) -> None:
+        self.values: dict[str, str] = {}
+        self.ttls: dict[str, int | None] = {}
+        self.gets = 0
+
+    async def get(self, key: str) -> str | None:
+        self.gets += 1
+        return self.values.get(key)
+
+    async def set(self, key: str, value: str, px: int | None = None) -> bool:
+        self.values[key] = value
+        self.ttls[key] = px
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+
+class OriginTable:
+    """
+    Таблица origin серверов: считает чтения
+    """
+
+    def __init__(self) -> None:
+        self.rows: dict[str, OriginServer] = {}
+        self.reads = 0
+
+    async def create(self, data: OriginServer) -> int:
+        self.rows[data.name] = data
+        return len(self.rows)
+
+    async def read(self, name: str) -> OriginServer | None:
+        self.reads += 1
+        return self.rows.get(name)
+
+
+def _repo(
+    redis: StringRedis,
+    table: OriginTable,
+    server_name: str,
+    negative_ttl: float = 30.0,
+    known_origins: set[str] | None = None,
+) -> CachedOriginServerRepository:
+    cache = ReadThroughCache(
+        client=redis,
+        single_flight=SingleFlight(),
+        settings=SettingsCacheSettings(SETTINGS_CACHE_NEGATIVE_TTL=negative_ttl),
+        keyspace=KEYSPACE,
+    )
+
+    return CachedOriginServerRepository(
+        persistent_repository=table,
+        server_name=server_name,
+        cache=cache,
+        keyspace=KEYSPACE,
+        known_origins=known_origins,
+        codec=JsonCodec(),
+    )
+
+
+def test_unknown_origin_is_answered_from_memory():
+    redis, table = StringRedis(), OriginTable()
+    repo = _repo(redis, table, "s2", known_origins={"s1"})
+
+    assert asyncio.run(repo.read(name="s2")) is None
+    assert (redis.gets, table.reads) == (0, 0)
+
+
+def test_known_origin_is_read_through_cache():
+    redis, table = StringRedis(), OriginTable()
+    table.rows["s1"] = OriginServer(name="s1", redirecting_ratio=5)
+    repo = _repo(redis, table, "s1", known_origins={"s1"})
+
+    async def run() -> list[OriginServer | None]:
+        return [await repo.read(name="s1") for _ in range(3)]
+
+    assert asyncio.run(run()) == [table.rows["s1"]] * 3
+    assert table.reads == 1
+
+
+def test_missing_origin_is_cached_with_negative_ttl():
+    redis, table = StringRedis(), OriginTable()
+    repo = _repo(redis, table, "s1", negative_ttl=30.0)
+    key = KEYSPACE.origin_settings("s1")
+
+    async def run() -> list[OriginServer | None]:
+        return [await repo.read(name="s1") for _ in range(3)]
+
+    # В БД сервера нет: отметка об этом отвечает на повторные запросы
+    assert asyncio.run(run()) == [None] * 3
+    assert table.reads == 1
+    assert MISSING_FIELD in redis.values[key]
+    assert redis.ttls[key] == 30_000
+
+
+def test_missing_origin_is_not_cached_without_negative_ttl():
+    redis, table = StringRedis(), OriginTable()
+    repo = _repo(redis, table, "s1", negative_ttl=0)
+
+    async def run() -> list[OriginServer | None]:
+        return [await repo.read(name="s1") for _ in range(3)]
+
+    assert asyncio.run(run()) == [None] * 3
+    assert table.reads == 3
+    assert redis.values == {}
+
+
+def test_created_origin_is_not_hidden_by_negative_entry():
+    redis, table = StringRedis(), OriginTable()
+    repo = _repo(redis, table, "s1")
+    origin = OriginServer(name="s1", redirecting_ratio=5)
+
+    async def run() -> tuple[OriginServer | None, OriginServer | None]:
+        missing = await repo.read(name="s1")
+        await repo.create(origin)
+        return missing, await repo.read(name="s1")
+
+    assert asyncio.run(run()) == (None, origin)
+    assert table.reads == 2
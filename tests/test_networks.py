@@ -0,0 +1,67 @@
+from src.application.networks import NetworkRouter
+from src.core.prefixes import PrefixTable
+from src.domain.enums import ResourceTypeEnum
+from src.domain.schemas import ClientNetwork, TargetResource, VideoRequest
+
+EU = ClientNetwork(region="eu", asn=64500)
+DC = ClientNetwork(region="dc1", asn=64501)
+US = ClientNetwork(region="us")
+
+TABLE = PrefixTable(
+    [
+        ("10.0.0.0/8", EU),
+        ("10.1.0.0/16", DC),
+        ("10.1.2.0/24", EU),
+        ("2001:db8::/32", US),
+    ]
+)
+
+REQUEST = VideoRequest(
+    url="http://s1.origin/video/1.ts",
+    host="s1.origin",
+    server_name="s1",
+    path="/video/1.ts",
+    cdn_url_prefix="http://",
+    cdn_url_suffix="/s1/video/1.ts",
+)
+CDN_TARGET = TargetResource(ResourceTypeEnum.CDN, REQUEST.cdn_url("default.cdn"))
+
+
+def _router() -> NetworkRouter:
+    return NetworkRouter(
+        table=lambda: TABLE,
+        region_cdn_hosts={"eu": "eu.cdn"},
+        origin_regions=["dc1"],
+    )
+
+
+def test_longest_prefix_wins():
+    assert TABLE.lookup("10.200.0.1") == EU
+    assert TABLE.lookup("10.1.0.1") == DC
+    assert TABLE.lookup("10.1.2.3") == EU
+    assert TABLE.lookup("10.1.3.0") == DC
+    assert TABLE.lookup("::ffff:10.1.0.1") == DC
+    assert TABLE.lookup("2001:db8::1") == US
+    assert TABLE.lookup("192.0.2.1") is None
+    assert TABLE.lookup("not an address") is None
+
+
+def test_route_by_network():
+    router = _router()
+
+    assert router.route(REQUEST, CDN_TARGET, EU).url == "http://eu.cdn/s1/video/1.ts"
+    assert router.route(REQUEST, CDN_TARGET, DC) == TargetResource(
+        ResourceTypeEnum.ORIGIN, REQUEST.url
+    )
+    assert router.route(REQUEST, CDN_TARGET, US) is CDN_TARGET
+
+
+def test_route_key_separates_networks_with_different_addresses():
+    router = _router()
+
+    assert router.route_key(router.network("10.200.0.1")) == "CDN:eu"
+    assert router.route_key(router.network("10.1.0.1")) == "ORIGIN"
+    # Регион без своего хоста и клиент вне таблицы получают одно и то же
+    assert router.route_key(router.network("2001:db8::1")) is None
+    assert router.route_key(router.network("192.0.2.1")) is None
+    assert router.route_key(router.network(None)) is None
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.deadline import RequestDeadline
+from src.core.singleflight import SingleFlight
+from src.infrastructure.cache.codecs import JsonCodec
+from src.infrastructure.cache.config import SettingsCacheSettings
+from src.infrastructure.cache.guard import RedisGuard
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.cache.read_through import ReadThroughCache
+
+
+class LockRedis:
+    """
+    Redis без значений в кеше: блокировку на ключ держит другой воркер
+    (locked) или её берёт этот
+    """
+
+    def __init__(self, locked: bool) -> None:
+        self.locked = locked
+        self.scripts = 0
+        self.gets = 0
+
+    def register_script(self, script: str):
+        self.scripts += 1
+
+        async def release(keys, args) -> int:
+            return 0
+
+        return release
+
+    async def get(self, key: str) -> None:
+        self.gets += 1
+
+    async def set(self, key: str, value, nx: bool = False, **kwargs) -> bool | None:
+        # Записанные значения не сохраняются
+        return None if nx and self.locked else True
+
+
+def _cache(redis: LockRedis, lock_wait: float) -> ReadThroughCache:
+    return ReadThroughCache(
+        client=redis,
+        single_flight=SingleFlight(),
+        settings=SettingsCacheSettings(
+            SETTINGS_CACHE_LOCK_ENABLED=True, SETTINGS_CACHE_LOCK_WAIT=lock_wait
+        ),
+        keyspace=RedisKeyspace(),
+        guard=RedisGuard(CircuitBreaker(failure_threshold=3, recovery_timeout=60)),
+    )
+
+
+def test_waiting_for_locked_value_stops_at_request_deadline():
+    redis = LockRedis(locked=True)
+    cache = _cache(redis, lock_wait=5.0)
+
+    async def load() -> dict:
+        await asyncio.sleep(0.01)
+        return {"name": "s1"}
+
+    async def run() -> None:
+        with RequestDeadline(0.2):
+            await cache.read("origin: s1", load, JsonCodec(), "origin")
+
+    started = time.monotonic()
+
+    # Ждать значение от другого воркера дольше бюджета запроса нельзя,
+    # читать из БД самим уже поздно
+    with pytest.raises(TimeoutError):
+        asyncio.run(run())
+
+    assert time.monotonic() - started < 1.0
+    assert redis.gets > 1
+
+
+def test_release_script_is_registered_once():
+    redis = LockRedis(locked=False)
+    cache = _cache(redis, lock_wait=0)
+
+    async def load() -> dict:
+        return {"name": "s1"}
+
+    async def run() -> list[dict | None]:
+        return [
+            await cache.read(key, load, JsonCodec(), "origin")
+            for key in ("origin: s1", "origin: s2", "origin: s3")
+        ]
+
+    assert asyncio.run(run()) == [{"name": "s1"}] * 3
+    assert redis.scripts == 1
@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import pytest
+from redis import asyncio as aioredis
+
+from src.core.circuit_breaker import CircuitBreaker, CircuitStateEnum
+from src.core.deadline import RequestDeadline
+from src.infrastructure.cache.guard import RedisCircuitOpenError, RedisGuard
+
+RECOVERY_TIMEOUT = 0.1
+
+
+class StubCall:
+    """
+    Вызов Redis: отвечает, падает с ошибкой соединения или "зависает"
+    """
+
+    def __init__(self) -> None:
+        self.error: Exception | None = None
+        self.delay = 0.0
+        self.calls = 0
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+
+        if self.error is not None:
+            raise self.error
+
+        return "PONG"
+
+
+def _guard() -> RedisGuard:
+    return RedisGuard(
+        CircuitBreaker(failure_threshold=2, recovery_timeout=RECOVERY_TIMEOUT)
+    )
+
+
+async def _failures(guard: RedisGuard, call: StubCall, count: int) -> None:
+    for _ in range(count):
+        with pytest.raises(aioredis.ConnectionError):
+            await guard.call(call)
+
+
+def test_circuit_opens_and_closes_through_half_open():
+    async def run() -> None:
+        guard, call = _guard(), StubCall()
+        call.error = aioredis.ConnectionError("refused")
+
+        await _failures(guard, call, 2)
+        assert guard.state is CircuitStateEnum.OPEN
+
+        # Разомкнутая цепь: Redis не вызывается
+        with pytest.raises(RedisCircuitOpenError):
+            await guard.call(call)
+        assert call.calls == 2
+
+        await asyncio.sleep(RECOVERY_TIMEOUT)
+        assert guard.state is CircuitStateEnum.HALF_OPEN
+
+        call.error = None
+        assert await guard.call(call) == "PONG"
+        assert guard.state is CircuitStateEnum.CLOSED
+        assert guard.stats()["failures"] == 0
+
+    asyncio.run(run())
+
+
+def test_failed_probe_opens_circuit_again():
+    async def run() -> None:
+        guard, call = _guard(), StubCall()
+        call.error = aioredis.ConnectionError("refused")
+
+        await _failures(guard, call, 2)
+        await asyncio.sleep(RECOVERY_TIMEOUT)
+        await _failures(guard, call, 1)
+
+        assert guard.state is CircuitStateEnum.OPEN
+        assert guard.stats()["degraded"]
+
+    asyncio.run(run())
+
+
+def test_half_open_circuit_lets_one_probe_through():
+    async def run() -> None:
+        guard, call = _guard(), StubCall()
+        call.error = aioredis.ConnectionError("refused")
+
+        await _failures(guard, call, 2)
+        await asyncio.sleep(RECOVERY_TIMEOUT)
+
+        # Пока идёт пробный вызов, остальные пропускаются
+        call.error, call.delay = None, 0.05
+        probe = asyncio.create_task(guard.call(call))
+        await asyncio.sleep(0)
+
+        with pytest.raises(RedisCircuitOpenError):
+            await guard.call(call)
+
+        assert await probe == "PONG"
+        assert call.calls == 3
+        assert guard.state is CircuitStateEnum.CLOSED
+
+    asyncio.run(run())
+
+
+def test_call_is_cut_at_request_deadline():
+    async def run() -> None:
+        guard, call = _guard(), StubCall()
+        call.delay = 5.0
+        started = time.monotonic()
+
+        with RequestDeadline(0.05):
+            with pytest.raises(aioredis.TimeoutError):
+                await guard.call(call)
+
+        assert time.monotonic() - started < 1.0
+
+        # Истёкший бюджет - неудача для цепи
+        assert guard.stats()["failures"] == 1
+
+    asyncio.run(run())
+
+
+def test_other_redis_errors_do_not_open_circuit():
+    async def run() -> None:
+        guard, call = _guard(), StubCall()
+        call.error = aioredis.ResponseError("WRONGTYPE")
+
+        for _ in range(3):
+            with pytest.raises(aioredis.ResponseError):
+                await guard.call(call)
+
+        assert guard.state is CircuitStateEnum.CLOSED
+
+    asyncio.run(run())
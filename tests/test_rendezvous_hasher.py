@@ -0,0 +1,61 @@
+from collections import Counter
+
+import pytest
+
+from src.core.hashing import RendezvousHasher, stable_hash
+
+KEYS = [stable_hash("s1/video/%d.mp4" % index) for index in range(20_000)]
+HOSTS = [("cdn-1", 1.0), ("cdn-2", 1.0), ("cdn-3", 2.0)]
+
+
+def _placement(hasher: RendezvousHasher[str], **kwargs) -> list[str]:
+    return [hasher.select(key, **kwargs) for key in KEYS]
+
+
+def test_stable_hash_does_not_depend_on_process():
+    # Значение зафиксировано: встроенный hash() строк между запусками меняется
+    assert stable_hash("s1/video/1.mp4") == 0x831D28691C171F49
+
+
+def test_placement_does_not_depend_on_host_order():
+    assert _placement(RendezvousHasher(HOSTS)) == _placement(
+        RendezvousHasher(list(reversed(HOSTS)))
+    )
+
+
+def test_share_of_keys_follows_weights():
+    counts = Counter(_placement(RendezvousHasher(HOSTS)))
+
+    assert counts["cdn-1"] / len(KEYS) == pytest.approx(0.25, abs=0.02)
+    assert counts["cdn-2"] / len(KEYS) == pytest.approx(0.25, abs=0.02)
+    assert counts["cdn-3"] / len(KEYS) == pytest.approx(0.5, abs=0.02)
+
+
+def test_only_keys_of_added_host_move():
+    before = _placement(RendezvousHasher(HOSTS))
+    after = _placement(RendezvousHasher(HOSTS + [("cdn-4", 1.0)]))
+
+    moved = [(old, new) for old, new in zip(before, after) if old != new]
+
+    # Переезжают только ключи нового хоста, примерно его доля (1 / 5)
+    assert {new for _, new in moved} == {"cdn-4"}
+    assert len(moved) / len(KEYS) == pytest.approx(0.2, abs=0.02)
+
+
+def test_only_keys_of_removed_host_move():
+    before = _placement(RendezvousHasher(HOSTS))
+    after = _placement(RendezvousHasher(HOSTS[1:]))
+
+    assert all(old == new for old, new in zip(before, after) if old != HOSTS[0][0])
+
+
+def test_unavailable_host_gives_its_keys_to_the_next_one():
+    hasher = RendezvousHasher(HOSTS)
+    before = _placement(hasher)
+    after = _placement(hasher, is_available=lambda host: host != "cdn-3")
+
+    assert "cdn-3" not in after
+    assert all(old == new for old, new in zip(before, after) if old != "cdn-3")
+
+    # Недоступны все - выбор без учёта доступности
+    assert _placement(hasher, is_available=lambda host: False) == before
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from src.application.rewrite import RewriteRule, UrlRewriter
+from src.presentation.rest.dependencies import get_video_request
+
+DEFAULT_RULE = RewriteRule.compile(
+    r"^(?P<server>s\d+)\.", "http://{cdn_host}/{server}{path}"
+)
+
+
+def _rewriter(*rules: RewriteRule) -> UrlRewriter:
+    return UrlRewriter(rules=rules or (DEFAULT_RULE,), cache_size=16)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "",
+        "/video/1.mp4",
+        "http://",
+        "http:///video/1.mp4",
+        "s1.origin.com/video/1.mp4",
+        # Хост не подходит ни под одно правило
+        "http://origin.com/video/1.mp4",
+        "http://cdn.s1.origin.com/video/1.mp4",
+        # Незакрытый IPv6 адрес
+        "http://[::1/video/1.mp4",
+    ],
+)
+def test_malformed_url_is_rejected(url):
+    with pytest.raises(ValueError):
+        _rewriter().parse(url)
+
+
+@pytest.mark.parametrize(
+    "url, server_name, cdn_url",
+    [
+        ("http://s1.origin.com/video/1.mp4", "s1", "http://cdn/s1/video/1.mp4"),
+        # Хост приводится к нижнему регистру, порт и userinfo отбрасываются
+        ("http://S12.Origin.com:8080/a.mp4", "s12", "http://cdn/s12/a.mp4"),
+        ("https://user:pw@s3.origin.com/a.mp4", "s3", "http://cdn/s3/a.mp4"),
+        # Запрос и фрагмент на CDN не переносятся, пустой путь допустим
+        ("http://s1.origin.com/a.mp4?token=1#t=10", "s1", "http://cdn/s1/a.mp4"),
+        ("http://s1.origin.com", "s1", "http://cdn/s1"),
+    ],
+)
+def test_url_is_rewritten_to_cdn(url, server_name, cdn_url):
+    video_request = _rewriter().parse(url)
+
+    assert video_request.url == url
+    assert video_request.server_name == server_name
+    assert video_request.cdn_url("cdn") == cdn_url
+
+
+def test_first_matching_rule_wins():
+    rewriter = _rewriter(
+        RewriteRule.compile(r"^(s\d+)\.eu\.", "https://{cdn_host}/eu/{server}{path}"),
+        DEFAULT_RULE,
+    )
+
+    assert rewriter.parse("http://s1.eu.origin.com/a").cdn_url("cdn") == (
+        "https://cdn/eu/s1/a"
+    )
+    assert rewriter.parse("http://s1.us.origin.com/a").cdn_url("cdn") == (
+        "http://cdn/s1/a"
+    )
+
+
+def test_server_is_taken_from_named_group():
+    rewriter = _rewriter(
+        RewriteRule.compile(
+            r"^(edge|media)-(?P<server>s\d+)\.", "{scheme}://{cdn_host}{path}"
+        )
+    )
+    video_request = rewriter.parse("https://media-s7.origin.com/a.mp4")
+
+    assert video_request.server_name == "s7"
+    assert video_request.cdn_url("cdn") == "https://cdn/a.mp4"
+
+
+@pytest.mark.parametrize(
+    "host_pattern, cdn_url_template",
+    [
+        # Нет хоста CDN или он встречается дважды
+        (r"^(s\d+)\.", "http://cdn.com/{server}{path}"),
+        (r"^(s\d+)\.", "http://{cdn_host}/{cdn_host}{path}"),
+        # Нет группы с именем сервера
+        (r"^s\d+\.", "http://{cdn_host}{path}"),
+        # Некорректное регулярное выражение
+        (r"^(s\d+\.", "http://{cdn_host}{path}"),
+    ],
+)
+def test_invalid_rule_is_rejected(host_pattern, cdn_url_template):
+    with pytest.raises(ValueError):
+        RewriteRule.compile(host_pattern, cdn_url_template)
+
+
+def test_parsed_urls_are_cached():
+    rewriter = _rewriter()
+
+    assert rewriter.parse("http://s1.origin.com/a") is rewriter.parse(
+        "http://s1.origin.com/a"
+    )
+
+
+def test_malformed_url_is_bad_request():
+    # URL не разобран - 400, а не перенаправление на него же
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_video_request("http://origin.com/video/1.mp4"))
+
+    assert error.value.status_code == 400
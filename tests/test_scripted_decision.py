@@ -0,0 +1,234 @@
+import asyncio
+import json
+import os
+import uuid
+
+import pytest
+from redis import asyncio as aioredis
+
+from src.application.rewrite import RewriteRule, UrlRewriter
+from src.application.strategies import ScriptedNthRequestStrategy
+from src.domain.enums import ResourceTypeEnum
+from src.domain.schemas import BalancingDecision, CdnServer
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.cache.repository import RedisScriptedDecisionRepository
+from src.infrastructure.cache.scripts import NTH_REQUEST_DECISION_SCRIPT
+
+REQUEST = UrlRewriter(
+    rules=[RewriteRule.compile(r"^(s\d+)\.", "http://{cdn_host}/{server}{path}")],
+    cache_size=1,
+).parse("http://s1.origin.com/a.mp4")
+
+
+async def _redis_or_none() -> aioredis.Redis | None:
+    client = aioredis.Redis(
+        host=os.environ.get("REDIS_HOST", "localhost"),
+        port=int(os.environ.get("REDIS_PORT", 6379)),
+        decode_responses=True,
+        socket_connect_timeout=0.5,
+    )
+
+    try:
+        await client.ping()
+    except aioredis.RedisError:
+        await client.aclose()
+        return None
+
+    return client
+
+
+def _with_redis(test):
+    """
+    Скрипт выполняется настоящим Redis (REDIS_HOST/REDIS_PORT): ключи теста
+    изолированы случайной схемой и удаляются после него
+    """
+
+    async def run() -> None:
+        client = await _redis_or_none()
+
+        if client is None:
+            pytest.skip("Redis недоступен")
+
+        schema = uuid.uuid4().hex
+        keyspace = RedisKeyspace(cdn_schema=schema, origin_schema=schema)
+
+        try:
+            await test(client, keyspace, "s-%s" % schema)
+        finally:
+            keys = await client.keys("*%s*" % schema)
+
+            if keys:
+                await client.delete(*keys)
+
+            await client.aclose()
+
+    return lambda: asyncio.run(run())
+
+
+def _repo(client: aioredis.Redis, keyspace: RedisKeyspace):
+    return RedisScriptedDecisionRepository(
+        script=client.register_script(NTH_REQUEST_DECISION_SCRIPT),
+        keyspace=keyspace,
+    )
+
+
+async def _decisions(repo, server_name: str, count: int, **kwargs) -> list:
+    return [(await repo.decide(server_name, **kwargs)).type.value for _ in range(count)]
+
+
+@_with_redis
+async def test_script_misses_without_cdn_settings(client, keyspace, server_name):
+    repo = _repo(client, keyspace)
+    assert await repo.decide(server_name) is None
+
+    # Отметка "CDN нет" - тоже промах: решение принимает приложение
+    await client.set(keyspace.cdn_settings(), json.dumps({"_missing": True}))
+    assert await repo.decide(server_name, origin_missing=True) is None
+
+    assert await client.get(keyspace.scripted_counter(server_name)) is None
+
+
+@_with_redis
+async def test_script_misses_without_origin_settings(client, keyspace, server_name):
+    await client.set(
+        keyspace.cdn_settings(),
+        json.dumps({"host_name": "cdn", "default_redirecting_ratio": 2}),
+    )
+
+    # Настроек origin нет в кеше, и неизвестно, есть ли он - счётчик не трогаем
+    assert await _repo(client, keyspace).decide(server_name) is None
+    assert await client.get(keyspace.scripted_counter(server_name)) is None
+
+
+@_with_redis
+async def test_missing_origin_uses_cdn_ratio(client, keyspace, server_name):
+    await client.set(
+        keyspace.cdn_settings(),
+        json.dumps({"host_name": "cdn", "default_redirecting_ratio": 3}),
+    )
+    repo = _repo(client, keyspace)
+
+    assert await _decisions(repo, server_name, 6, origin_missing=True) == [
+        "CDN",
+        "CDN",
+        "ORIGIN",
+        "CDN",
+        "CDN",
+        "ORIGIN",
+    ]
+
+    # Отметка "origin нет" в кеше равносильна флагу
+    await client.set(keyspace.origin_settings(server_name), '{"_missing": true}')
+    assert await _decisions(repo, server_name, 3) == ["CDN", "CDN", "ORIGIN"]
+
+
+@_with_redis
+async def test_origin_ratio_overrides_cdn_ratio(client, keyspace, server_name):
+    await client.set(
+        keyspace.cdn_settings(),
+        json.dumps({"host_name": "cdn", "default_redirecting_ratio": 3}),
+    )
+    await client.set(
+        keyspace.origin_settings(server_name),
+        json.dumps({"name": server_name, "redirecting_ratio": 2}),
+    )
+    repo = _repo(client, keyspace)
+
+    assert await _decisions(repo, server_name, 4) == ["CDN", "ORIGIN", "CDN", "ORIGIN"]
+    assert (await repo.decide(server_name)).cdn_host == "cdn"
+
+    # Без коэффициента у origin - коэффициент CDN
+    await client.set(
+        keyspace.origin_settings(server_name),
+        json.dumps({"name": server_name, "redirecting_ratio": None}),
+    )
+    await client.delete(keyspace.scripted_counter(server_name))
+    assert await _decisions(repo, server_name, 3) == ["CDN", "CDN", "ORIGIN"]
+
+
+class RecordingScript:
+    """
+    EVALSHA без Redis: запоминает ключи и аргументы, отдаёт ответы по порядку
+    """
+
+    def __init__(self, *results: list[str]) -> None:
+        self.calls: list[tuple[list[str], list[str]]] = []
+        self._results = list(results)
+
+    async def __call__(self, keys: list[str], args: list[str]) -> list[str]:
+        self.calls.append((keys, args))
+        return self._results.pop(0)
+
+
+def test_unknown_origin_is_passed_to_script_as_missing():
+    script = RecordingScript(["CDN", "cdn"], ["ORIGIN", "cdn"])
+    keyspace = RedisKeyspace()
+    repo = RedisScriptedDecisionRepository(
+        script=script, keyspace=keyspace, known_origins={"s1"}
+    )
+
+    async def run() -> list[BalancingDecision | None]:
+        return [await repo.decide("s2"), await repo.decide("s1")]
+
+    assert asyncio.run(run()) == [
+        BalancingDecision(type=ResourceTypeEnum.CDN, cdn_host="cdn"),
+        BalancingDecision(type=ResourceTypeEnum.ORIGIN, cdn_host="cdn"),
+    ]
+    assert script.calls == [
+        (
+            [
+                keyspace.cdn_settings(),
+                keyspace.origin_settings("s2"),
+                keyspace.scripted_counter("s2"),
+            ],
+            ["1"],
+        ),
+        (
+            [
+                keyspace.cdn_settings(),
+                keyspace.origin_settings("s1"),
+                keyspace.scripted_counter("s1"),
+            ],
+            ["0"],
+        ),
+    ]
+
+
+class StubRepo:
+    def __init__(self, value) -> None:
+        self.value = value
+        self.reads = 0
+
+    async def read(self, **kwargs):
+        self.reads += 1
+        return self.value
+
+
+def test_miss_fills_cache_and_retries_with_missing_origin():
+    script = RecordingScript(["MISS"], ["ORIGIN", "cdn"])
+    cdn_repo = StubRepo(CdnServer(host_name="cdn", default_redirecting_ratio=1))
+    origin_repo = StubRepo(None)
+    strategy = ScriptedNthRequestStrategy(
+        cdn_repo=cdn_repo,
+        origin_repo=origin_repo,
+        decision_repo=RedisScriptedDecisionRepository(script=script),
+    )
+    target = asyncio.run(strategy.get_target_resource(REQUEST))
+
+    # Промах: настройки прочитаны через кеширующие репозитории, повтор
+    # с флагом "origin нет"
+    assert target.type is ResourceTypeEnum.ORIGIN
+    assert (cdn_repo.reads, origin_repo.reads) == (1, 1)
+    assert [args for _, args in script.calls] == [["0"], ["1"]]
+
+
+def test_miss_without_cdn_is_an_error():
+    # CDN нет ни в кеше, ни в БД - повторять скрипт незачем
+    strategy = ScriptedNthRequestStrategy(
+        cdn_repo=StubRepo(None),
+        origin_repo=StubRepo(None),
+        decision_repo=RedisScriptedDecisionRepository(script=RecordingScript(["MISS"])),
+    )
+
+    with pytest.raises(ValueError):
+        asyncio.run(strategy.get_target_resource(REQUEST))
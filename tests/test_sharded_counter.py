@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from src.infrastructure.cache.repository import (
+    ShardCursors,
+    ShardedRedisCdnRequestCounterRepository,
+)
+
+SHARDS = 2
+RATIO = 2
+REQUESTS = 1000
+
+
+@pytest.fixture
+def counter(redis):
+    # Курсоры - свои на тест, как у нового воркера
+    cursors = ShardCursors()
+
+    def create(server_name: str) -> ShardedRedisCdnRequestCounterRepository:
+        # Как в графе зависимостей: репозиторий создаётся на каждый запрос
+        return ShardedRedisCdnRequestCounterRepository(
+            server_name=server_name, client=redis, shards=SHARDS, cursors=cursors
+        )
+
+    return create
+
+
+def test_interleaved_servers_keep_origin_share(redis, counter):
+    async def run() -> dict[str, int]:
+        origin_hits = {"s1": 0, "s2": 0}
+
+        for _ in range(REQUESTS):
+            for server_name in origin_hits:
+                value = await counter(server_name).increment()
+                origin_hits[server_name] += not value % RATIO
+
+        return origin_hits
+
+    assert asyncio.run(run()) == {"s1": REQUESTS // RATIO, "s2": REQUESTS // RATIO}
+
+
+def test_interleaved_servers_spread_over_shards(redis, counter):
+    async def run() -> None:
+        for _ in range(REQUESTS):
+            await counter("s1").increment()
+            await counter("s2").reserve(3)
+
+    asyncio.run(run())
+
+    # Каждый сервер равномерно занимает все свои шарды
+    assert redis.values == {
+        "counter: s1:0": REQUESTS // 2,
+        "counter: s1:1": REQUESTS // 2,
+        "counter: s2:0": REQUESTS * 3 // 2,
+        "counter: s2:1": REQUESTS * 3 // 2,
+    }
+
+
+def test_values_are_unique(redis, counter):
+    async def run() -> list[int]:
+        values = [await counter("s1").increment() for _ in range(10)]
+        values += await counter("s1").reserve(10)
+        return values
+
+    assert sorted(asyncio.run(run())) == list(range(1, 21))
@@ -0,0 +1,78 @@
+import asyncio
+
+from src.infrastructure.cache.keys import RedisKeyspace
+from src.infrastructure.cache.snapshot import SettingsSnapshotStore
+
+
+class FakePubSub:
+    """
+    Подписка на канал: отдаёт заготовленные сообщения, потом молчит
+    """
+
+    def __init__(self, messages: list[bytes]) -> None:
+        self._messages = list(messages)
+        self.drained = asyncio.Event()
+
+    async def __aenter__(self) -> "FakePubSub":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    async def subscribe(self, channel: str) -> None:
+        pass
+
+    async def get_message(self, ignore_subscribe_messages: bool, timeout: float):
+        if self._messages:
+            return {"type": "message", "data": self._messages.pop(0)}
+
+        self.drained.set()
+        await asyncio.sleep(timeout)
+
+
+class FakeRedis:
+    def __init__(self, pubsub: FakePubSub) -> None:
+        self._pubsub = pubsub
+        self.version = b"0"
+
+    def pubsub(self) -> FakePubSub:
+        return self._pubsub
+
+    async def get(self, key: str) -> bytes:
+        return self.version
+
+
+def test_foreign_messages_do_not_stop_the_listener():
+    async def run() -> int:
+        refreshes = 0
+
+        async def loader():
+            nonlocal refreshes
+            refreshes += 1
+            return None, [], []
+
+        pubsub = FakePubSub([b"not a version", b"5"])
+        redis = FakeRedis(pubsub)
+        store = SettingsSnapshotStore(
+            loader=loader,
+            cache_client=redis,
+            pubsub_client=redis,
+            channel="settings",
+            ttl=60,
+            keyspace=RedisKeyspace(),
+        )
+
+        listener = asyncio.create_task(store.run())
+        drained = asyncio.create_task(pubsub.drained.wait())
+        await asyncio.wait(
+            (listener, drained), timeout=5, return_when=asyncio.FIRST_COMPLETED
+        )
+
+        # Задача слушает канал дальше
+        assert not listener.done()
+        listener.cancel()
+
+        return refreshes
+
+    # При подписке и по сообщению о новой версии, чужое сообщение пропущено
+    assert asyncio.run(run()) == 2
@@ -0,0 +1,50 @@
+import pytest
+
+from src.application.builders import STRATEGY_BUILDERS
+from src.application.enums import BalancingStrategyEnum
+from src.presentation.rest import dependencies
+
+SETTINGS_GETTERS = (
+    dependencies.get_balancer_settings,
+    dependencies.get_counter_settings,
+    dependencies.get_strategy_builder,
+)
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """
+    Настройки воркера из окружения: синглтоны собираются заново
+    """
+
+    def configure(strategy: BalancingStrategyEnum, shards: int) -> None:
+        monkeypatch.setenv("BALANCING_STRATEGY", strategy.value)
+        monkeypatch.setenv("COUNTER_SHARDS", str(shards))
+
+    for getter in SETTINGS_GETTERS:
+        getter.cache_clear()
+
+    yield configure
+
+    for getter in SETTINGS_GETTERS:
+        getter.cache_clear()
+
+
+def test_scripted_strategy_refuses_sharded_counters(settings):
+    settings(BalancingStrategyEnum.SCRIPTED_NTH_REQUEST, shards=4)
+
+    with pytest.raises(ValueError):
+        dependencies.get_strategy_builder()
+
+
+@pytest.mark.parametrize(
+    "strategy, shards",
+    [
+        (BalancingStrategyEnum.SCRIPTED_NTH_REQUEST, 1),
+        (BalancingStrategyEnum.NTH_REQUEST, 4),
+    ],
+)
+def test_strategy_builder_is_selected_by_settings(settings, strategy, shards):
+    settings(strategy, shards)
+
+    assert dependencies.get_strategy_builder() is STRATEGY_BUILDERS[strategy]
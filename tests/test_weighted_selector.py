@@ -0,0 +1,55 @@
+import random
+from collections import Counter
+
+import pytest
+
+from src.core.selectors import WeightedSelector
+
+WEIGHTS = {"a": 1.0, "b": 2.0, "c": 7.0, "d": 0.5, "e": 4.5}
+
+
+def _shares(selector: WeightedSelector[str]) -> dict[str, float]:
+    # Точные доли из таблиц: ячейка выбирается с вероятностью 1 / n, внутри
+    # неё - сам элемент или его alias
+    count = len(selector)
+    shares = dict.fromkeys(selector._items, 0.0)
+
+    for index, item in enumerate(selector._items):
+        probability = selector._probabilities[index]
+        shares[item] += probability / count
+        shares[selector._items[selector._aliases[index]]] += (1 - probability) / count
+
+    return shares
+
+
+def test_alias_tables_match_weights():
+    selector = WeightedSelector(list(WEIGHTS.items()))
+    total = sum(WEIGHTS.values())
+
+    assert _shares(selector) == pytest.approx(
+        {item: weight / total for item, weight in WEIGHTS.items()}
+    )
+
+
+def test_sampled_distribution_follows_weights():
+    selector = WeightedSelector(list(WEIGHTS.items()))
+    selector._random = random.Random(42).random
+    draws = 100_000
+
+    counts = Counter(selector.select() for _ in range(draws))
+    total = sum(WEIGHTS.values())
+
+    for item, weight in WEIGHTS.items():
+        assert counts[item] / draws == pytest.approx(weight / total, abs=0.01)
+
+
+def test_items_without_weight_are_never_selected():
+    selector = WeightedSelector([("a", 0), ("b", 1.0), ("c", -1.0)])
+
+    assert len(selector) == 1
+    assert {selector.select() for _ in range(100)} == {"b"}
+
+
+def test_selector_needs_positive_weight():
+    with pytest.raises(ValueError):
+        WeightedSelector([("a", 0), ("b", 0.0)])